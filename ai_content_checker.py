@@ -1,12 +1,21 @@
-import re
+import json
 import os
+import re
 import requests
 import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Any, Optional
 from datetime import datetime, timedelta
 from openai import OpenAI
 
-from db import cursor
+from db import (KIEV_TZ, find_posted_candidates, get_channel_posts, get_source_state,
+                get_unindexed_posts, save_channel_posts, save_posted, save_posted_entities, save_posted_minhash,
+                set_source_state)
+from dedup import (Clusters, Entities, VectorIndex, entities_from_json, entities_to_json, entity_keys, key_entities,
+                   lsh_bands, minhash_signature, quality_score, shares_team_and_player, text_vector, triage,
+                   vector_from_json, vector_to_json)
+from llm_dispatch import CONFIG as LLM_CONFIG, get_dispatcher
+from text_utils import FOOTBALL_STOP_WORDS, clean_text_for_comparison
 
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 GEMINI_AVAILABLE = False
@@ -21,7 +30,8 @@ def init_gemini():
     try:
         client = OpenAI(
             api_key=GROQ_API_KEY,
-            base_url="https://api.groq.com/openai/v1"
+            base_url="https://api.groq.com/openai/v1",
+            max_retries=0
         )
         GEMINI_AVAILABLE = True
         print("✅ Groq инициализирован для проверки дубликатов")
@@ -43,26 +53,7 @@ class AIContentSimilarityChecker:
 
     def clean_text_for_ai(self, text: str) -> str:
         """Улучшенная очистка текста с сохранением ключевой информации."""
-        if not text:
-            return ""
-        
-        # Убираем HTML теги
-        text = re.sub(r'<[^>]+>', '', text)
-        
-        # Убираем некоторые эмодзи, но оставляем важные
-        text = re.sub(r'[📰📊🔥💪🎯⭐]', '', text)  # Убираем декоративные
-        # Оставляем важные: ⚽🏆🥅✅❌🌍🚫👑
-        
-        # НЕ убираем источники - они помогают различать статьи
-        # text = re.sub(r'(ESPN Soccer|Football\.ua|OneFootball)', '', text)  # ЗАКОММЕНТИРОВАНО
-        
-        # Убираем хэштеги в конце, но оставляем в середине текста
-        text = re.sub(r'\s*#\w+\s*$', '', text)
-        
-        # Нормализуем пробелы
-        text = re.sub(r'\s+', ' ', text).strip()
-        
-        return text
+        return clean_text_for_comparison(text)
 
     def ai_compare_texts(self, new_text: str, existing_texts: List[str]) -> Dict[str, Any]:
         """Улучшенная AI-проверка дубликатов с детальным анализом."""
@@ -101,11 +92,7 @@ class AIContentSimilarityChecker:
 СХОЖІСТЬ З: [номер існуючої новини або "ЖОДНА"]"""
 
         try:
-            response = client.chat.completions.create(
-                model="llama-3.3-70b-versatile",
-                messages=[{"role": "user", "content": prompt}]
-            )
-            ai_response = response.choices[0].message.content.strip()
+            ai_response = get_dispatcher().complete(client, prompt).strip()
             
             # Парсим відповідь AI
             is_duplicate = False
@@ -133,7 +120,8 @@ class AIContentSimilarityChecker:
             print(f"❌ Ошибка Groq анализа: {e}")
             return {"ai_available": False, "error": str(e), "similarities": [], "is_duplicate": False}
 
-    def fallback_similarity_check(self, text1: str, text2: str) -> float:
+    def fallback_similarity_check(self, text1: str, text2: str,
+                                  entities1: Optional[Entities] = None, entities2: Optional[Entities] = None) -> float:
         """Улучшенная fallback-проверка с учетом футбольной специфики."""
         if not text1 or not text2:
             return 0.0
@@ -141,31 +129,9 @@ class AIContentSimilarityChecker:
         clean_text1 = self.clean_text_for_ai(text1).lower()
         clean_text2 = self.clean_text_for_ai(text2).lower()
         
-        # Извлекаем ключевые сущности
-        def extract_key_entities(text):
-            # Команды (расширенный список)
-            teams = re.findall(r'\b(?:реал|барселона|ліверпуль|манчестер|арсенал|челсі|рейнджерс|наполі|генк|астон вілла|клуб брюгге|баварія|ювентус|псж|атлетіко|севілья|валенсія|інтер|мілан|рома|лаціо|аталанта|фіорентина|реал мадрид|барселона|манчестер юнайтед|манчестер сіті|тоттенгем|ньюкасл|вест гем|лестер|евертон|саутгемптон|бернлі|фулгем|вольвз|брайтон|кристал палас|айпсвіч|борнмут)\b', text)
-            
-            # Игроки (имена с фамилиями на украинском/английском)
-            players_ua = re.findall(r'\b[А-ЯІЇЄ][а-яіїєґ]+\s+[А-ЯІЇЄ][а-яіїєґ]+\b', text)
-            players_en = re.findall(r'\b[A-Z][a-z]+\s+[A-Z][a-z]+\b', text)
-            players = players_ua + players_en
-            
-            # Турниры/соревнования
-            competitions = re.findall(r'\b(?:ліга чемпіонів|прем\'єр-ліга|ла ліга|серія а|бундесліга|pfa|uefa|ucl|champions league|premier league|la liga|serie a|bundesliga|europa league|conference league|fa cup|carabao cup|copa del rey|coppa italia|dfb pokal|кубок англії|кубок німеччини|кубок італії|кубок іспанії)\b', text)
-            
-            # Числа и суммы
-            numbers = re.findall(r'\b\d+[\d\s]*(?:мільйонів?|голів?|асистів?|років?|хвилин?|million|goal|assist|year|minute)\b', text)
-            
-            return {
-                'teams': set([team.lower() for team in teams]),
-                'players': set([player.lower() for player in players]), 
-                'competitions': set([comp.lower() for comp in competitions]),
-                'numbers': set([num.lower() for num in numbers])
-            }
-        
-        entities1 = extract_key_entities(clean_text1)
-        entities2 = extract_key_entities(clean_text2)
+        # Ключевые сущности считаются один раз на текст (или приходят сохранёнными из базы)
+        entities1 = entities1 or key_entities(text1)
+        entities2 = entities2 or key_entities(text2)
         
         # Если есть пересечения по ключевым сущностям - высокий риск дубликата
         teams_overlap = len(entities1['teams'].intersection(entities2['teams']))
@@ -186,18 +152,8 @@ class AIContentSimilarityChecker:
         words1 = set(clean_text1.split())
         words2 = set(clean_text2.split())
         
-        # Расширенный список стоп-слов для футбола
-        stop_words = {
-            'в','на','за','до','від','для','про','під','над','при','з','у','і','та','або','але',
-            'футбол','футбольний','гра','матч','команда','гравець','тренер','клуб','сезон',
-            'гол','м\'яч','поле','стадіон','вболівальники','перемога','поразка', 'новини', 'спорт',
-            'football', 'soccer', 'game', 'match', 'team', 'player', 'coach', 'club', 'season',
-            'goal', 'ball', 'field', 'stadium', 'fans', 'win', 'loss', 'news', 'sport',
-            'the', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by'
-        }
-        
-        words1 = {w for w in words1 if len(w) > 2 and w not in stop_words}
-        words2 = {w for w in words2 if len(w) > 2 and w not in stop_words}
+        words1 = {w for w in words1 if len(w) > 2 and w not in FOOTBALL_STOP_WORDS}
+        words2 = {w for w in words2 if len(w) > 2 and w not in FOOTBALL_STOP_WORDS}
         
         if not words1 or not words2:
             return 0.0
@@ -210,90 +166,136 @@ class AIContentSimilarityChecker:
 
 
 class TelegramChannelChecker:
+    """Посты канала для проверки дубликатов.
+
+    getUpdates вызывается со смещением после последнего обработанного update_id:
+    Telegram отдаёт только новые обновления и удаляет подтверждённые. Посты
+    складываются в таблицу channel_posts, поэтому история не ограничена сутками,
+    которые Telegram хранит обновления.
+    """
+
+    STATE_SOURCE = 'Telegram'
+    OFFSET_KEY = 'update_offset'
+    BATCH_SIZE = 100    # Максимум getUpdates за один запрос
+
     def __init__(self):
         self.bot_token = os.getenv('TELEGRAM_BOT_TOKEN')
         self.channel_id = os.getenv('TELEGRAM_CHANNEL_ID')
 
-    def get_recent_posts(self, limit: int = 5, since_time: Optional[datetime] = None) -> List[Dict[str, Any]]:
+    def sync(self) -> int:
+        """Забирает новые обновления в channel_posts; возвращает число сохранённых постов"""
+        url = f"https://api.telegram.org/bot{self.bot_token}/getUpdates"
+        offset = int(get_source_state(self.STATE_SOURCE, self.OFFSET_KEY) or 0)
+        saved = 0
+        while True:
+            params = {'limit': self.BATCH_SIZE, 'timeout': 0}
+            if offset:
+                params['offset'] = offset
+            result = requests.get(url, params=params, timeout=30).json()
+            if not result.get('ok'):
+                print(f"⚠️ getUpdates: {result.get('description', 'ошибка')}")
+                break
+            updates = result.get('result', [])
+            if not updates:
+                break
+            posts = []
+            for update in updates:
+                post = update.get('channel_post') or update.get('edited_channel_post')
+                if post and str(post.get('chat', {}).get('id')) == str(self.channel_id):
+                    text = post.get('text') or post.get('caption', '') or ''
+                    if text:
+                        posts.append((self.channel_id, post.get('message_id'), text,
+                                      datetime.fromtimestamp(post.get('date', 0), KIEV_TZ)))
+            save_channel_posts(posts)
+            saved += len(posts)
+            # Следующий запрос с этим смещением подтверждает полученные обновления
+            offset = max(update['update_id'] for update in updates) + 1
+            set_source_state(self.STATE_SOURCE, self.OFFSET_KEY, str(offset))
+            if len(updates) < self.BATCH_SIZE:
+                break
+        return saved
+
+    def get_recent_posts(self, limit: Optional[int] = None,
+                         since_time: Optional[datetime] = None) -> List[Dict[str, Any]]:
         if not self.bot_token or not self.channel_id:
             return []
         try:
-            url = f"https://api.telegram.org/bot{self.bot_token}/getUpdates"
-            response = requests.get(url, timeout=30)
-            result = response.json()
-            if not result.get('ok'):
-                return []
-            channel_posts = []
-            for update in result.get('result', []):
-                if 'channel_post' in update:
-                    post = update['channel_post']
-                    if str(post.get('chat', {}).get('id')) == str(self.channel_id):
-                        channel_posts.append(post)
-            channel_posts.sort(key=lambda x: x.get('date', 0), reverse=True)
-            recent_posts = channel_posts[:limit]
-            formatted_posts = []
-            for post in recent_posts:
-                text = post.get('text') or post.get('caption', '') or ''
-                post_date = datetime.fromtimestamp(post.get('date', 0))
-                if text and (not since_time or post_date >= since_time):
-                    formatted_posts.append({
-                        'text': text,
-                        'date': post_date,
-                        'message_id': post.get('message_id')
-                    })
-            return formatted_posts
-        except Exception:
-            return []
+            saved = self.sync()
+            if saved:
+                print(f"📥 Новых постов канала: {saved}")
+        except Exception as e:
+            print(f"⚠️ Не удалось обновить посты канала, используем сохранённые: {e}")
+        return [{'text': text, 'date': datetime.fromisoformat(posted_at), 'message_id': message_id}
+                for message_id, text, posted_at in get_channel_posts(self.channel_id, since_time, limit)]
 
 
-def get_recent_posts_from_db():
-    query = "SELECT title, post_text, posted_at FROM posted_news ORDER BY posted_at DESC LIMIT 4"
-    cursor.execute(query)
-    rows = cursor.fetchall()
-    
+# Сколько дней истории постов проверяется на дубликаты (совпадает с очисткой posted_news)
+HISTORY_DAYS = 7
+_history_indexed = False
+
+
+def index_posted(title: str, text: str) -> None:
+    """MinHash-сигнатура поста и его LSH-корзины"""
+    signature = minhash_signature(text)
+    save_posted_minhash(title, json.dumps(signature), lsh_bands(signature))
+
+
+def record_posted(article: Dict[str, Any]) -> None:
+    """Сохраняет опубликованную статью вместе с вектором, сущностями и сигнатурой для проверки дубликатов"""
+    title = article.get('title', '')
+    post_text = article.get('post_text') or title
+    entities = article.get('entities') or key_entities(post_text)
+    save_posted(title, post_text, vector_to_json(text_vector(post_text)),
+                entities_to_json(entities), entity_keys(entities))
+    index_posted(title, post_text)
+
+
+def _index_history() -> None:
+    """Досчитывает сигнатуры и сущности постов, сохранённых до появления индексов (один раз за процесс)"""
+    global _history_indexed
+    if _history_indexed:
+        return
+    _history_indexed = True
+    rows = get_unindexed_posts(datetime.now(KIEV_TZ) - timedelta(days=HISTORY_DAYS))
+    for title, post_text in rows:
+        text = post_text or title
+        entities = key_entities(text)
+        save_posted_entities(title, entities_to_json(entities), entity_keys(entities))
+        index_posted(title, text)
+    if rows:
+        print(f"🧮 Проиндексировано {len(rows)} постов из истории")
+
+
+def _posts_from_rows(rows) -> List[Dict[str, Any]]:
     posts = []
-    for row in rows:
-        title, post_text, posted_at = row
+    for title, post_text, posted_at, vector, entities in rows:
         text = post_text or title
         if text:
             try:
                 dt = datetime.fromisoformat(posted_at)
             except Exception:
                 dt = None
-            posts.append({'text': text, 'date': dt})
-    
-    print(f"✅ Получено {len(posts)} последних постов из базы")
+            posts.append({'text': text, 'date': dt, 'vector': vector_from_json(vector),
+                          'entities': entities_from_json(entities)})
     return posts
 
 
-def check_content_similarity(new_article: Dict[str, Any], threshold: float = 0.75, since_time: Optional[datetime] = None) -> bool:
-    """Улучшенная проверка схожести с подробным логированием."""
-    title = new_article.get('title', '')
-    print(f"🔍 ДЕТАЛЬНАЯ AI проверка: {title[:60]}...")
-    
-    ai_checker = AIContentSimilarityChecker(threshold)
-    channel_checker = TelegramChannelChecker()
-    
-    new_text = new_article.get('post_text') or new_article.get('title', '')
-    if not new_text:
-        return False
-    
-    db_posts = get_recent_posts_from_db()
-    channel_posts = channel_checker.get_recent_posts(limit=10, since_time=since_time)
-    recent_posts = db_posts + channel_posts
-    
-    if not recent_posts:
-        print("   ✅ Нет предыдущих постов для сравнения")
-        return False
-    
-    existing_texts = [post['text'] for post in recent_posts]
-    print(f"   📊 Сравниваем с {len(existing_texts)} предыдущими постами")
-    
-    # Показываем что сравниваем
-    print(f"   📝 НОВЫЙ ТЕКСТ: {new_text[:100]}...")
-    for i, text in enumerate(existing_texts[:3], 1):  # Показываем первые 3
-        print(f"   📝 СУЩЕСТВУЮЩИЙ {i}: {text[:100]}...")
+def get_similar_posts_from_db(text: str, entities: Optional[Entities] = None):
+    """Посты за HISTORY_DAYS дней с общей LSH-корзиной или общей командой/игроком"""
+    _index_history()
+    since_time = datetime.now(KIEV_TZ) - timedelta(days=HISTORY_DAYS)
+    posts = _posts_from_rows(find_posted_candidates(lsh_bands(minhash_signature(text)),
+                                                    entity_keys(entities or key_entities(text)), since_time))
     
+    print(f"✅ Найдено {len(posts)} похожих постов в базе за {HISTORY_DAYS} дней")
+    return posts
+
+
+def llm_or_fallback_match(ai_checker: 'AIContentSimilarityChecker', new_text: str,
+                          existing_texts: List[str], threshold: float,
+                          known_entities: Optional[Dict[str, Entities]] = None) -> Optional[int]:
+    """Решение по пограничным кандидатам: AI-анализ, без ключа - fallback по сущностям.
+    Возвращает номер текста в existing_texts, дубликатом которого оказался new_text, или None."""
     if has_gemini_key():
         print("   🤖 Используем AI-анализ...")
         ai_result = ai_checker.ai_compare_texts(new_text, existing_texts)
@@ -307,79 +309,164 @@ def check_content_similarity(new_article: Dict[str, Any], threshold: float = 0.7
             print(f"   📄 Пояснение: {explanation}")
             print(f"   🔗 Похожа на: {similar_to}")
             
-            return is_duplicate
+            if not is_duplicate:
+                return None
+            number = re.search(r'\d+', similar_to)
+            position = int(number.group()) - 1 if number else 0
+            return position if 0 <= position < len(existing_texts) else 0
     
     print("   🔄 AI недоступен, используем fallback...")
     max_similarity = 0.0
-    most_similar_text = ""
+    most_similar = 0
     
-    for i, existing_text in enumerate(existing_texts, 1):
-        similarity = ai_checker.fallback_similarity_check(new_text, existing_text)
+    for i, existing_text in enumerate(existing_texts):
+        similarity = ai_checker.fallback_similarity_check(new_text, existing_text,
+                                                          entities2=(known_entities or {}).get(existing_text))
         if similarity > max_similarity:
             max_similarity = similarity
-            most_similar_text = existing_text
-        print(f"   📊 Схожесть с #{i}: {similarity:.3f}")
+            most_similar = i
+        print(f"   📊 Схожесть с #{i + 1}: {similarity:.3f}")
     
     is_duplicate = max_similarity >= threshold
     
     print(f"   📊 МАКСИМАЛЬНАЯ схожесть: {max_similarity:.3f} (порог: {threshold})")
-    print(f"   🔍 Наиболее похожий: {most_similar_text[:60]}...")
+    if existing_texts:
+        print(f"   🔍 Наиболее похожий: {existing_texts[most_similar][:60]}...")
     print(f"   🎯 РЕЗУЛЬТАТ: {'ДУБЛИКАТ' if is_duplicate else 'УНИКАЛЬНАЯ'}")
     
-    return is_duplicate
+    return most_similar if is_duplicate else None
+
+
+class DedupContext:
+    """История для проверки дубликатов на один запуск.
+
+    Снимок собирается один раз: посты канала и посты базы, найденные для кандидатов
+    через LSH-корзины и индекс сущностей. Опубликованные за запуск статьи дописываются
+    через add_post; каждая кандидатура сверяется со снимком без новых запросов
+    к Telegram и SQLite.
+    """
+
+    def __init__(self, threshold: float = 0.75):
+        self.threshold = threshold
+        self.ai_checker = AIContentSimilarityChecker(threshold)
+        self.index = VectorIndex()
+        self.entities: Dict[str, Entities] = {}
+
+    def add(self, text: str, vector: Optional[Dict[int, float]] = None, entities: Optional[Entities] = None) -> None:
+        if not text or text in self.entities:
+            return
+        self.index.add(text, vector or text_vector(text))
+        self.entities[text] = entities or key_entities(text)
+
+    def add_post(self, article: Dict[str, Any]) -> None:
+        """Опубликованная статья становится частью истории"""
+        text = article.get('post_text') or article.get('title', '')
+        self.add(text, entities=article.get('entities'))
+
+    def load(self, articles: List[Dict[str, Any]], since_time: Optional[datetime] = None) -> 'DedupContext':
+        """Похожие на articles посты базы и все посты канала не старше since_time (по умолчанию HISTORY_DAYS дней)"""
+        db_posts = []
+        for article in articles:
+            text = article.get('post_text') or article.get('title', '')
+            if text:
+                db_posts.extend(get_similar_posts_from_db(text, article.get('entities')))
+        since_time = since_time or datetime.now(KIEV_TZ) - timedelta(days=HISTORY_DAYS)
+        channel_posts = TelegramChannelChecker().get_recent_posts(since_time=since_time)
+        for post in db_posts + channel_posts:
+            self.add(post['text'], post.get('vector'), post.get('entities'))
+        print(f"📚 История для проверки дубликатов: {len({post['text'] for post in db_posts})} постов из базы, "
+              f"{len(channel_posts)} из канала")
+        return self
+
+    def is_duplicate(self, new_article: Dict[str, Any]) -> bool:
+        """Векторы решают явные случаи, LLM - пограничные"""
+        title = new_article.get('title', '')
+        print(f"🔍 ДЕТАЛЬНАЯ проверка: {title[:60]}...")
+        
+        new_text = new_article.get('post_text') or new_article.get('title', '')
+        if not new_text:
+            return False
+        if not len(self.index):
+            print("   ✅ Нет предыдущих постов для сравнения")
+            return False
+        print(f"   📊 Сравниваем с {len(self.index)} предыдущими постами")
+        print(f"   📝 НОВЫЙ ТЕКСТ: {new_text[:100]}...")
+        
+        new_entities = new_article.get('entities') or key_entities(new_text)
+        related = {text for text, entities in self.entities.items() if shares_team_and_player(new_entities, entities)}
+        verdict, matches = triage(self.index.search(text_vector(new_text)), related)
+        for score, text in matches[:3]:
+            print(f"   📝 Сходство {score:.3f}: {text[:100]}...")
+        if verdict != 'borderline':
+            print(f"   🎯 РЕЗУЛЬТАТ по векторам: {'ДУБЛИКАТ' if verdict == 'duplicate' else 'УНИКАЛЬНАЯ'}")
+            return verdict == 'duplicate'
+        
+        return llm_or_fallback_match(self.ai_checker, new_text, [text for _, text in matches], self.threshold,
+                                     self.entities) is not None
+
+
+def check_content_similarity(new_article: Dict[str, Any], threshold: float = 0.75, since_time: Optional[datetime] = None) -> bool:
+    """Разовая проверка одной статьи; для нескольких статей за запуск - DedupContext."""
+    return DedupContext(threshold).load([new_article], since_time).is_duplicate(new_article)
 
 
 def check_articles_similarity(articles: List[Dict[str, Any]], threshold: float = 0.75) -> List[Dict[str, Any]]:
     """
     Проверяет статьи на дубликаты между собой (внутренняя проверка).
     Возвращает список уникальных статей.
+    
+    Статьи группируются по векторам: явные дубликаты объединяются сразу, пограничные
+    пары проверяются LLM параллельно (лимиты держит общая очередь llm_dispatch).
+    Из каждой группы остаётся статья с лучшим quality_score.
     """
     if not articles:
         return []
     
     print(f"🔍 Проверяем {len(articles)} статей на внутренние дубликаты...")
     ai_checker = AIContentSimilarityChecker(threshold)
-    unique_articles = []
+    candidates = [article for article in articles if article.get('post_text') or article.get('title')]
+    texts = [article.get('post_text') or article.get('title', '') for article in candidates]
+    entities = [article.get('entities') or key_entities(text) for article, text in zip(candidates, texts)]
+    known_entities = dict(zip(texts, entities))
+    clusters = Clusters(len(candidates))
+    index = VectorIndex()
+    ambiguous = []
     
-    for i, article in enumerate(articles):
-        article_text = article.get('post_text') or article.get('title', '')
-        if not article_text:
-            continue
-        
-        is_duplicate = False
-        duplicate_explanation = ""
-        
-        if unique_articles:
-            existing_texts = [art.get('post_text', art.get('title', '')) for art in unique_articles]
-            
-            if has_gemini_key():
-                print(f"   🔍 Проверяем статью {i+1}: {article.get('title', '')[:50]}...")
-                ai_result = ai_checker.ai_compare_texts(article_text, existing_texts)
-                
-                if ai_result.get("ai_available"):
-                    is_duplicate = ai_result.get("is_duplicate", False)
-                    duplicate_explanation = ai_result.get("explanation", "")
-                    similar_to = ai_result.get("similar_to", "ЖОДНА")
-                    
-                    if is_duplicate:
-                        print(f"      🚫 ДУБЛИКАТ: {duplicate_explanation} (похожа на #{similar_to})")
-                    else:
-                        print(f"      ✅ УНИКАЛЬНАЯ: {duplicate_explanation}")
-            else:
-                max_similarity = 0.0
-                for existing_text in existing_texts:
-                    similarity = ai_checker.fallback_similarity_check(article_text, existing_text)
-                    max_similarity = max(max_similarity, similarity)
-                
-                is_duplicate = max_similarity >= threshold
-                
-                if is_duplicate:
-                    print(f"   🚫 Дубликат (схожесть: {max_similarity:.3f}): {article.get('title', '')[:50]}...")
-                else:
-                    print(f"   ✅ Уникальная (схожесть: {max_similarity:.3f}): {article.get('title', '')[:50]}...")
-        
-        if not is_duplicate:
-            unique_articles.append(article)
+    for i, text in enumerate(texts):
+        vector = text_vector(text)
+        related = {j for j in range(i) if shares_team_and_player(entities[i], entities[j])}
+        verdict, matches = triage(index.search(vector), related)
+        if verdict == 'duplicate':
+            print(f"   🚫 Дубликат (сходство: {matches[0][0]:.3f}): {candidates[i].get('title', '')[:50]}...")
+            clusters.union(i, matches[0][1])
+        elif verdict == 'borderline':
+            ambiguous.append((i, [j for _, j in matches]))
+        index.add(i, vector)
+    
+    # Пары, которые уже оказались в одной группе через явные дубликаты, LLM не нужны
+    ambiguous = [(i, [j for j in others if clusters.find(i) != clusters.find(j)]) for i, others in ambiguous]
+    ambiguous = [(i, others) for i, others in ambiguous if others]
+    
+    def resolve(i: int, others: List[int]) -> Optional[int]:
+        print(f"   🔍 Проверяем статью {i+1}: {candidates[i].get('title', '')[:50]}...")
+        match = llm_or_fallback_match(ai_checker, texts[i], [texts[j] for j in others], threshold, known_entities)
+        return others[match] if match is not None else None
+    
+    if ambiguous:
+        with ThreadPoolExecutor(max_workers=min(len(ambiguous), LLM_CONFIG['MAX_CONCURRENCY'])) as executor:
+            resolved = list(executor.map(lambda pair: resolve(*pair), ambiguous))
+        for (i, _), j in zip(ambiguous, resolved):
+            if j is not None:
+                clusters.union(i, j)
+    
+    unique_positions = []
+    for group in clusters.groups():
+        best = max(group, key=lambda position: (quality_score(candidates[position]), -position))
+        unique_positions.append(best)
+        if len(group) > 1:
+            print(f"   🧩 Группа из {len(group)} статей, оставляем [{candidates[best].get('source')}]: "
+                  f"{candidates[best].get('title', '')[:50]}...")
+    unique_articles = [candidates[position] for position in sorted(unique_positions)]
     
     print(f"📊 Результат: {len(unique_articles)}/{len(articles)} уникальных статей")
     return unique_articles
@@ -1,10 +1,14 @@
+import json
 import os
 import requests
-from typing import Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List
 from urllib.parse import urlparse
 from openai import OpenAI
 import time
-from bs4 import BeautifulSoup
+from html_parsing import make_soup
+from llm_dispatch import CONFIG as LLM_CONFIG, cache_key, get_dispatcher, priority as llm_priority
+from dedup import key_entities
 import logging
 import random
 import re
@@ -19,6 +23,8 @@ CONFIG = {
     'TELEGRAM_MESSAGE_LIMIT': 4000,  # Лимит сообщения Telegram
     'TELEGRAM_CAPTION_LIMIT': 1000,  # Лимит подписи к фото
     'SUMMARY_MAX_WORDS': 150,        # Уменьшили лимит слов для краткости
+    'AI_BATCH_SIZE': int(os.getenv('AI_BATCH_SIZE', '6')),  # Статей в одном запросе к модели; 1 - без пакетов
+    'AI_BATCH_MAX_CHARS': 12000,     # Бюджет текста статей на один пакетный промпт
     'USER_AGENTS': [
         'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
         'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36',
@@ -41,7 +47,8 @@ def init_gemini():
     try:
         client = OpenAI(
             api_key=GROQ_API_KEY,
-            base_url="https://api.groq.com/openai/v1"
+            base_url="https://api.groq.com/openai/v1",
+            max_retries=0  # Повторы после 429 делает llm_dispatch с учётом общих лимитов
         )
         GEMINI_AVAILABLE = True
         logger.info("Groq инициализирован")
@@ -54,13 +61,9 @@ def has_gemini_key() -> bool:
         init_gemini()
     return GEMINI_AVAILABLE
 
-def _call_grok(prompt: str) -> str:
+def _call_grok(prompt: str, use_cache: bool = True) -> str:
     """Вспомогательная функция для вызова Groq API."""
-    response = client.chat.completions.create(
-        model="llama-3.3-70b-versatile",
-        messages=[{"role": "user", "content": prompt}]
-    )
-    return response.choices[0].message.content
+    return get_dispatcher().complete(client, prompt, use_cache=use_cache)
 
 def fetch_full_article_content(url: str) -> str:
     """Загружает полный текст статьи по URL."""
@@ -68,7 +71,7 @@ def fetch_full_article_content(url: str) -> str:
         headers = {'User-Agent': random.choice(CONFIG['USER_AGENTS'])}
         response = requests.get(url, headers=headers, timeout=10)
         response.raise_for_status()
-        soup = BeautifulSoup(response.content, 'html.parser')
+        soup = make_soup(response.content)
 
         content_selectors = (
             [
@@ -122,12 +125,155 @@ def create_basic_summary(article_data: Dict[str, Any]) -> str:
             return result + '.' if not result.endswith('.') else result
     return summary or title
 
-def translate_and_format_onefootball(article_data: Dict[str, Any]) -> Dict[str, str]:
-    """Переводит и форматирует статью OneFootball в стиле Football.ua."""
+def onefootball_source_text(article_data: Dict[str, Any]) -> str:
+    """Английский текст для перевода: контент, краткое описание или полный текст со страницы."""
     title = article_data.get('title', '')
     content = article_data.get('content', '')
     summary = article_data.get('summary', '')
     url = article_data.get('url', '')
+
+    # Текст уже собран для пакетного запроса - повторно страницу не загружаем
+    if article_data.get('ai_source_text'):
+        return article_data['ai_source_text']
+
+    # Собираем весь доступный контент
+    full_text = ""
+    if content and len(content) > 50:
+        full_text = content
+        logger.info(f"OneFootball: используем основной контент ({len(content)} символов)")
+    elif summary and len(summary) > 20:
+        full_text = summary
+        logger.info(f"OneFootball: используем краткое описание ({len(summary)} символов)")
+    else:
+        logger.info(f"OneFootball: контент короткий, загружаем полный текст...")
+        full_text = fetch_full_article_content(url) or summary or title
+        logger.info(f"OneFootball: загружен полный текст ({len(full_text)} символов)")
+    return full_text
+
+def parse_onefootball_translation(raw_result: str, title: str) -> Dict[str, str]:
+    """Заголовок и описание из ответа модели: очистка от служебных фраз и повторов заголовка."""
+    # ОЧИСТКА ОТ МУСОРНЫХ ТЕГОВ И ФРАЗ
+    cleaned_result = raw_result
+
+    # Убираем все возможные мусорные фразы
+    junk_patterns = [
+        r'\*\*ЗАГОЛОВОК УКРАЇНСЬКОЮ\*\*\s*',
+        r'\*\*заголовок українською\*\*\s*',
+        r'\*\*Пост для Telegram:\*\*\s*',
+        r'заголовок українською:?\s*',
+        r'український переклад заголовка:?\s*',
+        r'короткий опис новини українською:?\s*',
+        r'короткий опис українською:?\s*',
+        r'опис українською:?\s*',
+        r'Текст поста:?\s*',
+        r'СЕНСАЦІЯ:?\s*',
+        r'Відео голів?\s*',
+        r'\*\*КОРОТКИЙ ПОСТ\*\*\s*',
+        r'переклад:?\s*',
+        r'\[ЗАГОЛОВОК\]\s*',
+        r'\[ОПИС\]\s*',
+        r'перший рядок:?\s*',
+        r'другий рядок:?\s*',
+        r'^\s*-\s*',  # убираем тире в начале
+        r'^\s*\*\s*', # убираем звездочки в начале
+    ]
+
+    for pattern in junk_patterns:
+        cleaned_result = re.sub(pattern, '', cleaned_result, flags=re.IGNORECASE | re.MULTILINE)
+
+    logger.info(f"OneFootball: после очистки: '{cleaned_result[:200]}...'")
+
+    # Разбиваем на строки
+    lines = [line.strip() for line in cleaned_result.split('\n') if line.strip()]
+
+    if not lines:
+        logger.error("OneFootball: после очистки не осталось строк")
+        return {
+            'translated_title': f"[ОШИБКА ПАРСИНГА] {title}",
+            'translated_content': "Не удалось распарсить ответ Gemini"
+        }
+
+    # Первая строка - заголовок
+    translated_title = lines[0].strip()
+
+    # Остальные строки - описание
+    if len(lines) > 1:
+        translated_content = ' '.join(lines[1:]).strip()
+    else:
+        translated_content = "Детали у повному матеріалі."
+        logger.warning("OneFootball: в ответе только одна строка, используем стандартное описание")
+
+    # Дополнительная очистка заголовка от остаточного мусора
+    title_cleanup_patterns = [
+        r'^[:\-\*\s]+',  # убираем двоеточия, тире, звездочки в начале
+        r'[:\-\*\s]+$',  # убираем в конце
+    ]
+
+    for pattern in title_cleanup_patterns:
+        translated_title = re.sub(pattern, '', translated_title).strip()
+
+    # Дополнительная очистка описания
+    content_cleanup_patterns = [
+        r'^[:\-\*\s]+',
+        r'[:\-\*\s]+$',
+    ]
+
+    for pattern in content_cleanup_patterns:
+        translated_content = re.sub(pattern, '', translated_content).strip()
+
+    # Убираем дублирование заголовка в описании
+    if translated_content and translated_title:
+        # Если описание начинается похоже на заголовок
+        title_words = translated_title.lower().split()[:3]  # Первые 3 слова заголовка
+        content_words = translated_content.lower().split()[:3]  # Первые 3 слова описания
+
+        # Проверяем совпадение
+        matches = sum(1 for t, c in zip(title_words, content_words) if t == c)
+        if matches >= 2:  # Если совпадают 2+ слова
+            logger.info("OneFootball: обнаружено дублирование заголовка в описании")
+            sentences = translated_content.split('. ')
+            if len(sentences) > 1:
+                translated_content = '. '.join(sentences[1:])
+                if not translated_content.endswith('.'):
+                    translated_content += '.'
+            else:
+                translated_content = "Детали розкриті у повному матеріалі."
+
+    # Финальная проверка
+    if not translated_title:
+        translated_title = f"[ПУСТОЙ ЗАГОЛОВОК] {title}"
+        logger.error("OneFootball: заголовок пустой после очистки")
+
+    if not translated_content or len(translated_content.strip()) < 10:
+        translated_content = "Детали розкриті у повному матеріалі."
+        logger.warning("OneFootball: описание слишком короткое")
+
+    # Обрезаем если слишком длинное
+    if len(translated_content) > CONFIG['TELEGRAM_CAPTION_LIMIT']:
+        logger.warning(f"OneFootball: описание слишком длинное ({len(translated_content)} символов)")
+        sentences = translated_content.split('. ')
+        short_content = ""
+        for sentence in sentences:
+            if len(short_content + sentence + '. ') <= CONFIG['TELEGRAM_CAPTION_LIMIT']:
+                short_content += sentence + '. '
+            else:
+                break
+        translated_content = short_content.rstrip()
+
+    result = {
+        'translated_title': translated_title,
+        'translated_content': translated_content
+    }
+
+    logger.info(f"OneFootball: перевод успешно завершен")
+    logger.info(f"   Заголовок: '{translated_title}'")
+    logger.info(f"   Описание: '{translated_content[:100]}...'")
+
+    return result
+
+def translate_and_format_onefootball(article_data: Dict[str, Any]) -> Dict[str, str]:
+    """Переводит и форматирует статью OneFootball в стиле Football.ua."""
+    title = article_data.get('title', '')
     
     logger.info(f"OneFootball: начинаем перевод статьи: {title[:50]}...")
     
@@ -145,18 +291,7 @@ def translate_and_format_onefootball(article_data: Dict[str, Any]) -> Dict[str,
             'translated_content': "Перевод недоступен - ошибка инициализации Groq"
         }
     
-    # Собираем весь доступный контент
-    full_text = ""
-    if content and len(content) > 50:
-        full_text = content
-        logger.info(f"OneFootball: используем основной контент ({len(content)} символов)")
-    elif summary and len(summary) > 20:
-        full_text = summary
-        logger.info(f"OneFootball: используем краткое описание ({len(summary)} символов)")
-    else:
-        logger.info(f"OneFootball: контент короткий, загружаем полный текст...")
-        full_text = fetch_full_article_content(url) or summary or title
-        logger.info(f"OneFootball: загружен полный текст ({len(full_text)} символов)")
+    full_text = onefootball_source_text(article_data)
     
     if len(full_text) < 20:
         logger.warning("OneFootball: недостаточно контента для обработки")
@@ -185,124 +320,7 @@ def translate_and_format_onefootball(article_data: Dict[str, Any]) -> Dict[str,
         raw_result = _call_grok(prompt).strip()
         logger.info(f"OneFootball: сырой ответ Groq: '{raw_result[:200]}...'")
         
-        # ОЧИСТКА ОТ МУСОРНЫХ ТЕГОВ И ФРАЗ
-        cleaned_result = raw_result
-        
-        # Убираем все возможные мусорные фразы
-        junk_patterns = [
-            r'\*\*ЗАГОЛОВОК УКРАЇНСЬКОЮ\*\*\s*',
-            r'\*\*заголовок українською\*\*\s*',
-            r'\*\*Пост для Telegram:\*\*\s*',
-            r'заголовок українською:?\s*',
-            r'український переклад заголовка:?\s*',
-            r'короткий опис новини українською:?\s*',
-            r'короткий опис українською:?\s*',
-            r'опис українською:?\s*',
-            r'Текст поста:?\s*',
-            r'СЕНСАЦІЯ:?\s*',
-            r'Відео голів?\s*',
-            r'\*\*КОРОТКИЙ ПОСТ\*\*\s*',
-            r'переклад:?\s*',
-            r'\[ЗАГОЛОВОК\]\s*',
-            r'\[ОПИС\]\s*',
-            r'перший рядок:?\s*',
-            r'другий рядок:?\s*',
-            r'^\s*-\s*',  # убираем тире в начале
-            r'^\s*\*\s*', # убираем звездочки в начале
-        ]
-        
-        for pattern in junk_patterns:
-            cleaned_result = re.sub(pattern, '', cleaned_result, flags=re.IGNORECASE | re.MULTILINE)
-        
-        logger.info(f"OneFootball: после очистки: '{cleaned_result[:200]}...'")
-        
-        # Разбиваем на строки
-        lines = [line.strip() for line in cleaned_result.split('\n') if line.strip()]
-        
-        if not lines:
-            logger.error("OneFootball: после очистки не осталось строк")
-            return {
-                'translated_title': f"[ОШИБКА ПАРСИНГА] {title}",
-                'translated_content': "Не удалось распарсить ответ Gemini"
-            }
-        
-        # Первая строка - заголовок
-        translated_title = lines[0].strip()
-        
-        # Остальные строки - описание
-        if len(lines) > 1:
-            translated_content = ' '.join(lines[1:]).strip()
-        else:
-            translated_content = "Детали у повному матеріалі."
-            logger.warning("OneFootball: в ответе только одна строка, используем стандартное описание")
-        
-        # Дополнительная очистка заголовка от остаточного мусора
-        title_cleanup_patterns = [
-            r'^[:\-\*\s]+',  # убираем двоеточия, тире, звездочки в начале
-            r'[:\-\*\s]+$',  # убираем в конце
-        ]
-        
-        for pattern in title_cleanup_patterns:
-            translated_title = re.sub(pattern, '', translated_title).strip()
-        
-        # Дополнительная очистка описания
-        content_cleanup_patterns = [
-            r'^[:\-\*\s]+',
-            r'[:\-\*\s]+$',
-        ]
-        
-        for pattern in content_cleanup_patterns:
-            translated_content = re.sub(pattern, '', translated_content).strip()
-        
-        # Убираем дублирование заголовка в описании
-        if translated_content and translated_title:
-            # Если описание начинается похоже на заголовок
-            title_words = translated_title.lower().split()[:3]  # Первые 3 слова заголовка
-            content_words = translated_content.lower().split()[:3]  # Первые 3 слова описания
-            
-            # Проверяем совпадение
-            matches = sum(1 for t, c in zip(title_words, content_words) if t == c)
-            if matches >= 2:  # Если совпадают 2+ слова
-                logger.info("OneFootball: обнаружено дублирование заголовка в описании")
-                sentences = translated_content.split('. ')
-                if len(sentences) > 1:
-                    translated_content = '. '.join(sentences[1:])
-                    if not translated_content.endswith('.'):
-                        translated_content += '.'
-                else:
-                    translated_content = "Детали розкриті у повному матеріалі."
-        
-        # Финальная проверка
-        if not translated_title:
-            translated_title = f"[ПУСТОЙ ЗАГОЛОВОК] {title}"
-            logger.error("OneFootball: заголовок пустой после очистки")
-        
-        if not translated_content or len(translated_content.strip()) < 10:
-            translated_content = "Детали розкриті у повному матеріалі."
-            logger.warning("OneFootball: описание слишком короткое")
-        
-        # Обрезаем если слишком длинное
-        if len(translated_content) > CONFIG['TELEGRAM_CAPTION_LIMIT']:
-            logger.warning(f"OneFootball: описание слишком длинное ({len(translated_content)} символов)")
-            sentences = translated_content.split('. ')
-            short_content = ""
-            for sentence in sentences:
-                if len(short_content + sentence + '. ') <= CONFIG['TELEGRAM_CAPTION_LIMIT']:
-                    short_content += sentence + '. '
-                else:
-                    break
-            translated_content = short_content.rstrip()
-        
-        result = {
-            'translated_title': translated_title,
-            'translated_content': translated_content
-        }
-        
-        logger.info(f"OneFootball: перевод успешно завершен")
-        logger.info(f"   Заголовок: '{translated_title}'")
-        logger.info(f"   Описание: '{translated_content[:100]}...'")
-        
-        return result
+        return parse_onefootball_translation(raw_result, title)
         
     except Exception as e:
         logger.error(f"OneFootball: ошибка Groq API: {e}", exc_info=True)
@@ -311,6 +329,38 @@ def translate_and_format_onefootball(article_data: Dict[str, Any]) -> Dict[str,
             'translated_content': f"Ошибка перевода: {str(e)}"
         }
 
+def summary_source_text(article_data: Dict[str, Any]) -> str:
+    """Текст статьи для резюме; короткий контент догружается со страницы."""
+    title = article_data.get('title', '')
+    content = article_data.get('content', '')
+    summary = article_data.get('summary', '')
+    url = article_data.get('url', '')
+    if article_data.get('ai_source_text'):
+        return article_data['ai_source_text']
+    if len(content) < 100 and url:
+        logger.info(f"Контент короткий ({len(content)} символов), загружаем полный текст...")
+        content = fetch_full_article_content(url) or summary or title
+        logger.info(f"Загружено {len(content)} символов контента")
+    return content
+
+def finish_summary(summary_result: str, title: str, content: str) -> str:
+    """Убирает из резюме повтор заголовка; если модель вернула только заголовок - обрезанный контент."""
+    # Дополнительная проверка на повторение заголовка
+    if summary_result.lower().startswith(title.lower()[:20]):
+        logger.warning("AI все равно начал с заголовка, убираем первое предложение")
+        sentences = summary_result.split('. ')
+        if len(sentences) > 1:
+            summary_result = '. '.join(sentences[1:])
+            if not summary_result.endswith('.'):
+                summary_result += '.'
+
+    if summary_result.lower() == title.lower():
+        logger.warning("AI вернул только заголовок, используем обрезанный контент")
+        return content[:200] + '...' if len(content) > 200 else content
+
+    logger.info(f"AI обработал контент: {len(summary_result)} символов")
+    return summary_result
+
 def create_enhanced_summary(article_data: Dict[str, Any]) -> str:
     """Создает резюме с использованием Gemini или базовое резюме."""
     source = article_data.get('source', '')
@@ -324,16 +374,11 @@ def create_enhanced_summary(article_data: Dict[str, Any]) -> str:
     title = article_data.get('title', '')
     content = article_data.get('content', '')
     summary = article_data.get('summary', '')
-    url = article_data.get('url', '')
     
     if not has_gemini_key() or not client:
         return create_basic_summary(article_data)
 
-    # Для других источников
-    if len(content) < 100 and url:
-        logger.info(f"Контент короткий ({len(content)} символов), загружаем полный текст...")
-        content = fetch_full_article_content(url) or summary or title
-        logger.info(f"Загружено {len(content)} символов контента")
+    content = summary_source_text(article_data)
 
     if len(content) < 20:
         logger.warning("Недостаточно контента для обработки")
@@ -363,21 +408,7 @@ def create_enhanced_summary(article_data: Dict[str, Any]) -> str:
     try:
         summary_result = _call_grok(prompt).strip()
         
-        # Дополнительная проверка на повторение заголовка
-        if summary_result.lower().startswith(title.lower()[:20]):
-            logger.warning("AI все равно начал с заголовка, убираем первое предложение")
-            sentences = summary_result.split('. ')
-            if len(sentences) > 1:
-                summary_result = '. '.join(sentences[1:])
-                if not summary_result.endswith('.'):
-                    summary_result += '.'
-        
-        if summary_result.lower() == title.lower():
-            logger.warning("AI вернул только заголовок, используем обрезанный контент")
-            return content[:200] + '...' if len(content) > 200 else content
-            
-        logger.info(f"AI обработал контент: {len(summary_result)} символов")
-        return summary_result
+        return finish_summary(summary_result, title, content)
         
     except Exception as e:
         logger.error(f"Ошибка Groq: {e}")
@@ -398,13 +429,14 @@ def format_for_social_media(article_data: Dict[str, Any]) -> str:
     if source == 'OneFootball':
         logger.info("OneFootball: начинаем обработку и перевод...")
         
-        # Переводим статью - ВСЕГДА возвращает словарь
-        translation_result = translate_and_format_onefootball({
+        # Переводим статью - ВСЕГДА возвращает словарь; пакетный перевод уже мог быть готов
+        translation_result = article_data.get('ai_translation') or translate_and_format_onefootball({
             'title': title,
             'content': content,
             'summary': summary,
             'url': url,
-            'source': source
+            'source': source,
+            'ai_source_text': article_data.get('ai_source_text', '')
         })
         
         # translation_result всегда словарь, поэтому этот блок всегда выполнится
@@ -422,13 +454,14 @@ def format_for_social_media(article_data: Dict[str, Any]) -> str:
         return post
     
     # ИСПРАВЛЕННАЯ ОБРАБОТКА ДЛЯ ОБЫЧНЫХ ИСТОЧНИКОВ
-    # Создаем расширенное резюме
-    ai_summary = create_enhanced_summary({
+    # Создаем расширенное резюме (если его не сделала пакетная обработка)
+    ai_summary = article_data.get('ai_summary') or create_enhanced_summary({
         'title': title, 
         'content': content, 
         'summary': summary,
         'url': url, 
         'source': source, 
+        'ai_source_text': article_data.get('ai_source_text', ''),
         'original_content': article_data.get('original_content', ''),
         'processed_content': article_data.get('processed_content', '')
     })
@@ -511,6 +544,164 @@ def format_for_social_media(article_data: Dict[str, Any]) -> str:
     logger.info(f"Готовый пост [{source}]: {len(post)} символов")
     return post
 
+# === Пакетная обработка: несколько статей в одном запросе к модели ===
+
+def _parse_json_array(raw: str) -> list:
+    """JSON-массив из ответа модели; вокруг него бывают пояснения или ```json"""
+    start, end = raw.find('['), raw.rfind(']')
+    if start == -1 or end <= start:
+        return []
+    try:
+        data = json.loads(raw[start:end + 1])
+    except ValueError:
+        return []
+    return data if isinstance(data, list) else []
+
+def _batch_job(article: Dict[str, Any]) -> Dict[str, Any]:
+    """Задание для пакета: вид обработки и исходный текст статьи"""
+    article_data = {
+        'title': article.get('title', ''),
+        'content': article.get('content', ''),
+        'summary': article.get('summary', ''),
+        'url': article.get('url', '') or article.get('link', ''),
+    }
+    if article.get('source') == 'OneFootball':
+        kind, text = 'translate', onefootball_source_text(article_data)
+    else:
+        kind, text = 'summary', summary_source_text(article_data)
+    # Если пакет не разберётся, поштучная обработка возьмёт этот текст без повторной загрузки
+    article['ai_source_text'] = text
+    if len(text) < 20:
+        return {}
+    # Кэш ответов - по каждой статье отдельно: состав пакета от запуска к запуску меняется
+    key = cache_key(LLM_CONFIG['MODEL'], f"batch:{kind}\n{article_data['title']}\n{text}")
+    return {'kind': kind, 'article': article, 'title': article_data['title'], 'text': text, 'key': key}
+
+def _apply_batch_item(job: Dict[str, Any], values: List[str]) -> None:
+    """Кладёт в статью результат её элемента пакета (ai_translation / ai_summary)"""
+    if job['kind'] == 'translate':
+        job['article']['ai_translation'] = parse_onefootball_translation(f"{values[0]}\n{values[1]}", job['title'])
+    else:
+        job['article']['ai_summary'] = finish_summary(values[0], job['title'], job['text'])
+
+def _cached_batch_item(job: Dict[str, Any]) -> bool:
+    """Готовый результат статьи из кэша; False - статью нужно отправить в пакет"""
+    cached = get_dispatcher().lookup(job['key'])
+    try:
+        values = json.loads(cached) if cached else None
+    except ValueError:
+        values = None
+    if not isinstance(values, list) or not all(isinstance(value, str) for value in values):
+        return False
+    _apply_batch_item(job, values)
+    return True
+
+def _pack_batches(jobs: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+    """Пакеты не больше AI_BATCH_SIZE статей и AI_BATCH_MAX_CHARS символов текста"""
+    batches, batch, size = [], [], 0
+    for job in jobs:
+        length = len(job['title']) + len(job['text'])
+        if batch and (len(batch) >= CONFIG['AI_BATCH_SIZE'] or size + length > CONFIG['AI_BATCH_MAX_CHARS']):
+            batches.append(batch)
+            batch, size = [], 0
+        batch.append(job)
+        size += length
+    if batch:
+        batches.append(batch)
+    return batches
+
+def _batch_prompt(kind: str, items: List[Dict[str, Any]]) -> str:
+    news = json.dumps(items, ensure_ascii=False)
+    if kind == 'translate':
+        return f"""Переклади футбольні новини з англійської українською мовою.
+
+На вході JSON-масив новин з полями id, title (англійський заголовок) і text (англійський текст).
+Для кожної новини дай:
+- title: український переклад заголовка
+- description: короткий опис українською (3-5 речень з ключовими фактами, що не повторюють заголовок)
+
+Відповідь - тільки JSON-масив без пояснень і markdown, по одному об'єкту на кожну новину з тим самим id:
+[{{"id": 0, "title": "...", "description": "..."}}]
+
+Новини:
+{news}"""
+    return f"""Ти редактор футбольних новин. Для кожної новини створи КОРОТКИЙ пост для Telegram (макс. {CONFIG['SUMMARY_MAX_WORDS']} слів).
+
+ВАЖЛИВО: НЕ ПОВТОРЮЙ заголовок у пості! Заголовок буде додано окремо.
+
+Правила:
+- Почни відразу з ключових фактів з тексту статті
+- Тільки ключові факти, без прикрас
+- Українською мовою
+- НЕ ПОЧИНАЙ з заголовка або його перефразування
+- Структура: головний факт (1-2 речення), деталі (2-3 речення)
+- Максимум {CONFIG['SUMMARY_MAX_WORDS']} слів
+
+На вході JSON-масив новин з полями id, title (заголовок, НЕ ВИКОРИСТОВУЙ) і text (текст статті).
+Відповідь - тільки JSON-масив без пояснень і markdown, по одному об'єкту на кожну новину з тим самим id:
+[{{"id": 0, "summary": "..."}}]
+
+Новини:
+{news}"""
+
+def _run_batch(batch: List[Dict[str, Any]]) -> int:
+    """Один запрос на пакет; результат кладётся в статьи (ai_translation / ai_summary)
+    и в кэш по ключу каждой статьи.
+
+    Статьи без корректного элемента в ответе остаются без результата и потом
+    обрабатываются поштучно.
+    """
+    kind = batch[0]['kind']
+    fields = ('title', 'description') if kind == 'translate' else ('summary',)
+    items = [{'id': i, 'title': job['title'], 'text': job['text']} for i, job in enumerate(batch)]
+    with llm_priority(batch[0]['article'].get('publish_time')):
+        try:
+            raw_result = _call_grok(_batch_prompt(kind, items), use_cache=False)
+        except Exception as e:
+            logger.error(f"Ошибка пакетного запроса Groq ({len(batch)} статей): {e}")
+            return 0
+    done = 0
+    for item in _parse_json_array(raw_result):
+        index = item.get('id') if isinstance(item, dict) else None
+        if not isinstance(index, int) or not 0 <= index < len(batch):
+            continue
+        values = [item.get(field) for field in fields]
+        if not all(isinstance(value, str) and value.strip() for value in values):
+            continue
+        job = batch[index]
+        values = [value.strip() for value in values]
+        _apply_batch_item(job, values)
+        response = json.dumps(values, ensure_ascii=False)
+        tokens = (len(job['title']) + len(job['text']) + len(response)) // LLM_CONFIG['CHARS_PER_TOKEN']
+        get_dispatcher().remember(job['key'], LLM_CONFIG['MODEL'], response, tokens)
+        done += 1
+    if done < len(batch):
+        logger.warning(f"Пакет Groq: разобрано {done}/{len(batch)} статей, остальные обработаем по одной")
+    return done
+
+def prepare_batched_ai(articles: List[Dict[str, Any]]) -> None:
+    """Переводы и резюме пакетами: вместо запроса на статью - запрос на AI_BATCH_SIZE статей.
+
+    Статьи должны идти в порядке публикации; пакеты отправляются параллельно через очередь llm_dispatch.
+    """
+    if CONFIG['AI_BATCH_SIZE'] < 2 or not articles or not has_gemini_key() or not client:
+        return
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        jobs = [job for job in executor.map(_batch_job, articles) if job]
+    misses = [job for job in jobs if not _cached_batch_item(job)]
+    if len(misses) < len(jobs):
+        logger.info(f"🤖 Пакетная обработка: {len(jobs) - len(misses)} статей взято из кэша")
+    jobs = misses
+    batches = [batch for kind in ('translate', 'summary')
+               for batch in _pack_batches([job for job in jobs if job['kind'] == kind])
+               if len(batch) > 1]  # Одиночную статью обработает обычный путь
+    if not batches:
+        return
+    logger.info(f"🤖 Пакетная обработка: {sum(len(batch) for batch in batches)} статей в {len(batches)} запросах")
+    with ThreadPoolExecutor(max_workers=len(batches)) as executor:
+        done = sum(executor.map(_run_batch, batches))
+    logger.info(f"🤖 Пакетная обработка: готово {done} статей")
+
 def download_image(image_url: str, filename: str = None) -> str:
     """Загружает изображение по URL."""
     if not image_url:
@@ -545,12 +736,15 @@ def process_article_for_posting(article_data: Dict[str, Any]) -> Dict[str, Any]:
     source = article_data.get('source', 'Unknown')
     logger.info(f"Обрабатываем статью [{source}]: {article_data.get('title', '')[:50]}...")
     
-    post_text = format_for_social_media(article_data)
+    with llm_priority(article_data.get('publish_time')):
+        post_text = format_for_social_media(article_data)
     image_path = download_image(article_data.get('image_url', ''))
 
     result = {
         'title': article_data.get('title', ''),
         'post_text': post_text,
+        # Сущности считаются один раз здесь и дальше идут в проверку дубликатов и в posted_news
+        'entities': key_entities(post_text),
         'image_path': image_path,
         'image_url': article_data.get('image_url', ''),
         'url': article_data.get('url', '') or article_data.get('link', ''),
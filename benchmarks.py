@@ -0,0 +1,263 @@
+"""Замеры скорости разбора страниц.
+
+    python benchmarks.py save [N]       - сохранить главную и N статей каждого источника в fixtures/
+    python benchmarks.py parse [файлы]  - время разбора каждой страницы всеми доступными бэкендами
+    python benchmarks.py golden [--update] - сверить чистый текст статей football.ua из fixtures/golden/ с эталоном
+    python benchmarks.py teasers [файлы] - время поиска тизеров на страницах-списках OneFootball
+    python benchmarks.py regex [файлы]  - время регулярных выражений на одну статью (слова, даты, ссылки, сущности)
+    python benchmarks.py dedup          - проверка дубликатов без ключа Groq на эталонных парах постов
+"""
+import asyncio
+import contextlib
+import glob
+import importlib.util
+import io
+import os
+import re
+import sys
+import time
+
+from html_parsing import HTML_BACKEND, make_soup, parse_head
+
+FIXTURES_DIR = 'fixtures'
+# Статьи football.ua с записанным чистым текстом (*.golden.txt) лежат в репозитории;
+# save их не перезаписывает - новые страницы копируются сюда вручную
+GOLDEN_DIR = os.path.join(FIXTURES_DIR, 'golden')
+BACKENDS = ('lxml', 'html.parser', 'html5lib')
+REPEATS = 5
+
+
+def available_backends() -> list:
+    return [name for name in BACKENDS
+            if name == 'html.parser' or importlib.util.find_spec(name) is not None]
+
+
+def fixture_name(source_name: str, kind: str, index: int = 0) -> str:
+    slug = re.sub(r'[^a-z0-9]+', '_', source_name.lower()).strip('_')
+    suffix = f"_{index}" if index else ''
+    return os.path.join(FIXTURES_DIR, f"{slug}_{kind}{suffix}.html")
+
+
+async def save_fixtures(count: int) -> None:
+    from fetcher import get_engine
+    from sources import load_sources
+
+    engine = get_engine()
+    os.makedirs(FIXTURES_DIR, exist_ok=True)
+    try:
+        for source in load_sources():
+            # base_url у обоих парсеров - первая страница-список
+            pages = [(source.parser.base_url, fixture_name(source.name, 'listing'))]
+            links = await source.discover(engine, None)
+            pages += [(link.url, fixture_name(source.name, 'article', i))
+                      for i, link in enumerate(links[:count], 1)]
+            for url, path in pages:
+                result = await engine.fetch(url, use_cache=False)
+                if not result:
+                    print(f"❌ Не удалось загрузить {url}")
+                    continue
+                with open(path, 'w', encoding='utf-8') as f:
+                    f.write(result.text)
+                print(f"💾 {path} <- {url}")
+    finally:
+        await engine.aclose()
+
+
+def timed(func, html: str) -> float:
+    """Лучшее время из REPEATS запусков, мс"""
+    best = float('inf')
+    for _ in range(REPEATS):
+        started = time.perf_counter()
+        func(html)
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def bench_parse(paths: list) -> None:
+    backends = available_backends()
+    print(f"Бэкенд по умолчанию: {HTML_BACKEND}; лучший из {REPEATS} запусков, мс")
+    header = f"{'страница':<40} {'КБ':>6}" + ''.join(f" {name:>12} {name + ' head':>16}" for name in backends)
+    print(header)
+    print('-' * len(header))
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            html = f.read()
+        row = f"{os.path.basename(path):<40} {len(html) / 1024:>6.0f}"
+        for name in backends:
+            full = timed(lambda markup: make_soup(markup, backend=name), html)
+            head = timed(lambda markup: parse_head(markup, backend=name), html)
+            row += f" {full:>12.1f} {head:>16.1f}"
+        print(row)
+
+
+def golden_path(path: str) -> str:
+    return os.path.splitext(path)[0] + '.golden.txt'
+
+
+def check_golden(update: bool) -> int:
+    """Чистый текст каждой статьи football.ua должен совпасть с сохранённым эталоном"""
+    from parser import get_parser
+
+    parser = get_parser()
+    paths = sorted(glob.glob(os.path.join(GOLDEN_DIR, 'football_ua_article_*.html')))
+    if not paths:
+        print(f"Нет статей football.ua в {GOLDEN_DIR}/")
+        return 1
+    failed = 0
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            soup = make_soup(f.read())
+        with contextlib.redirect_stdout(io.StringIO()):
+            started = time.perf_counter()
+            content = parser.extract_clean_article_content(soup)
+            elapsed = (time.perf_counter() - started) * 1000
+        if update:
+            with open(golden_path(path), 'w', encoding='utf-8') as f:
+                f.write(content)
+            print(f"💾 {golden_path(path)} ({len(content)} символов)")
+            continue
+        if not os.path.exists(golden_path(path)):
+            print(f"⚠️ {os.path.basename(path)}: нет эталона - python benchmarks.py golden --update")
+            failed += 1
+            continue
+        with open(golden_path(path), encoding='utf-8') as f:
+            expected = f.read()
+        if content == expected:
+            print(f"✅ {os.path.basename(path)}: совпадает ({elapsed:.1f} мс)")
+        else:
+            failed += 1
+            print(f"❌ {os.path.basename(path)}: отличается от эталона")
+            print(f"   ожидалось: {expected[:200]}")
+            print(f"   получено:  {content[:200]}")
+    return 1 if failed else 0
+
+
+def bench_teasers(paths: list) -> None:
+    """Поиск тизеров селекторами (запасной путь без встроенного JSON)"""
+    import logging
+    from onefootball_parser import get_parser
+
+    logging.disable(logging.INFO)
+    parser = get_parser()
+    print(f"{'страница':<40} {'КБ':>6} {'тизеров':>8} {'мс':>10}")
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            html = f.read()
+        soup = make_soup(html)
+        found = parser.find_news_articles_advanced(soup)
+        elapsed = timed(lambda _: parser.find_news_articles_advanced(soup), html)
+        print(f"{os.path.basename(path):<40} {len(html) / 1024:>6.0f} {len(found):>8} {elapsed:>10.1f}")
+
+
+def bench_regex(paths: list) -> None:
+    """Регулярки, которые работают на каждой статье, без разбора HTML в замере"""
+    import text_utils
+    from parser import get_parser
+
+    parser = get_parser()
+    print(f"{'страница':<40} {'слов':>6} {'слова':>8} {'даты':>8} {'ссылки':>8} {'сущности':>9} {'всего мс':>9}")
+    totals = []
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            soup = make_soup(f.read())
+        with contextlib.redirect_stdout(io.StringIO()):
+            content = parser.extract_clean_article_content(soup)
+        all_text = soup.get_text()
+        hrefs = [a.get('href') for a in soup.find_all('a', href=True)]
+        lowered = text_utils.normalize_whitespace(content).lower()
+
+        def dates(text):
+            for _, pattern in text_utils.TEXT_DATE_PATTERNS:
+                pattern.findall(text)
+
+        def entities(text):
+            for pattern in (text_utils.TEAM_RE, text_utils.PLAYER_UA_RE, text_utils.PLAYER_EN_RE,
+                            text_utils.COMPETITION_RE, text_utils.NUMBER_RE):
+                pattern.findall(text)
+
+        stages = [
+            timed(text_utils.count_meaningful_words, content),
+            timed(dates, all_text),
+            timed(lambda links: [text_utils.is_news_link(href) for href in links], hrefs),
+            timed(entities, lowered),
+        ]
+        totals.append(sum(stages))
+        print(f"{os.path.basename(path):<40} {parser.count_words(content):>6}"
+              + ''.join(f" {value:>8.2f}" for value in stages[:3]) + f" {stages[3]:>9.2f} {totals[-1]:>9.2f}")
+    print(f"В среднем на статью: {sum(totals) / len(totals):.2f} мс")
+
+
+# (опубликованный пост, новый пост, дубликат?) - решение по векторам и fallback без LLM
+DEDUP_CASES = [
+    ("Реал Мадрид у матчі Ліги чемпіонів переміг Ювентус з рахунком 2:0. Голи забили Вінісіус Жуніор "
+     "та Джуд Беллінгем, ліга чемпіонів триває для мадридців без втрат.",
+     "Реал Мадрид втратив Джуда Беллінгема на три тижні через травму гомілки. Реал Мадрид повідомив, "
+     "що хавбек пропустить наступний матч ліга чемпіонів.",
+     False),
+    ("Мохамед Салах оформив дубль, і Ліверпуль переміг Арсенал з рахунком 3:1 у матчі Прем'єр-ліги на Енфілді.",
+     "Ліверпуль переміг Арсенал 3:1 у матчі Прем'єр-ліги на Енфілді, Мохамед Салах оформив дубль.",
+     True),
+    ("Барселона домовилася з Жироною про оренду захисника до кінця сезону з правом викупу.",
+     "Баварія звільнила головного тренера після поразки в Кубку Німеччини.",
+     False),
+]
+
+
+def check_dedup() -> int:
+    """Проверка дубликатов в режиме без ключа Groq: векторы и fallback по сущностям"""
+    import ai_content_checker
+    from ai_content_checker import DedupContext
+
+    ai_content_checker.GROQ_API_KEY = None
+    failed = 0
+    for i, (posted, new_text, expected) in enumerate(DEDUP_CASES, 1):
+        context = DedupContext()
+        context.add(posted)
+        with contextlib.redirect_stdout(io.StringIO()):
+            verdict = context.is_duplicate({'title': new_text[:60], 'post_text': new_text})
+        if verdict == expected:
+            print(f"✅ Пара {i}: {'дубликат' if verdict else 'разные новости'}")
+        else:
+            failed += 1
+            print(f"❌ Пара {i}: ожидалось {'дубликат' if expected else 'разные новости'}")
+            print(f"   было:  {posted[:100]}")
+            print(f"   новое: {new_text[:100]}")
+    return 1 if failed else 0
+
+
+def main(argv: list) -> int:
+    command = argv[0] if argv else 'parse'
+    if command == 'save':
+        asyncio.run(save_fixtures(int(argv[1]) if len(argv) > 1 else 3))
+        return 0
+    if command == 'parse':
+        paths = argv[1:] or sorted(glob.glob(os.path.join(FIXTURES_DIR, '*.html')))
+        if not paths:
+            print(f"Нет страниц в {FIXTURES_DIR}/ - сначала: python benchmarks.py save")
+            return 1
+        bench_parse(paths)
+        return 0
+    if command == 'teasers':
+        paths = argv[1:] or sorted(glob.glob(os.path.join(FIXTURES_DIR, 'onefootball_listing*.html')))
+        if not paths:
+            print(f"Нет страниц OneFootball в {FIXTURES_DIR}/ - сначала: python benchmarks.py save")
+            return 1
+        bench_teasers(paths)
+        return 0
+    if command == 'regex':
+        paths = argv[1:] or sorted(glob.glob(os.path.join(FIXTURES_DIR, '*_article_*.html')))
+        if not paths:
+            print(f"Нет статей в {FIXTURES_DIR}/ - сначала: python benchmarks.py save")
+            return 1
+        bench_regex(paths)
+        return 0
+    if command == 'dedup':
+        return check_dedup()
+    if command == 'golden':
+        return check_golden('--update' in argv[1:])
+    print(__doc__)
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -1,7 +1,9 @@
+import json
 import sqlite3
 import os
+import threading
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Iterable, List, Optional
 from zoneinfo import ZoneInfo
 
 # Киевское время
@@ -42,6 +44,72 @@ CREATE TABLE IF NOT EXISTS bot_runs (
     last_run TIMESTAMP
 )
 """)
+# Результаты разбора статей по URL: повторно встреченная ссылка не загружается заново
+cursor.execute("""
+CREATE TABLE IF NOT EXISTS article_cache (
+    url TEXT PRIMARY KEY,
+    source TEXT,
+    status TEXT,
+    title TEXT,
+    content TEXT,
+    summary TEXT,
+    image_url TEXT,
+    publish_time TEXT,
+    word_count INTEGER,
+    extra TEXT,
+    checked_at TIMESTAMP
+)
+""")
+# Небольшое состояние источников между запусками (например, какой URL ответил последним)
+cursor.execute("""
+CREATE TABLE IF NOT EXISTS source_state (
+    source TEXT,
+    key TEXT,
+    value TEXT,
+    updated_at TIMESTAMP,
+    PRIMARY KEY (source, key)
+)
+""")
+# Ответы LLM по хэшу модели и промпта: повторный запуск не платит за тот же перевод
+cursor.execute("""
+CREATE TABLE IF NOT EXISTS llm_cache (
+    key TEXT PRIMARY KEY,
+    model TEXT,
+    response TEXT,
+    tokens INTEGER,
+    created_at REAL,
+    used_at REAL
+)
+""")
+# LSH-корзины MinHash-сигнатур опубликованных постов: поиск похожих без перебора истории
+cursor.execute("""
+CREATE TABLE IF NOT EXISTS lsh_buckets (
+    band TEXT,
+    title TEXT,
+    PRIMARY KEY (band, title)
+)
+""")
+cursor.execute("CREATE INDEX IF NOT EXISTS idx_lsh_buckets_title ON lsh_buckets (title)")
+# Обратный индекс сущностей (команды, игроки) -> посты с ними
+cursor.execute("""
+CREATE TABLE IF NOT EXISTS entity_index (
+    entity TEXT,
+    title TEXT,
+    PRIMARY KEY (entity, title)
+)
+""")
+cursor.execute("CREATE INDEX IF NOT EXISTS idx_entity_index_title ON entity_index (title)")
+# Локальная копия постов канала из getUpdates; смещение update_id хранится в source_state
+cursor.execute("""
+CREATE TABLE IF NOT EXISTS channel_posts (
+    chat_id TEXT,
+    message_id INTEGER,
+    text TEXT,
+    posted_at TEXT,
+    PRIMARY KEY (chat_id, message_id)
+)
+""")
+cursor.execute("CREATE INDEX IF NOT EXISTS idx_channel_posts_posted_at ON channel_posts (chat_id, posted_at)")
 
 # Обновление схемы (если старые версии)
 try:
@@ -54,6 +122,24 @@ try:
     conn.commit()
 except sqlite3.OperationalError:
     pass
+try:
+    # Вектор текста поста (dedup.text_vector в JSON) - для поиска дубликатов без пересчёта
+    cursor.execute("ALTER TABLE posted_news ADD COLUMN vector TEXT")
+    conn.commit()
+except sqlite3.OperationalError:
+    pass
+try:
+    # MinHash-сигнатура текста поста (JSON); её полосы лежат в lsh_buckets
+    cursor.execute("ALTER TABLE posted_news ADD COLUMN minhash TEXT")
+    conn.commit()
+except sqlite3.OperationalError:
+    pass
+try:
+    # Сущности поста (dedup.key_entities в JSON), чтобы не извлекать их при каждой проверке
+    cursor.execute("ALTER TABLE posted_news ADD COLUMN entities TEXT")
+    conn.commit()
+except sqlite3.OperationalError:
+    pass
 
 conn.commit()
 
@@ -63,16 +149,54 @@ def is_already_posted(title: str) -> bool:
     cursor.execute("SELECT 1 FROM posted_news WHERE title = ?", (title,))
     return cursor.fetchone() is not None
 
-def save_posted(title: str, post_text: Optional[str] = None) -> None:
-    """Сохраняет публикацию (заголовок + текст)"""
+def save_posted(title: str, post_text: Optional[str] = None, vector: Optional[str] = None,
+                entities: Optional[str] = None, entity_keys: Iterable[str] = ()) -> None:
+    """Сохраняет публикацию: заголовок, текст, его вектор и сущности для проверки дубликатов"""
     kiev_now = now_kiev()
     cursor.execute(
-        "INSERT OR REPLACE INTO posted_news (title, post_text, posted_at) VALUES (?, ?, ?)",
-        (title, post_text, kiev_now.isoformat())
+        "INSERT OR REPLACE INTO posted_news (title, post_text, posted_at, vector) VALUES (?, ?, ?, ?)",
+        (title, post_text, kiev_now.isoformat(), vector)
     )
+    if entities is not None:
+        save_posted_entities(title, entities, entity_keys)
     conn.commit()
     print(f"💾 Сохранена запись о публикации в {format_kiev_time(kiev_now)}: {title[:50]}...")
 
+def save_posted_minhash(title: str, minhash: str, bands: List[str]) -> None:
+    """Сигнатура поста и его LSH-корзины (старые корзины того же заголовка заменяются)"""
+    cursor.execute("UPDATE posted_news SET minhash = ? WHERE title = ?", (minhash, title))
+    cursor.execute("DELETE FROM lsh_buckets WHERE title = ?", (title,))
+    cursor.executemany("INSERT OR IGNORE INTO lsh_buckets (band, title) VALUES (?, ?)",
+                       [(band, title) for band in bands])
+    conn.commit()
+
+def save_posted_entities(title: str, entities: str, entity_keys: Iterable[str]) -> None:
+    """Сущности поста и его строки в обратном индексе"""
+    cursor.execute("UPDATE posted_news SET entities = ? WHERE title = ?", (entities, title))
+    cursor.execute("DELETE FROM entity_index WHERE title = ?", (title,))
+    cursor.executemany("INSERT OR IGNORE INTO entity_index (entity, title) VALUES (?, ?)",
+                       [(key, title) for key in entity_keys])
+    conn.commit()
+
+def find_posted_candidates(bands: List[str], entity_keys: List[str], since_time: datetime) -> list:
+    """Посты не старше since_time с общей LSH-корзиной или общей сущностью"""
+    if not bands and not entity_keys:
+        return []
+    cursor.execute(
+        "SELECT title, post_text, posted_at, vector, entities FROM posted_news WHERE posted_at >= ? AND ("
+        f"title IN (SELECT title FROM lsh_buckets WHERE band IN ({','.join('?' * len(bands))})) OR "
+        f"title IN (SELECT title FROM entity_index WHERE entity IN ({','.join('?' * len(entity_keys))}))"
+        ") ORDER BY posted_at DESC",
+        (to_kiev_time(since_time).isoformat(), *bands, *entity_keys)
+    )
+    return cursor.fetchall()
+
+def get_unindexed_posts(since_time: datetime) -> list:
+    """Посты без сигнатуры или сущностей - сохранены до появления индексов"""
+    cursor.execute("SELECT title, post_text FROM posted_news WHERE (minhash IS NULL OR entities IS NULL) "
+                   "AND posted_at >= ?", (to_kiev_time(since_time).isoformat(),))
+    return cursor.fetchall()
+
 def get_last_run_time() -> Optional[datetime]:
     cursor.execute("SELECT last_run FROM bot_runs ORDER BY id DESC LIMIT 1")
     result = cursor.fetchone()
@@ -100,10 +224,138 @@ def update_last_run_time() -> None:
 def cleanup_old_posts(days: int = 7) -> None:
     cutoff_date_kiev = now_kiev() - timedelta(days=days)
     cursor.execute("DELETE FROM posted_news WHERE posted_at < ?", (cutoff_date_kiev.isoformat(),))
-    conn.commit()
     deleted_count = cursor.rowcount
+    cursor.execute("DELETE FROM lsh_buckets WHERE title NOT IN (SELECT title FROM posted_news)")
+    cursor.execute("DELETE FROM entity_index WHERE title NOT IN (SELECT title FROM posted_news)")
+    cursor.execute("DELETE FROM channel_posts WHERE posted_at < ?", (cutoff_date_kiev.isoformat(),))
+    conn.commit()
     if deleted_count > 0:
         print(f"🧹 Очищено {deleted_count} старых записей о постах (старше {days} дней)")
+    cursor.execute("DELETE FROM article_cache WHERE checked_at < ?", (cutoff_date_kiev.isoformat(),))
+    conn.commit()
+
+def get_cached_article(url: str) -> Optional[dict]:
+    """Возвращает сохранённый результат разбора статьи по URL"""
+    cursor.execute(
+        "SELECT url, source, status, title, content, summary, image_url, publish_time, word_count, extra "
+        "FROM article_cache WHERE url = ?", (url,)
+    )
+    row = cursor.fetchone()
+    if not row:
+        return None
+    url, source, status, title, content, summary, image_url, publish_time, word_count, extra = row
+    try:
+        publish_dt = to_kiev_time(datetime.fromisoformat(publish_time)) if publish_time else None
+    except ValueError:
+        publish_dt = None
+    try:
+        extra_data = json.loads(extra) if extra else {}
+    except ValueError:
+        extra_data = {}
+    return {
+        'url': url,
+        'source': source,
+        'status': status,
+        'title': title or '',
+        'content': content or '',
+        'summary': summary or '',
+        'image_url': image_url or '',
+        'publish_time': publish_dt,
+        'word_count': word_count,
+        'extra': extra_data,
+    }
+
+def save_cached_article(url: str, source: str, status: str, title: str = '', content: str = '',
+                        summary: str = '', image_url: str = '', publish_time: Optional[datetime] = None,
+                        word_count: Optional[int] = None, extra: Optional[dict] = None) -> None:
+    """Сохраняет результат разбора статьи (принята, старая, слишком длинная)"""
+    cursor.execute(
+        "INSERT OR REPLACE INTO article_cache "
+        "(url, source, status, title, content, summary, image_url, publish_time, word_count, extra, checked_at) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        (url, source, status, title, content, summary, image_url,
+         to_kiev_time(publish_time).isoformat() if publish_time else None,
+         word_count, json.dumps(extra, ensure_ascii=False) if extra else None, now_kiev().isoformat())
+    )
+    conn.commit()
+
+def mark_article_posted(url: str) -> None:
+    """Помечает статью как опубликованную - в следующих циклах её ссылка пропускается сразу"""
+    if not url:
+        return
+    cursor.execute("UPDATE article_cache SET status = 'posted', checked_at = ? WHERE url = ?",
+                   (now_kiev().isoformat(), url))
+    if cursor.rowcount == 0:
+        cursor.execute("INSERT INTO article_cache (url, status, checked_at) VALUES (?, 'posted', ?)",
+                       (url, now_kiev().isoformat()))
+    conn.commit()
+
+def get_source_state(source: str, key: str) -> Optional[str]:
+    cursor.execute("SELECT value FROM source_state WHERE source = ? AND key = ?", (source, key))
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+def set_source_state(source: str, key: str, value: str) -> None:
+    cursor.execute(
+        "INSERT OR REPLACE INTO source_state (source, key, value, updated_at) VALUES (?, ?, ?, ?)",
+        (source, key, value, now_kiev().isoformat())
+    )
+    conn.commit()
+
+def save_channel_posts(posts: List[tuple]) -> None:
+    """Посты канала (chat_id, message_id, text, posted_at); отредактированные перезаписываются"""
+    cursor.executemany(
+        "INSERT OR REPLACE INTO channel_posts (chat_id, message_id, text, posted_at) VALUES (?, ?, ?, ?)",
+        [(str(chat_id), message_id, text, to_kiev_time(posted_at).isoformat())
+         for chat_id, message_id, text, posted_at in posts]
+    )
+    conn.commit()
+
+def get_channel_posts(chat_id: str, since_time: Optional[datetime] = None, limit: Optional[int] = None) -> list:
+    """Последние посты канала из локальной копии: (message_id, text, posted_at); limit=None - все"""
+    since = to_kiev_time(since_time).isoformat() if since_time else ''
+    cursor.execute(
+        "SELECT message_id, text, posted_at FROM channel_posts WHERE chat_id = ? AND posted_at >= ? "
+        "ORDER BY posted_at DESC LIMIT ?",
+        (str(chat_id), since, limit or -1)
+    )
+    return cursor.fetchall()
+
+# Кэш LLM читается из рабочих потоков обработки статей - отдельные курсоры под общим замком
+_llm_cache_lock = threading.Lock()
+
+def get_llm_response(key: str, max_age: float) -> Optional[tuple]:
+    """(ответ, токены) из кэша LLM, если запись моложе max_age секунд"""
+    now = datetime.now().timestamp()
+    with _llm_cache_lock:
+        row = conn.execute("SELECT response, tokens FROM llm_cache WHERE key = ? AND created_at >= ?",
+                           (key, now - max_age)).fetchone()
+        if row:
+            conn.execute("UPDATE llm_cache SET used_at = ? WHERE key = ?", (now, key))
+            conn.commit()
+    return row
+
+def save_llm_response(key: str, model: str, response: str, tokens: int) -> None:
+    now = datetime.now().timestamp()
+    with _llm_cache_lock:
+        conn.execute(
+            "INSERT OR REPLACE INTO llm_cache (key, model, response, tokens, created_at, used_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (key, model, response, tokens, now, now)
+        )
+        conn.commit()
+
+def evict_llm_cache(max_age: float, max_entries: int) -> int:
+    """Удаляет устаревшие ответы и самые давно использованные сверх max_entries"""
+    with _llm_cache_lock:
+        deleted = conn.execute("DELETE FROM llm_cache WHERE created_at < ?",
+                               (datetime.now().timestamp() - max_age,)).rowcount
+        deleted += conn.execute(
+            "DELETE FROM llm_cache WHERE key NOT IN (SELECT key FROM llm_cache ORDER BY used_at DESC LIMIT ?)",
+            (max_entries,)
+        ).rowcount
+        conn.commit()
+    return deleted
 
 def get_posted_news_since(since_time: datetime) -> list:
     since_time_kiev = to_kiev_time(since_time)
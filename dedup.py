@@ -0,0 +1,206 @@
+import hashlib
+import json
+import math
+import random
+import zlib
+from collections import Counter, defaultdict
+from functools import lru_cache
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+
+from text_utils import (COMPETITION_RE, FOOTBALL_STOP_WORDS, HASHTAG_RE, HTML_TAG_RE, NUMBER_RE, PLAYER_EN_RE,
+                        PLAYER_UA_RE, TEAM_MENTION_RE, TEAM_RE, WORD_RE, clean_text_for_comparison)
+
+# Векторы текстов для поиска дубликатов без LLM: хэшированные основы слов и пары соседних основ
+CONFIG = {
+    'DIMENSIONS': 1 << 20,      # Размер хэш-пространства признаков
+    'STEM_LENGTH': 6,           # Основа слова: первые символы, чтобы "Реал" и "Реалу" совпали
+    'DUPLICATE_SCORE': 0.8,     # Косинус не ниже - дубликат без вопроса к LLM
+    'BORDERLINE_SCORE': 0.3,    # Косинус ниже - разные новости без вопроса к LLM
+    'MAX_LLM_CANDIDATES': 5,    # Сколько пограничных текстов показывать LLM
+    # MinHash/LSH для поиска по истории: 32 полосы по 2 значения. Тексты с долей общих
+    # признаков 0.3 попадают в кандидаты с вероятностью ~95%, 0.1 - ~27%
+    'MINHASH_BANDS': 32,
+    'MINHASH_ROWS': 2,
+    # Какую статью из группы дубликатов публиковать: сначала по источнику (больше - лучше)
+    'SOURCE_PRIORITY': {'Football.ua': 2, 'OneFootball': 1},
+}
+
+_MINHASH_PRIME = (1 << 61) - 1
+# Фиксированное зерно: сигнатуры в базе должны совпадать между запусками
+_rng = random.Random(20240601)
+_MINHASH_PARAMS = [(_rng.randrange(1, _MINHASH_PRIME), _rng.randrange(_MINHASH_PRIME))
+                   for _ in range(CONFIG['MINHASH_BANDS'] * CONFIG['MINHASH_ROWS'])]
+
+Vector = Dict[int, float]
+Entities = Dict[str, FrozenSet[str]]
+
+# Сущности, по которым строится обратный индекс постов
+INDEXED_ENTITY_KINDS = ('teams', 'players')
+
+
+def _features(text: str) -> List[str]:
+    text = HASHTAG_RE.sub(' ', HTML_TAG_RE.sub(' ', text)).lower()
+    stems = [word[:CONFIG['STEM_LENGTH']] for word in WORD_RE.findall(text)
+             if len(word) > 2 and not word.isdigit() and word not in FOOTBALL_STOP_WORDS]
+    return stems + [f"{first} {second}" for first, second in zip(stems, stems[1:])]
+
+
+@lru_cache(maxsize=4096)
+def text_vector(text: str) -> Vector:
+    """Нормированный вектор текста (разреженный: индекс признака -> вес). Результат не изменять"""
+    counts = Counter(zlib.crc32(feature.encode('utf-8')) % CONFIG['DIMENSIONS'] for feature in _features(text))
+    weights = {index: 1 + math.log(count) for index, count in counts.items()}
+    norm = math.sqrt(sum(weight * weight for weight in weights.values()))
+    return {index: weight / norm for index, weight in weights.items()} if norm else {}
+
+
+@lru_cache(maxsize=4096)
+def minhash_signature(text: str) -> Tuple[int, ...]:
+    """MinHash по множеству признаков текста; пустой кортеж, если признаков нет"""
+    shingles = {zlib.crc32(feature.encode('utf-8')) for feature in _features(text)}
+    if not shingles:
+        return ()
+    return tuple(min((a * shingle + b) % _MINHASH_PRIME for shingle in shingles) for a, b in _MINHASH_PARAMS)
+
+
+def lsh_bands(signature: Tuple[int, ...]) -> List[str]:
+    """Ключи LSH-корзин: номер полосы и хэш её значений"""
+    rows = CONFIG['MINHASH_ROWS']
+    bands = []
+    for band in range(len(signature) // rows):
+        values = ','.join(map(str, signature[band * rows:(band + 1) * rows]))
+        bands.append(f"{band}:{hashlib.blake2b(values.encode(), digest_size=8).hexdigest()}")
+    return bands
+
+
+@lru_cache(maxsize=4096)
+def key_entities(text: str) -> Entities:
+    """Команды, игроки, турниры и числа из текста поста (в нижнем регистре). Результат не изменять.
+
+    Игроки ищутся до приведения к нижнему регистру: шаблон имени опирается на заглавные буквы.
+    Пары слов с названием клуба или турнира ("Реал Мадрид", "Ліга Чемпіонів") игроками не считаются.
+    """
+    clean_text = clean_text_for_comparison(text)
+    lowered = clean_text.lower()
+    names = (name.lower() for pattern in (PLAYER_UA_RE, PLAYER_EN_RE) for name in pattern.findall(clean_text))
+    return {
+        'teams': frozenset(TEAM_RE.findall(lowered)),
+        'players': frozenset(name for name in names
+                             if not TEAM_MENTION_RE.search(name) and not COMPETITION_RE.search(name)),
+        'competitions': frozenset(COMPETITION_RE.findall(lowered)),
+        'numbers': frozenset(NUMBER_RE.findall(lowered)),
+    }
+
+
+def entities_to_json(entities: Entities) -> str:
+    return json.dumps({kind: sorted(values) for kind, values in entities.items()}, ensure_ascii=False)
+
+
+def entities_from_json(raw: Optional[str]) -> Optional[Entities]:
+    try:
+        return {kind: frozenset(values) for kind, values in json.loads(raw).items()} if raw else None
+    except (ValueError, TypeError, AttributeError):
+        return None
+
+
+def entity_keys(entities: Entities) -> List[str]:
+    """Ключи обратного индекса: 'teams:реал', 'players:мохамед салах'"""
+    return [f"{kind}:{value}" for kind in INDEXED_ENTITY_KINDS for value in sorted(entities.get(kind, ()))]
+
+
+def shares_team_and_player(first: Entities, second: Entities) -> bool:
+    """Общие и команда, и игрок - по fallback-проверке это уже заметный риск дубликата"""
+    return bool(first['teams'] & second['teams']) and bool(first['players'] & second['players'])
+
+
+def cosine(first: Vector, second: Vector) -> float:
+    if len(first) > len(second):
+        first, second = second, first
+    return sum(weight * second.get(index, 0.0) for index, weight in first.items())
+
+
+def vector_to_json(vector: Vector) -> str:
+    return json.dumps([[index, round(weight, 5)] for index, weight in vector.items()], separators=(',', ':'))
+
+
+def vector_from_json(raw: Optional[str]) -> Optional[Vector]:
+    try:
+        return {int(index): float(weight) for index, weight in json.loads(raw)} if raw else None
+    except (ValueError, TypeError):
+        return None
+
+
+class VectorIndex:
+    """Векторы набора текстов с обратным индексом по признакам.
+
+    Сходство нового текста со всеми сохранёнными считается за один проход по спискам
+    его признаков: тексты без общих признаков не просматриваются вовсе.
+    """
+
+    def __init__(self):
+        self.items: List[Any] = []
+        self._postings: Dict[int, List[Tuple[int, float]]] = defaultdict(list)
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def add(self, item: Any, vector: Vector) -> None:
+        position = len(self.items)
+        self.items.append(item)
+        for index, weight in vector.items():
+            self._postings[index].append((position, weight))
+
+    def search(self, vector: Vector) -> List[Tuple[float, Any]]:
+        """(косинус, элемент) для всех текстов с общими признаками, по убыванию сходства"""
+        scores = defaultdict(float)
+        for index, weight in vector.items():
+            for position, other_weight in self._postings.get(index, ()):
+                scores[position] += weight * other_weight
+        ranked = sorted(scores.items(), key=lambda pair: pair[1], reverse=True)
+        return [(score, self.items[position]) for position, score in ranked]
+
+
+def triage(matches: List[Tuple[float, Any]], related=()) -> Tuple[str, List[Tuple[float, Any]]]:
+    """Решение по векторам: 'duplicate', 'unique' или 'borderline' со списком кандидатов для LLM.
+
+    Элементы из related (например, с общими командой и игроком) считаются пограничными
+    даже при низком косинусе.
+    """
+    if matches and matches[0][0] >= CONFIG['DUPLICATE_SCORE']:
+        return 'duplicate', matches[:1]
+    borderline = [match for match in matches if match[0] >= CONFIG['BORDERLINE_SCORE'] or match[1] in related]
+    if not borderline:
+        return 'unique', []
+    return 'borderline', borderline[:CONFIG['MAX_LLM_CANDIDATES']]
+
+
+def quality_score(article: Dict[str, Any]) -> Tuple[int, bool, int]:
+    """Чем больше, тем лучше представитель группы: источник, наличие картинки, длина поста"""
+    return (CONFIG['SOURCE_PRIORITY'].get(article.get('source', ''), 0),
+            bool(article.get('image_path') or article.get('image_url')),
+            len(article.get('post_text') or ''))
+
+
+class Clusters:
+    """Группы дубликатов по номерам элементов (система непересекающихся множеств)"""
+
+    def __init__(self, size: int):
+        self._parent = list(range(size))
+
+    def find(self, item: int) -> int:
+        while self._parent[item] != item:
+            self._parent[item] = self._parent[self._parent[item]]
+            item = self._parent[item]
+        return self._parent[item]
+
+    def union(self, first: int, second: int) -> None:
+        first, second = self.find(first), self.find(second)
+        if first != second:
+            self._parent[max(first, second)] = min(first, second)
+
+    def groups(self) -> List[List[int]]:
+        """Группы в порядке первого элемента, элементы внутри - по возрастанию"""
+        groups = defaultdict(list)
+        for item in range(len(self._parent)):
+            groups[self.find(item)].append(item)
+        return sorted(groups.values())
@@ -0,0 +1,49 @@
+import glob
+import hashlib
+import logging
+import os
+import re
+import sys
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Страницы, на которых парсер ничего не нашёл: их можно разобрать офлайн через benchmarks.py
+FAILURES_DIR = os.path.join(os.path.dirname(__file__), 'fixtures', 'failures')
+MAX_DUMPS = 20
+
+
+def enabled() -> bool:
+    """Режим диагностики: флаг --diagnostics или NEWS_DIAGNOSTICS=1"""
+    return ('--diagnostics' in sys.argv[1:]
+            or os.getenv('NEWS_DIAGNOSTICS', '').lower() in ('1', 'true', 'yes', 'on'))
+
+
+def snapshot(describe: Callable[[], None]) -> None:
+    """Снимок структуры страницы в лог; describe вызывается только в режиме диагностики"""
+    if enabled():
+        describe()
+
+
+def dump_page(source: str, url: str, html: str, reason: str) -> Optional[str]:
+    """Сохраняет исходный HTML страницы в FAILURES_DIR.
+
+    Имя файла зависит от содержимого, поэтому одна и та же страница не копится
+    от цикла к циклу; хранятся только MAX_DUMPS последних файлов.
+    """
+    try:
+        os.makedirs(FAILURES_DIR, exist_ok=True)
+        slug = re.sub(r'[^a-z0-9]+', '_', source.lower()).strip('_')
+        digest = hashlib.sha1(html.encode('utf-8', 'replace')).hexdigest()[:10]
+        path = os.path.join(FAILURES_DIR, f"{slug}_{digest}.html")
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(f"<!-- {url} | {reason} -->\n")
+            f.write(html)
+        dumps = sorted(glob.glob(os.path.join(FAILURES_DIR, '*.html')), key=os.path.getmtime)
+        for old_path in dumps[:-MAX_DUMPS]:
+            os.remove(old_path)
+        logger.info(f"🔍 HTML сохранен для отладки: {path} ({reason})")
+        return path
+    except OSError as e:
+        logger.warning(f"⚠️ Не удалось сохранить страницу для отладки: {e}")
+        return None
@@ -0,0 +1,391 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Optional
+from urllib.parse import urlparse
+
+import httpx
+
+try:
+    import h2  # noqa: F401 - нужен httpx для HTTP/2
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Конфигурация
+CONFIG = {
+    'DEFAULT_HEADERS': {
+        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+                      "AppleWebKit/537.36 (KHTML, like Gecko) "
+                      "Chrome/120.0.0.0 Safari/537.36",
+        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    },
+    'TIMEOUT': 20,
+    'RETRY_ATTEMPTS': 2,
+    'RETRY_DELAY': 1,
+    'MAX_CONNECTIONS': 50,        # Всего соединений в пуле
+    'MAX_KEEPALIVE': 20,          # Из них держим открытыми между запросами
+    'KEEPALIVE_EXPIRY': 120,      # Секунд простоя до закрытия keep-alive соединения
+    'CACHE_DIR': os.path.join(os.path.dirname(__file__), "http_cache"),
+    'CACHE_MAX_AGE': 2 * 24 * 3600,       # Записи старше двух суток удаляются
+    'CACHE_MAX_SIZE': 50 * 1024 * 1024,   # Общий размер кэша на диске
+    'STREAM_PROBE_LIMIT': 64 * 1024,      # Сколько символов начала страницы показывать stop_when
+}
+
+MAX_AGE_RE = re.compile(r'max-age=(\d+)')
+
+
+@dataclass(frozen=True)
+class SourceBudget:
+    """Бюджет источника: сколько запросов к хосту одновременно и как часто"""
+    max_concurrency: int = 2
+    requests_per_second: float = 1.0
+    burst: int = 1  # Сколько запросов можно сделать подряд без ожидания
+
+
+@dataclass
+class FetchResult:
+    """Ответ сервера, общий для всех источников"""
+    url: str
+    status: int
+    text: str
+    headers: Dict[str, str] = field(default_factory=dict)
+    http_version: str = ''
+    from_cache: bool = False      # Тело взято из дискового кэша (304 или свежая запись)
+    not_modified: bool = False    # Сервер ответил 304 - страница не менялась
+    truncated: bool = False       # Загрузка прервана по stop_when, text - только начало страницы
+
+    @property
+    def validator(self) -> str:
+        """ETag или Last-Modified - по ним можно понять, что страница та же"""
+        return self.headers.get('etag') or self.headers.get('last-modified') or ''
+
+
+class HttpCache:
+    """Дисковый HTTP-кэш по URL с условными запросами (ETag / Last-Modified).
+
+    Для каждого URL хранится тело и заголовки-валидаторы. При следующем запросе
+    отправляются If-None-Match / If-Modified-Since, и ответ 304 отдаётся из кэша.
+    Записи удаляются по возрасту и по общему размеру кэша.
+    """
+
+    def __init__(self, directory: str = CONFIG['CACHE_DIR'],
+                 max_age: float = CONFIG['CACHE_MAX_AGE'],
+                 max_size: int = CONFIG['CACHE_MAX_SIZE']):
+        self.directory = directory
+        self.max_age = max_age
+        self.max_size = max_size
+        self.stats = {'hits': 0, 'misses': 0, 'not_modified': 0}
+
+    def reset_stats(self) -> None:
+        self.stats = {'hits': 0, 'misses': 0, 'not_modified': 0}
+
+    def _paths(self, url: str):
+        key = hashlib.sha1(url.encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, key + '.json'), os.path.join(self.directory, key + '.body')
+
+    def load(self, url: str) -> Optional[dict]:
+        meta_path, body_path = self._paths(url)
+        try:
+            with open(meta_path, encoding='utf-8') as f:
+                entry = json.load(f)
+            with open(body_path, encoding='utf-8') as f:
+                entry['text'] = f.read()
+        except (OSError, ValueError):
+            return None
+        if time.time() - entry.get('stored_at', 0) > self.max_age:
+            return None
+        return entry
+
+    def is_fresh(self, entry: dict) -> bool:
+        """Запись ещё свежая по Cache-Control: max-age - можно не ходить в сеть"""
+        cache_control = entry.get('headers', {}).get('cache-control', '')
+        if 'no-cache' in cache_control:
+            return False
+        match = MAX_AGE_RE.search(cache_control)
+        return bool(match) and time.time() - entry.get('stored_at', 0) < int(match.group(1))
+
+    def conditional_headers(self, entry: dict) -> Dict[str, str]:
+        headers = {}
+        cached_headers = entry.get('headers', {})
+        if cached_headers.get('etag'):
+            headers['If-None-Match'] = cached_headers['etag']
+        if cached_headers.get('last-modified'):
+            headers['If-Modified-Since'] = cached_headers['last-modified']
+        return headers
+
+    def store(self, url: str, result: FetchResult) -> None:
+        headers = {k.lower(): v for k, v in result.headers.items()}
+        if 'no-store' in headers.get('cache-control', ''):
+            return
+        if not (headers.get('etag') or headers.get('last-modified') or MAX_AGE_RE.search(headers.get('cache-control', ''))):
+            return
+        kept = {k: headers[k] for k in ('etag', 'last-modified', 'cache-control', 'content-type') if k in headers}
+        meta_path, body_path = self._paths(url)
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(body_path, 'w', encoding='utf-8') as f:
+                f.write(result.text)
+            with open(meta_path, 'w', encoding='utf-8') as f:
+                json.dump({'url': url, 'final_url': result.url, 'status': result.status,
+                           'headers': kept, 'stored_at': time.time()}, f)
+        except OSError as e:
+            logger.warning(f"⚠️ Не удалось сохранить {url} в HTTP-кэш: {e}")
+
+    def touch(self, url: str) -> None:
+        """Страница подтверждена ответом 304 - продлеваем жизнь записи"""
+        meta_path, _ = self._paths(url)
+        try:
+            with open(meta_path, encoding='utf-8') as f:
+                meta = json.load(f)
+            meta['stored_at'] = time.time()
+            with open(meta_path, 'w', encoding='utf-8') as f:
+                json.dump(meta, f)
+        except (OSError, ValueError):
+            pass
+
+    def evict(self) -> int:
+        """Удаляет устаревшие записи, затем самые старые - пока кэш не влезет в лимит"""
+        if not os.path.isdir(self.directory):
+            return 0
+        entries = []
+        removed = 0
+        now = time.time()
+        for name in os.listdir(self.directory):
+            if not name.endswith('.json'):
+                continue
+            meta_path = os.path.join(self.directory, name)
+            body_path = meta_path[:-len('.json')] + '.body'
+            try:
+                with open(meta_path, encoding='utf-8') as f:
+                    stored_at = json.load(f).get('stored_at', 0)
+                size = os.path.getsize(meta_path) + (os.path.getsize(body_path) if os.path.exists(body_path) else 0)
+            except (OSError, ValueError):
+                stored_at, size = 0, 0
+            entries.append((stored_at, size, meta_path, body_path))
+
+        entries.sort()
+        total_size = sum(size for _, size, _, _ in entries)
+        for stored_at, size, meta_path, body_path in entries:
+            if now - stored_at <= self.max_age and total_size <= self.max_size:
+                break
+            for path in (meta_path, body_path):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            total_size -= size
+            removed += 1
+        if removed:
+            logger.info(f"🧹 HTTP-кэш: удалено {removed} записей")
+        return removed
+
+
+class TokenBucket:
+    """Ведро токенов: в среднем rate запросов в секунду, до capacity подряд"""
+
+    def __init__(self, rate: float, capacity: int = 1):
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            wait = (1 - self.tokens) / self.rate
+            # Токен, которого ждём, уже наш - следующие запросы встанут в очередь за ним
+            self.tokens = 0.0
+            self.updated = now + wait
+            await asyncio.sleep(wait)
+
+
+class HostLimiter:
+    """Ограничивает число запросов к хосту в полёте и их частоту"""
+
+    def __init__(self, budget: SourceBudget):
+        self.budget = budget
+        self.semaphore = asyncio.Semaphore(budget.max_concurrency)
+        self.bucket = TokenBucket(budget.requests_per_second, budget.burst)
+
+    async def __aenter__(self):
+        await self.semaphore.acquire()
+        try:
+            await self.bucket.acquire()
+        except BaseException:
+            self.semaphore.release()
+            raise
+        return self
+
+    async def __aexit__(self, *exc):
+        self.semaphore.release()
+
+
+class FetchEngine:
+    """Общий асинхронный движок загрузки страниц для всех источников.
+
+    Один httpx-клиент с пулом keep-alive соединений (HTTP/2, если установлен h2 и
+    хост его поддерживает), плюс ограничение параллельности и частоты по каждому хосту
+    согласно бюджету источника. transport позволяет подменить сеть в проверках.
+    """
+
+    def __init__(self, default_budget: SourceBudget = SourceBudget(),
+                 transport: Optional[httpx.AsyncBaseTransport] = None,
+                 cache: Optional[HttpCache] = None):
+        self.default_budget = default_budget
+        self.transport = transport
+        self.cache = cache if cache is not None else HttpCache()
+        self._limiters: Dict[str, HostLimiter] = {}
+        self._headers: Dict[str, Dict[str, str]] = {}
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def configure_host(self, host: str, budget: SourceBudget, headers: Optional[Dict[str, str]] = None) -> None:
+        """Задаёт бюджет и заголовки для хоста (вызывается до первого запроса)"""
+        limiter = self._limiters.get(host)
+        if limiter is None or limiter.budget != budget:
+            self._limiters[host] = HostLimiter(budget)
+        if headers:
+            self._headers[host] = dict(headers)
+
+    def _limiter(self, host: str) -> HostLimiter:
+        if host not in self._limiters:
+            self._limiters[host] = HostLimiter(self.default_budget)
+        return self._limiters[host]
+
+    def _get_client(self) -> httpx.AsyncClient:
+        # Клиент и примитивы asyncio привязаны к циклу событий: при смене цикла создаём заново
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop:
+            self._client = httpx.AsyncClient(
+                http2=HTTP2_AVAILABLE,
+                headers=CONFIG['DEFAULT_HEADERS'],
+                follow_redirects=True,
+                limits=httpx.Limits(
+                    max_connections=CONFIG['MAX_CONNECTIONS'],
+                    max_keepalive_connections=CONFIG['MAX_KEEPALIVE'],
+                    keepalive_expiry=CONFIG['KEEPALIVE_EXPIRY'],
+                ),
+                transport=self.transport,
+            )
+            if self._loop is not None:
+                self._limiters = {host: HostLimiter(limiter.budget) for host, limiter in self._limiters.items()}
+            self._loop = loop
+        return self._client
+
+    async def fetch(self, url: str, headers: Optional[Dict[str, str]] = None,
+                    timeout: float = CONFIG['TIMEOUT'],
+                    retries: int = CONFIG['RETRY_ATTEMPTS'],
+                    use_cache: bool = True,
+                    stop_when: Optional[Callable[[FetchResult], bool]] = None) -> Optional[FetchResult]:
+        """Загружает страницу; при сетевой ошибке или не-2xx ответе возвращает None.
+
+        Если страница есть в HTTP-кэше, запрос делается условным: ответ 304 отдаётся
+        из кэша с not_modified=True, и вызывающий код может не разбирать её заново.
+
+        stop_when получает ответ с заголовками и уже полученным началом тела; если он
+        вернул True, загрузка прерывается и возвращается результат с truncated=True.
+        Такие ответы не кэшируются.
+        """
+        client = self._get_client()
+        host = urlparse(url).netloc
+        request_headers = {**self._headers.get(host, {}), **(headers or {})}
+
+        cached = self.cache.load(url) if use_cache else None
+        if cached:
+            if self.cache.is_fresh(cached):
+                self.cache.stats['hits'] += 1
+                return self._from_cache(cached, not_modified=True)
+            request_headers.update(self.cache.conditional_headers(cached))
+
+        for attempt in range(1, retries + 1):
+            try:
+                async with self._limiter(host):
+                    if stop_when:
+                        response, result = await self._get_streaming(client, url, request_headers,
+                                                                     timeout, stop_when)
+                    else:
+                        response = await client.get(url, headers=request_headers, timeout=timeout)
+                        result = None
+                if response.status_code == 304 and cached:
+                    self.cache.stats['not_modified'] += 1
+                    self.cache.touch(url)
+                    return self._from_cache(cached, not_modified=True)
+                response.raise_for_status()
+                if result is None:
+                    result = FetchResult(url=str(response.url), status=response.status_code,
+                                         text=response.text, headers=dict(response.headers),
+                                         http_version=response.http_version)
+                if result.truncated:
+                    return result
+                if use_cache:
+                    self.cache.stats['misses'] += 1
+                    self.cache.store(url, result)
+                return result
+            except Exception as e:
+                logger.warning(f"❌ Ошибка загрузки {url} (попытка {attempt}/{retries}): {e}")
+                if attempt < retries:
+                    await asyncio.sleep(CONFIG['RETRY_DELAY'] * attempt)
+        return None
+
+    async def _get_streaming(self, client: httpx.AsyncClient, url: str, headers: Dict[str, str],
+                             timeout: float, stop_when: Callable[[FetchResult], bool]):
+        """GET с чтением тела по частям: stop_when может оборвать загрузку в начале страницы"""
+        async with client.stream('GET', url, headers=headers, timeout=timeout) as response:
+            if not response.is_success:
+                return response, None
+            result = FetchResult(url=str(response.url), status=response.status_code, text='',
+                                 headers=dict(response.headers), http_version=response.http_version)
+            result.truncated = stop_when(result)
+            if result.truncated:
+                return response, result
+            chunks = []
+            size = 0
+            async for chunk in response.aiter_text():
+                chunks.append(chunk)
+                size += len(chunk)
+                if size <= CONFIG['STREAM_PROBE_LIMIT'] or len(chunks) == 1:
+                    result.text = ''.join(chunks)
+                    result.truncated = stop_when(result)
+                    if result.truncated:
+                        # Выход из stream() закрывает ответ - остаток страницы не скачивается
+                        return response, result
+            result.text = ''.join(chunks)
+            return response, result
+
+    def _from_cache(self, entry: dict, not_modified: bool) -> FetchResult:
+        return FetchResult(url=entry.get('final_url') or entry['url'], status=entry.get('status', 200),
+                           text=entry['text'], headers=entry.get('headers', {}),
+                           from_cache=True, not_modified=not_modified)
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            self._loop = None
+
+
+_engine: Optional[FetchEngine] = None
+
+
+def get_engine() -> FetchEngine:
+    """Общий движок - пул соединений переживает циклы резидентного режима"""
+    global _engine
+    if _engine is None:
+        _engine = FetchEngine()
+    return _engine
@@ -0,0 +1,157 @@
+import json
+import os
+import re
+from typing import Any, Callable, List, Optional, Tuple
+
+import soupsieve
+from bs4 import BeautifulSoup, SoupStrainer, Tag
+
+
+def _detect_backend() -> str:
+    """Самый быстрый из установленных бэкендов BeautifulSoup"""
+    try:
+        import lxml  # noqa: F401
+        return 'lxml'
+    except ImportError:
+        return 'html.parser'
+
+
+# Бэкенд можно зафиксировать через HTML_PARSER (lxml, html.parser, html5lib)
+HTML_BACKEND = os.getenv('HTML_PARSER') or _detect_backend()
+
+# Время публикации в <head>: мета-теги статьи и поле datePublished из JSON-LD
+PUBLISHED_META_RE = re.compile(
+    r'<meta\b[^>]*?\b(?:property|name|itemprop)\s*=\s*["\']'
+    r'(?:article:published_time|og:published_time|datePublished)["\'][^>]*>',
+    re.IGNORECASE
+)
+CONTENT_ATTR_RE = re.compile(r'\bcontent\s*=\s*["\']([^"\']+)["\']', re.IGNORECASE)
+JSON_LD_PUBLISHED_RE = re.compile(r'"datePublished"\s*:\s*"([^"]+)"')
+
+
+def make_soup(markup, parse_only: Optional[SoupStrainer] = None, backend: Optional[str] = None) -> BeautifulSoup:
+    """Разбирает страницу выбранным бэкендом; parse_only строит дерево только из нужных тегов"""
+    return BeautifulSoup(markup, backend or HTML_BACKEND, parse_only=parse_only)
+
+
+def head_markup(markup):
+    """Отрезает документ по </head>: мета-теги не требуют разбора тела страницы"""
+    end_tag = b'</head>' if isinstance(markup, bytes) else '</head>'
+    end = markup.find(end_tag)
+    if end == -1:
+        end = markup.find(end_tag.upper())
+    return markup[:end + len(end_tag)] if end != -1 else markup
+
+
+def parse_head(markup, backend: Optional[str] = None) -> BeautifulSoup:
+    """Быстрый путь для времени публикации и og-тегов: разбирается только <head>"""
+    return make_soup(head_markup(markup), backend=backend)
+
+
+def sniff_publish_time(markup: str) -> Optional[str]:
+    """Сырое время публикации из <head> (мета-тег или JSON-LD) без построения дерева.
+
+    Работает и на начале страницы, которое ещё догружается.
+    """
+    head = head_markup(markup)
+    for match in PUBLISHED_META_RE.finditer(head):
+        content = CONTENT_ATTR_RE.search(match.group(0))
+        if content:
+            return content.group(1)
+    match = JSON_LD_PUBLISHED_RE.search(head)
+    return match.group(1) if match else None
+
+
+# Данные страницы, встроенные как JSON: состояние Next.js и разметка schema.org
+NEXT_DATA_RE = re.compile(r'<script\b[^>]*\bid\s*=\s*["\']__NEXT_DATA__["\'][^>]*>(.*?)</script>', re.DOTALL | re.IGNORECASE)
+JSON_LD_RE = re.compile(r'<script\b[^>]*\btype\s*=\s*["\']application/ld\+json["\'][^>]*>(.*?)</script>',
+                        re.DOTALL | re.IGNORECASE)
+
+NEXT_LINK_RE = re.compile(r'<link\b[^>]*\brel\s*=\s*["\']next["\'][^>]*>', re.IGNORECASE)
+HREF_ATTR_RE = re.compile(r'\bhref\s*=\s*["\']([^"\']+)["\']', re.IGNORECASE)
+
+
+def next_page_link(markup: str) -> Optional[str]:
+    """Ссылка на следующую страницу списка из <link rel="next">"""
+    match = NEXT_LINK_RE.search(head_markup(markup))
+    href = HREF_ATTR_RE.search(match.group(0)) if match else None
+    return href.group(1) if href else None
+
+
+def _load_json(raw: str):
+    try:
+        return json.loads(raw)
+    except ValueError:
+        return None
+
+
+def embedded_json(markup: str) -> List[Tuple[str, Any]]:
+    """JSON из <script id="__NEXT_DATA__"> и <script type="application/ld+json"> без построения дерева.
+
+    Возвращает пары (метод, данные): сначала next_data, затем json_ld.
+    """
+    payloads = []
+    for method, pattern in (('next_data', NEXT_DATA_RE), ('json_ld', JSON_LD_RE)):
+        for match in pattern.finditer(markup):
+            data = _load_json(match.group(1))
+            if data is not None:
+                payloads.append((method, data))
+    return payloads
+
+
+def embedded_json_from_soup(soup: BeautifulSoup) -> List[Tuple[str, Any]]:
+    """То же для уже разобранной страницы"""
+    payloads = []
+    next_data = soup.find('script', id='__NEXT_DATA__')
+    if next_data and next_data.string:
+        data = _load_json(next_data.string)
+        if data is not None:
+            payloads.append(('next_data', data))
+    for script in soup.find_all('script', type='application/ld+json'):
+        data = _load_json(script.string) if script.string else None
+        if data is not None:
+            payloads.append(('json_ld', data))
+    return payloads
+
+
+# Простые селекторы, которые проверяются без soupsieve: .класс, тег, [атрибут], [атрибут=|*=|^=|$="значение"]
+SIMPLE_SELECTOR_RE = re.compile(
+    r'^(?:\.(?P<cls>[\w-]+)'
+    r'|\[(?P<attr>[\w-]+)(?:(?P<op>[*^$]?=)\s*["\'](?P<value>[^"\']*)["\'])?\]'
+    r'|(?P<tag>[a-zA-Z][\w-]*))$'
+)
+
+
+def _attr_text(element: Tag, name: str) -> Optional[str]:
+    # Многозначные атрибуты (class) soupsieve сравнивает как строку через пробел
+    value = element.get(name)
+    return ' '.join(value) if isinstance(value, list) else value
+
+
+def selector_predicate(selector: str) -> Callable[[Tag], bool]:
+    """Проверка одного элемента по CSS-селектору.
+
+    Простые селекторы превращаются в сравнение строк (в десятки раз быстрее
+    soupsieve.match на каждом элементе), остальные проверяются через soupsieve.
+    """
+    match = SIMPLE_SELECTOR_RE.match(selector.strip())
+    if not match:
+        return soupsieve.compile(selector).match
+    if match.group('cls'):
+        name = match.group('cls')
+        return lambda element: name in (element.get('class') or ())
+    if match.group('tag'):
+        tag = match.group('tag').lower()
+        return lambda element: element.name == tag
+    attr, op, value = match.group('attr').lower(), match.group('op'), match.group('value')
+    if not op:
+        return lambda element: element.has_attr(attr)
+    if op == '=':
+        return lambda element: _attr_text(element, attr) == value
+    if not value:
+        return lambda element: False  # Пустая подстрока по CSS ничего не находит
+    if op == '*=':
+        return lambda element: value in (_attr_text(element, attr) or '')
+    if op == '^=':
+        return lambda element: (_attr_text(element, attr) or '').startswith(value)
+    return lambda element: (_attr_text(element, attr) or '').endswith(value)
@@ -0,0 +1,225 @@
+import contextlib
+import contextvars
+import hashlib
+import heapq
+import itertools
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Optional
+
+from db import evict_llm_cache, get_llm_response, save_llm_response
+
+logger = logging.getLogger(__name__)
+
+# Лимиты Groq для llama-3.3-70b-versatile (бесплатный план); под свой тариф - через переменные окружения
+CONFIG = {
+    'MODEL': "llama-3.3-70b-versatile",
+    'MAX_CONCURRENCY': int(os.getenv('LLM_CONCURRENCY', '4')),
+    'REQUESTS_PER_MINUTE': int(os.getenv('LLM_RPM', '30')),
+    'TOKENS_PER_MINUTE': int(os.getenv('LLM_TPM', '12000')),
+    'CHARS_PER_TOKEN': 3,             # Грубая оценка промпта до ответа; после ответа берём usage
+    'COMPLETION_TOKENS': 400,         # Ожидаемая длина ответа
+    'MAX_RETRIES': 4,
+    'REQUEST_TIMEOUT': 60.0,          # Секунд на один ответ модели: зависший запрос не держит цикл
+    'BACKOFF_BASE': 2.0,              # Секунд до первого повтора после 429, дальше вдвое больше
+    'BACKOFF_MAX': 60.0,
+    'RETRY_STATUSES': (429,),
+    'CACHE_ENABLED': os.getenv('LLM_CACHE', '1').lower() not in ('0', 'false', 'no', 'off'),
+    'CACHE_TTL': 3 * 24 * 3600,       # Ответы старше трёх суток запрашиваются заново
+    'CACHE_MAX_ENTRIES': 2000,
+}
+
+WINDOW = 60.0
+
+# Ключ очереди текущего потока: меньше - раньше; задаётся через priority()
+_priority = contextvars.ContextVar('llm_priority', default=float('inf'))
+
+
+@contextlib.contextmanager
+def priority(publish_time: Optional[datetime]):
+    """Запросы внутри блока идут в очереди по времени публикации статьи: новые раньше"""
+    token = _priority.set(-publish_time.timestamp() if publish_time else float('inf'))
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def estimate_tokens(prompt: str) -> int:
+    return len(prompt) // CONFIG['CHARS_PER_TOKEN'] + CONFIG['COMPLETION_TOKENS']
+
+
+def cache_key(model: str, prompt: str) -> str:
+    """Ключ кэша: модель и промпт с нормализованными пробелами"""
+    normalized = ' '.join(prompt.split())
+    return hashlib.sha256(f"{model}\n{normalized}".encode('utf-8')).hexdigest()
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    response = getattr(error, 'response', None)
+    value = response.headers.get('retry-after') if response is not None else None
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+
+class LLMDispatcher:
+    """Очередь запросов к LLM с лимитами на параллельность, запросы и токены в минуту.
+
+    Вызовы идут из рабочих потоков. Ждущие запросы выстраиваются по приоритету,
+    ответ 429 приостанавливает всю очередь на Retry-After (или экспоненциальную
+    паузу), после чего запрос повторяется первым. Ответы сохраняются в SQLite
+    (таблица llm_cache), и тот же промпт повторно не отправляется.
+    """
+
+    def __init__(self, max_concurrency: int = CONFIG['MAX_CONCURRENCY'],
+                 requests_per_minute: int = CONFIG['REQUESTS_PER_MINUTE'],
+                 tokens_per_minute: int = CONFIG['TOKENS_PER_MINUTE']):
+        self.max_concurrency = max_concurrency
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.stats = {}
+        self.reset_stats()
+        self._cond = threading.Condition()
+        self._waiting = []          # куча (приоритет, номер) ждущих запросов
+        self._order = itertools.count()
+        self._active = 0
+        self._window = deque()      # [время, токены] запросов за последнюю минуту
+        self._paused_until = 0.0
+
+    def reset_stats(self) -> None:
+        self.stats = {'requests': 0, 'rate_limited': 0, 'failed': 0, 'tokens': 0, 'wait_seconds': 0.0,
+                      'cache_hits': 0, 'cache_misses': 0, 'saved_tokens': 0}
+
+    def evict_cache(self) -> None:
+        deleted = evict_llm_cache(CONFIG['CACHE_TTL'], CONFIG['CACHE_MAX_ENTRIES'])
+        if deleted:
+            logger.info(f"🧹 Кэш LLM: удалено {deleted} записей")
+
+    def cache_summary(self) -> str:
+        lookups = self.stats['cache_hits'] + self.stats['cache_misses']
+        hit_rate = self.stats['cache_hits'] / lookups if lookups else 0.0
+        return (f"попаданий {self.stats['cache_hits']}/{lookups} ({hit_rate:.0%}), "
+                f"сэкономлено ~{self.stats['saved_tokens']} токенов")
+
+    def lookup(self, key: str) -> Optional[str]:
+        """Ответ из кэша по готовому ключу (например, для одной статьи из пакета)"""
+        return self._cached(key) if CONFIG['CACHE_ENABLED'] else None
+
+    def remember(self, key: str, model: str, response: str, tokens: int) -> None:
+        if CONFIG['CACHE_ENABLED']:
+            save_llm_response(key, model, response, tokens)
+
+    def _cached(self, key: str) -> Optional[str]:
+        cached = get_llm_response(key, CONFIG['CACHE_TTL'])
+        with self._cond:
+            if not cached:
+                self.stats['cache_misses'] += 1
+                return None
+            self.stats['cache_hits'] += 1
+            self.stats['saved_tokens'] += cached[1] or 0
+        return cached[0]
+
+    def _delay(self, tokens: int, now: float) -> Optional[float]:
+        """Сколько ждать до запуска запроса; None - ждать освобождения слота"""
+        if self._active >= self.max_concurrency:
+            return None
+        while self._window and now - self._window[0][0] >= WINDOW:
+            self._window.popleft()
+        if self._paused_until > now:
+            return self._paused_until - now
+        if len(self._window) >= self.requests_per_minute:
+            return self._window[0][0] + WINDOW - now
+        used = sum(entry[1] for entry in self._window)
+        if self._window and used + tokens > self.tokens_per_minute:
+            return self._window[0][0] + WINDOW - now
+        return 0.0
+
+    def _acquire(self, key: float, tokens: int) -> list:
+        ticket = (key, next(self._order))
+        started = time.monotonic()
+        with self._cond:
+            heapq.heappush(self._waiting, ticket)
+            while True:
+                now = time.monotonic()
+                delay = self._delay(tokens, now) if self._waiting[0] == ticket else None
+                if delay is not None and delay <= 0:
+                    heapq.heappop(self._waiting)
+                    self._active += 1
+                    entry = [now, tokens]
+                    self._window.append(entry)
+                    self.stats['wait_seconds'] += now - started
+                    self._cond.notify_all()
+                    return entry
+                self._cond.wait(timeout=delay)
+
+    def _release(self, entry: list, used_tokens: Optional[int], outcome: str) -> None:
+        with self._cond:
+            self._active -= 1
+            if used_tokens:
+                entry[1] = used_tokens
+            self.stats[outcome] += 1
+            self.stats['tokens'] += entry[1] if outcome == 'requests' else 0
+            self._cond.notify_all()
+
+    def _pause(self, seconds: float) -> None:
+        with self._cond:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._cond.notify_all()
+
+    def complete(self, client, prompt: str, model: str = CONFIG['MODEL'], use_cache: bool = True) -> str:
+        """Текст ответа модели; после исчерпания повторов пробрасывает последнюю ошибку.
+
+        use_cache=False - промпт целиком не кэшируется (пакеты кэшируются по статьям).
+        """
+        key = cache_key(model, prompt) if CONFIG['CACHE_ENABLED'] and use_cache else None
+        if key:
+            cached = self._cached(key)
+            if cached is not None:
+                return cached
+        order_key = _priority.get()
+        tokens = estimate_tokens(prompt)
+        for attempt in range(CONFIG['MAX_RETRIES'] + 1):
+            entry = self._acquire(order_key, tokens)
+            try:
+                response = client.chat.completions.create(
+                    model=model,
+                    messages=[{"role": "user", "content": prompt}],
+                    timeout=CONFIG['REQUEST_TIMEOUT']
+                )
+            except Exception as e:
+                limited = getattr(e, 'status_code', None) in CONFIG['RETRY_STATUSES']
+                self._release(entry, None, 'rate_limited' if limited else 'failed')
+                if not limited or attempt == CONFIG['MAX_RETRIES']:
+                    raise
+                backoff = min(CONFIG['BACKOFF_MAX'], CONFIG['BACKOFF_BASE'] * 2 ** attempt)
+                delay = _retry_after(e) or backoff * random.uniform(0.5, 1.0)
+                logger.warning(f"⏳ LLM: лимит запросов (429), пауза {delay:.1f} с, "
+                               f"попытка {attempt + 1}/{CONFIG['MAX_RETRIES']}")
+                self._pause(delay)
+                continue
+            usage = getattr(response, 'usage', None)
+            self._release(entry, getattr(usage, 'total_tokens', None), 'requests')
+            content = response.choices[0].message.content
+            if key and content:
+                save_llm_response(key, model, content, entry[1])
+            return content
+
+
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+
+def get_dispatcher() -> LLMDispatcher:
+    """Общая очередь для всех вызовов LLM в процессе"""
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is None:
+            _dispatcher = LLMDispatcher()
+        return _dispatcher
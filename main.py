@@ -7,15 +7,16 @@ import os
 import sys
 from datetime import datetime, timedelta
 from zoneinfo import ZoneInfo
-from parser import get_latest_news as get_football_ua_news
-from onefootball_parser import get_latest_news as get_onefootball_news
-from ai_processor import process_article_for_posting, has_gemini_key
-from ai_content_checker import check_content_similarity, check_articles_similarity
+from fetcher import get_engine
+from sources import article_cache_stats, load_sources, run_sources
+from ai_processor import prepare_batched_ai, process_article_for_posting, has_gemini_key
+from ai_content_checker import DedupContext, check_articles_similarity, record_posted
+from llm_dispatch import get_dispatcher
 from db import (
     get_last_run_time,
     update_last_run_time,
     is_already_posted,
-    save_posted,
+    mark_article_posted,
     cleanup_old_posts,
     now_kiev,
     format_kiev_time,
@@ -31,6 +32,11 @@ CONFIG = {
     'CLEANUP_DAYS': 7,
     'WORKING_HOURS': (6, 1),  # 06:00 to 01:00
     'SIMILARITY_THRESHOLD': 0.75,  # Порог схожести для проверки дубликатов
+    'FETCH_DEADLINE': 300,  # Общий дедлайн на сбор новостей со всех источников
+    'SOURCE_TIMEOUTS': {  # Таймаут каждого источника (не больше FETCH_DEADLINE)
+        'Football.ua': 240,
+        'OneFootball': 240,
+    },
 }
 
 try:
@@ -42,10 +48,30 @@ except ImportError:
 
 KIEV_TZ = ZoneInfo("Europe/Kiev")
 
+# Задачи с потоками и публикациями текущего цикла: таймаут цикла их не прерывает,
+# резидентный планировщик дожидается их через wait_inflight
+_inflight = set()
+
+def _track(coro):
+    task = asyncio.ensure_future(coro)
+    _inflight.add(task)
+    task.add_done_callback(_inflight.discard)
+    return task
+
+async def in_thread(func, *args):
+    """asyncio.to_thread, поток которого остаётся в _inflight и после отмены ожидающего"""
+    return await asyncio.shield(_track(asyncio.to_thread(func, *args)))
+
+async def wait_inflight():
+    """Дожидается потоков и публикаций, которые пережили прерванный цикл"""
+    while _inflight:
+        logger.info(f"⏳ Ждём незавершённые задачи прерванного цикла: {len(_inflight)}")
+        await asyncio.gather(*list(_inflight), return_exceptions=True)
+
 async def post_with_timeout(poster, article, timeout=CONFIG['POST_TIMEOUT']):
     try:
         async with asyncio.timeout(timeout):
-            return await asyncio.to_thread(poster.post_article, article)
+            return await in_thread(poster.post_article, article)
     except asyncio.TimeoutError:
         logger.error(f"Таймаут при публикации: {article.get('title', '')[:50]}...")
         return False
@@ -53,17 +79,14 @@ async def post_with_timeout(poster, article, timeout=CONFIG['POST_TIMEOUT']):
         logger.error(f"Ошибка при публикации: {e}")
         return False
 
-async def fetch_news(source_name, fetch_func, since_time):
-    try:
-        news = await asyncio.to_thread(fetch_func, since_time=since_time)
-        if news:
-            logger.info(f"{source_name}: найдено {len(news)} новостей")
-            for item in news:
-                item['source'] = source_name
-        return news
-    except Exception as e:
-        logger.error(f"Ошибка получения новостей {source_name}: {e}")
-        return []
+async def publish_and_record(poster, article, dedup_context):
+    """Публикует статью и сразу отмечает её в базе - одним шагом, который не рвёт таймаут цикла"""
+    if not await post_with_timeout(poster, article):
+        return False
+    record_posted(article)
+    dedup_context.add_post(article)
+    mark_article_posted(article.get('url', ''))
+    return True
 
 async def main():
     logger.info("Запуск бота парсинга и публикации новостей")
@@ -80,169 +103,197 @@ async def main():
 
     update_last_run_time()
     cleanup_old_posts(days=CONFIG['CLEANUP_DAYS'])
+    engine = get_engine()
+    engine.cache.evict()
+    engine.cache.reset_stats()
+    llm = get_dispatcher()
+    llm.evict_cache()
+    llm.reset_stats()
 
     logger.info("Gemini API: " + ("включён" if has_gemini_key() else "отключён"))
     telegram_enabled = TELEGRAM_AVAILABLE and debug_environment()
     logger.info(f"Telegram публикация: {'включена' if telegram_enabled else 'отключена'}")
 
-    # Получение новостей
-    all_news = []
-    sources = [
-        ("Football.ua", get_football_ua_news),
-        ("OneFootball", get_onefootball_news),
-    ]
-
-    for source_name, fetch_func in sources:
-        news = await fetch_news(source_name, fetch_func, last_run_time)
-        all_news.extend(news)
+    # Счётчики заполняются по ходу цикла: ранний выход тоже оставляет processed_news.json и
+    # финальную статистику со сводкой кэшей этого запуска
+    all_news, filtered_news, valid_articles, unique_articles, articles_to_publish = [], [], [], [], []
+    sources_stats, sources_to_publish = {}, {}
+    successful_posts = 0
+    try:
+        # Получение новостей: все зарегистрированные источники параллельно на общем движке,
+        # время цикла ограничено самым медленным источником, а не суммой
+        load_sources()
+        news_by_source = await run_sources(
+            engine,
+            last_run_time,
+            timeouts=CONFIG['SOURCE_TIMEOUTS'],
+            deadline=CONFIG['FETCH_DEADLINE'],
+        )
+        for source_name, news in news_by_source.items():
+            if news:
+                logger.info(f"{source_name}: найдено {len(news)} новостей")
+            all_news.extend(news)
 
-    if not all_news:
-        logger.info("Новостей не найдено")
-        return
+        if not all_news:
+            logger.info("Новостей не найдено")
+            return
 
-    sources_stats = {article.get('source', 'Unknown'): 0 for article in all_news}
-    for article in all_news:
-        sources_stats[article.get('source', 'Unknown')] += 1
+        sources_stats = {article.get('source', 'Unknown'): 0 for article in all_news}
+        for article in all_news:
+            sources_stats[article.get('source', 'Unknown')] += 1
 
-    logger.info("Статистика по источникам:")
-    for source, count in sources_stats.items():
-        logger.info(f"   {source}: {count} новостей")
+        logger.info("Статистика по источникам:")
+        for source, count in sources_stats.items():
+            logger.info(f"   {source}: {count} новостей")
 
-    # Фильтрация уже опубликованных
-    filtered_news = [article for article in all_news if not is_already_posted(article.get('title', ''))]
-    if not filtered_news:
-        logger.info("Все новости уже опубликованы")
-        return
+        # Фильтрация уже опубликованных
+        filtered_news = [article for article in all_news if not is_already_posted(article.get('title', ''))]
+        if not filtered_news:
+            logger.info("Все новости уже опубликованы")
+            return
 
-    logger.info(f"К обработке: {len(filtered_news)} уникальных новостей")
-    filtered_news.sort(key=lambda x: x.get('publish_time') or datetime.min.replace(tzinfo=KIEV_TZ), reverse=True)
+        logger.info(f"К обработке: {len(filtered_news)} уникальных новостей")
+        filtered_news.sort(key=lambda x: x.get('publish_time') or datetime.min.replace(tzinfo=KIEV_TZ), reverse=True)
 
-    # Обработка новостей
-    logger.info("🤖 Обрабатываем новости с помощью AI...")
-    processed_articles = await asyncio.gather(
-        *[asyncio.to_thread(process_article_for_posting, article) for article in filtered_news],
-        return_exceptions=True
-    )
+        # Обработка новостей: потоки стартуют сразу, но запросы к Groq проходят через общую очередь
+        # llm_dispatch - не больше лимитов API, самые свежие статьи первыми
+        logger.info("🤖 Обрабатываем новости с помощью AI...")
+        await in_thread(prepare_batched_ai, filtered_news)
+        processed_articles = await asyncio.gather(
+            *[in_thread(process_article_for_posting, article) for article in filtered_news],
+            return_exceptions=True
+        )
 
-    valid_articles = [result for result in processed_articles if not isinstance(result, Exception)]
-    for i, result in enumerate(valid_articles, 1):
-        logger.info(f"Обработано [{result.get('source')}]: {result.get('title', '')[:50]}...")
+        valid_articles = [result for result in processed_articles if not isinstance(result, Exception)]
+        for i, result in enumerate(valid_articles, 1):
+            logger.info(f"Обработано [{result.get('source')}]: {result.get('title', '')[:50]}...")
 
-    if not valid_articles:
-        logger.info("Нет валидных статей для публикации")
-        return
+        if not valid_articles:
+            logger.info("Нет валидных статей для публикации")
+            return
 
-    # НОВАЯ ЛОГИКА: Проверка дубликатов между статьями
-    logger.info("🔍 Проверяем статьи на внутренние дубликаты...")
-    unique_articles = check_articles_similarity(valid_articles, CONFIG['SIMILARITY_THRESHOLD'])
+        # НОВАЯ ЛОГИКА: Проверка дубликатов между статьями
+        # Проверки дубликатов ходят в Groq, Telegram и SQLite синхронно - в потоке, чтобы
+        # таймаут цикла резидентного режима не ждал их внутри цикла событий
+        logger.info("🔍 Проверяем статьи на внутренние дубликаты...")
+        unique_articles = await in_thread(check_articles_similarity, valid_articles,
+                                          CONFIG['SIMILARITY_THRESHOLD'])
     
-    if len(unique_articles) < len(valid_articles):
-        removed_count = len(valid_articles) - len(unique_articles)
-        logger.info(f"📊 Удалено {removed_count} дубликатов между статьями")
+        if len(unique_articles) < len(valid_articles):
+            removed_count = len(valid_articles) - len(unique_articles)
+            logger.info(f"📊 Удалено {removed_count} дубликатов между статьями")
     
-    # Проверка на дубликаты с каналом за сегодня
-    logger.info("🔍 Проверяем уникальные статьи на дубликаты с каналом...")
-    today_start = current_time_kiev.replace(hour=0, minute=0, second=0, microsecond=0)
-    articles_to_publish = []
+        # Проверка на дубликаты с каналом и историей публикаций за HISTORY_DAYS дней
+        logger.info("🔍 Проверяем уникальные статьи на дубликаты с каналом...")
+        articles_to_publish = []
+        # История канала и базы загружается один раз на запуск
+        dedup_context = await in_thread(DedupContext(CONFIG['SIMILARITY_THRESHOLD']).load, unique_articles)
     
-    for article in unique_articles:
-        is_duplicate = check_content_similarity(
-            article, 
-            threshold=CONFIG['SIMILARITY_THRESHOLD'], 
-            since_time=today_start
-        )
+        for article in unique_articles:
+            is_duplicate = await in_thread(dedup_context.is_duplicate, article)
         
-        if not is_duplicate:
-            articles_to_publish.append(article)
-        else:
-            logger.info(f"🚫 Дубликат с каналом: {article.get('title', '')[:50]}...")
+            if not is_duplicate:
+                articles_to_publish.append(article)
+            else:
+                logger.info(f"🚫 Дубликат с каналом: {article.get('title', '')[:50]}...")
 
-    if not articles_to_publish:
-        logger.info("Нет уникальных статей для публикации после проверки дубликатов")
-        return
+        if not articles_to_publish:
+            logger.info("Нет уникальных статей для публикации после проверки дубликатов")
+            return
 
-    logger.info(f"📰 К публикации: {len(articles_to_publish)} уникальных статей")
+        logger.info(f"📰 К публикации: {len(articles_to_publish)} уникальных статей")
     
-    # Показываем финальную статистику
-    sources_to_publish = {}
-    for article in articles_to_publish:
-        source = article.get('source', 'Unknown')
-        sources_to_publish[source] = sources_to_publish.get(source, 0) + 1
+        # Показываем финальную статистику
+        sources_to_publish = {}
+        for article in articles_to_publish:
+            source = article.get('source', 'Unknown')
+            sources_to_publish[source] = sources_to_publish.get(source, 0) + 1
     
-    logger.info("Статистика к публикации:")
-    for source, count in sources_to_publish.items():
-        logger.info(f"   {source}: {count} статей")
+        logger.info("Статистика к публикации:")
+        for source, count in sources_to_publish.items():
+            logger.info(f"   {source}: {count} статей")
 
-    # Публикация в Telegram
-    if telegram_enabled and articles_to_publish:
-        logger.info("📤 Публикация в Telegram")
-        try:
-            poster = TelegramPosterSync()
-            if poster.test_connection():
-                successful_posts = 0
-                for i, article in enumerate(articles_to_publish):
-                    logger.info(f"📤 Публикуем [{article.get('source')}] {i+1}/{len(articles_to_publish)}: {article.get('title', '')[:50]}...")
+        # Публикация в Telegram
+        if telegram_enabled and articles_to_publish:
+            logger.info("📤 Публикация в Telegram")
+            try:
+                poster = TelegramPosterSync()
+                if poster.test_connection():
+                    for i, article in enumerate(articles_to_publish):
+                        logger.info(f"📤 Публикуем [{article.get('source')}] {i+1}/{len(articles_to_publish)}: {article.get('title', '')[:50]}...")
                     
-                    if await post_with_timeout(poster, article):
-                        successful_posts += 1
-                        save_posted(article.get('title', ''))
-                        logger.info("✅ Успешно опубликовано")
+                        # shield: если таймаут цикла придёт во время публикации, запись в базу
+                        # всё равно выполнится, и следующий цикл не опубликует статью повторно
+                        if await asyncio.shield(_track(publish_and_record(poster, article, dedup_context))):
+                            successful_posts += 1
+                            logger.info("✅ Успешно опубликовано")
                         
-                        # Задержка между постами
-                        if i < len(articles_to_publish) - 1:
-                            logger.info(f"⏳ Пауза {CONFIG['POST_INTERVAL']} секунд...")
-                            await asyncio.sleep(CONFIG['POST_INTERVAL'])
-                    else:
-                        logger.error("❌ Не удалось опубликовать")
+                            # Задержка между постами
+                            if i < len(articles_to_publish) - 1:
+                                logger.info(f"⏳ Пауза {CONFIG['POST_INTERVAL']} секунд...")
+                                await asyncio.sleep(CONFIG['POST_INTERVAL'])
+                        else:
+                            logger.error("❌ Не удалось опубликовать")
                 
-                logger.info(f"📊 Итого опубликовано: {successful_posts}/{len(articles_to_publish)}")
-            else:
-                logger.error("❌ Не удалось подключиться к Telegram")
-        except Exception as e:
-            logger.error(f"❌ Ошибка публикации: {e}")
-    else:
-        if not telegram_enabled:
-            logger.info("📝 Публикация отключена")
-        if not articles_to_publish:
-            logger.info("📭 Нет статей для публикации")
-
-    # Сохранение результатов
-    output_data = {
-        'timestamp': current_time_kiev.isoformat(),
-        'last_run_time': last_run_time.isoformat() if last_run_time else None,
-        'sources_found': sources_stats,
-        'total_new_articles': len(filtered_news),
-        'total_processed': len(valid_articles),
-        'unique_articles': len(unique_articles),
-        'articles_to_publish': len(articles_to_publish),
-        'sources_to_publish': sources_to_publish,
-        'duplicate_removal': {
-            'internal_duplicates_removed': len(valid_articles) - len(unique_articles),
-            'channel_duplicates_removed': len(unique_articles) - len(articles_to_publish)
+                    logger.info(f"📊 Итого опубликовано: {successful_posts}/{len(articles_to_publish)}")
+                else:
+                    logger.error("❌ Не удалось подключиться к Telegram")
+            except Exception as e:
+                logger.error(f"❌ Ошибка публикации: {e}")
+        else:
+            if not telegram_enabled:
+                logger.info("📝 Публикация отключена")
+            if not articles_to_publish:
+                logger.info("📭 Нет статей для публикации")
+    finally:
+        # Сохранение результатов
+        output_data = {
+            'timestamp': current_time_kiev.isoformat(),
+            'last_run_time': last_run_time.isoformat() if last_run_time else None,
+            'sources_found': sources_stats,
+            'total_new_articles': len(filtered_news),
+            'total_processed': len(valid_articles),
+            'unique_articles': len(unique_articles),
+            'articles_to_publish': len(articles_to_publish),
+            'sources_to_publish': sources_to_publish,
+            'duplicate_removal': {
+                'internal_duplicates_removed': len(valid_articles) - len(unique_articles),
+                'channel_duplicates_removed': len(unique_articles) - len(articles_to_publish)
+            },
+            'http_cache': dict(engine.cache.stats),
+            'article_cache': dict(article_cache_stats),
+            'llm': dict(llm.stats),
         }
-    }
     
+        try:
+            import json
+            with open('processed_news.json', 'w', encoding='utf-8') as f:
+                json.dump(output_data, f, ensure_ascii=False, indent=2)
+            logger.info("💾 Результаты сохранены в processed_news.json")
+        except Exception as e:
+            logger.error(f"❌ Ошибка сохранения: {e}")
+
+        logger.info("="*60)
+        logger.info("📊 ФИНАЛЬНАЯ СТАТИСТИКА:")
+        logger.info(f"   📥 Получено новостей: {len(all_news)}")
+        logger.info(f"   🔄 Обработано AI: {len(valid_articles)}")
+        logger.info(f"   💾 Кэш LLM: {llm.cache_summary()}")
+        logger.info(f"   🎯 Уникальных: {len(unique_articles)}")
+        logger.info(f"   📤 К публикации: {len(articles_to_publish)}")
+        if telegram_enabled:
+            logger.info(f"   ✅ Опубликовано: {successful_posts}")
+        logger.info("="*60)
+
+async def run_once():
+    """Один запуск из командной строки: после цикла закрываем пул соединений"""
     try:
-        import json
-        with open('processed_news.json', 'w', encoding='utf-8') as f:
-            json.dump(output_data, f, ensure_ascii=False, indent=2)
-        logger.info("💾 Результаты сохранены в processed_news.json")
-    except Exception as e:
-        logger.error(f"❌ Ошибка сохранения: {e}")
-
-    logger.info("="*60)
-    logger.info("📊 ФИНАЛЬНАЯ СТАТИСТИКА:")
-    logger.info(f"   📥 Получено новостей: {len(all_news)}")
-    logger.info(f"   🔄 Обработано AI: {len(valid_articles)}")
-    logger.info(f"   🎯 Уникальных: {len(unique_articles)}")
-    logger.info(f"   📤 К публикации: {len(articles_to_publish)}")
-    if telegram_enabled:
-        logger.info(f"   ✅ Опубликовано: {successful_posts if 'successful_posts' in locals() else 0}")
-    logger.info("="*60)
+        await main()
+    finally:
+        await get_engine().aclose()
 
 if __name__ == "__main__":
     try:
-        asyncio.run(main())
+        asyncio.run(run_once())
     except KeyboardInterrupt:
         logger.info("⏹️  Остановлено пользователем")
         sys.exit(0)
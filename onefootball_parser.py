@@ -1,5 +1,6 @@
+import asyncio
 import requests
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, Tag
 import re
 from urllib.parse import urljoin
 from datetime import datetime, timedelta
@@ -8,7 +9,13 @@ import logging
 import random
 import time
 import json
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
 
+import diagnostics
+from db import get_source_state, set_source_state
+from fetcher import SourceBudget
+from html_parsing import embedded_json, embedded_json_from_soup, make_soup, next_page_link, selector_predicate
+from sources import Article, ArticleLink, ArticleOutcome, Source, register_source
 
 # Настройка логирования
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -24,11 +31,42 @@ CONFIG = {
     'BASE_URL': 'https://onefootball.com/en/home',
     'NEWS_API_URL': 'https://onefootball.com/en/news',
     'MAX_NEWS': 15,  # Увеличено для большего покрытия
+    'MAX_LISTING_PAGES': 3,  # Сколько страниц одной ленты листать назад до since_time
     'RETRY_ATTEMPTS': 3,
     'RETRY_DELAY': 2,
+    'HEDGE_DELAY': 2.0,  # Только get_first_listing: через сколько секунд без ответа запрашивать следующую ленту
     'REQUEST_DELAY': 1.5,  # Задержка между запросами к статьям
 }
 
+# Ключи полей тизера во встроенном JSON (__NEXT_DATA__ / JSON-LD), в порядке приоритета
+JSON_KEYS = {
+    'title': ('title', 'headline', 'name'),
+    'link': ('link', 'url', 'href', 'path', 'slug'),
+    'time': ('publishTime', 'publishedAt', 'publishDate', 'publishedDate', 'datePublished',
+             'publicationDate', 'createdAt', 'date'),
+    'image': ('image', 'imageObject', 'imageUrl', 'teaserImage', 'coverImage', 'thumbnail'),
+    'summary': ('description', 'teaser', 'summary', 'preview', 'subtitle', 'lead'),
+}
+NEWS_LINK_PATTERNS = ('/news/', '/match/', '/article/', '/story/')
+# Селекторы тизеров OneFootball (порядок задаёт приоритет при совпадении одной ссылки)
+TEASER_SELECTORS = [
+    # Современные селекторы OneFootball
+    '[data-testid*="teaser"]',
+    '[data-testid*="card"]',
+    '[data-testid*="article"]',
+    '[data-testid*="story"]',
+    '.of-teaser',
+    '.teaser-card',
+    '.article-teaser',
+    '.story-teaser',
+    '[class*="Teaser"]',
+    '[class*="Card"]',
+    '[class*="Article"]'
+]
+TEASER_MATCHERS = [selector_predicate(selector) for selector in TEASER_SELECTORS]
+# Ключи ссылки на следующую страницу ленты во встроенном JSON
+JSON_NEXT_PAGE_KEYS = ('nextPageUrl', 'nextPageLink', 'nextPage', 'next')
+
 KIEV_TZ = ZoneInfo("Europe/Kiev")
 
 class OneFootballParser:
@@ -113,44 +151,81 @@ class OneFootballParser:
             logger.warning(f"Ошибка парсинга времени '{time_str}': {e}")
             return current_time
 
-    def get_page_content(self, url: str, attempt: int = 1) -> BeautifulSoup:
-        """Получает содержимое страницы с повторными попытками."""
+    def get_page_content(self, url: str, attempt: int = 1,
+                         max_attempts: int = CONFIG['RETRY_ATTEMPTS'], session=None) -> BeautifulSoup:
+        """Получает содержимое страницы с повторными попытками.
+
+        session - своя сессия для вызова из потока (по умолчанию self.session).
+        """
+        session = session or self.session
         try:
-            logger.info(f"🌐 Загружаем страницу (попытка {attempt}/{CONFIG['RETRY_ATTEMPTS']}): {url}")
+            logger.info(f"🌐 Загружаем страницу (попытка {attempt}/{max_attempts}): {url}")
             
-            # Меняем User-Agent для каждой попытки
-            self.session.headers.update({
+            # Меняем User-Agent для каждой попытки - в заголовках запроса, а не сессии,
+            # чтобы параллельные загрузки не меняли заголовки друг другу
+            response = session.get(url, timeout=20, headers={
                 "User-Agent": random.choice(CONFIG['USER_AGENTS'])
             })
-            
-            response = self.session.get(url, timeout=20)
             response.raise_for_status()
             
             logger.info(f"✅ Страница загружена: {len(response.content)} байт")
             
-            # Сохраняем HTML для отладки только при проблемах
-            if attempt > 1:  # Сохраняем только если была проблема
-                debug_filename = f'onefootball_debug_{attempt}.html'
-                with open(debug_filename, 'w', encoding='utf-8') as f:
-                    f.write(response.text)
-                logger.info(f"🔍 HTML сохранен для отладки: {debug_filename}")
+            # Сохраняем HTML для отладки только при проблемах и в режиме диагностики
+            if attempt > 1 and diagnostics.enabled():
+                diagnostics.dump_page('OneFootball', url, response.text, f"загружена с попытки {attempt}")
             
-            return BeautifulSoup(response.text, "html.parser")
+            return make_soup(response.text)
             
         except requests.exceptions.RequestException as e:
             logger.error(f"❌ Ошибка сетевого запроса (попытка {attempt}): {e}")
-            if attempt < CONFIG['RETRY_ATTEMPTS']:
+            if attempt < max_attempts:
                 logger.info(f"⏳ Ждем {CONFIG['RETRY_DELAY']} секунд перед следующей попыткой...")
                 time.sleep(CONFIG['RETRY_DELAY'])
-                return self.get_page_content(url, attempt + 1)
+                return self.get_page_content(url, attempt + 1, max_attempts, session)
             return None
         except Exception as e:
             logger.error(f"❌ Общая ошибка загрузки (попытка {attempt}): {e}")
-            if attempt < CONFIG['RETRY_ATTEMPTS']:
+            if attempt < max_attempts:
                 time.sleep(CONFIG['RETRY_DELAY'])
-                return self.get_page_content(url, attempt + 1)
+                return self.get_page_content(url, attempt + 1, max_attempts, session)
             return None
 
+    def _fetch_listing(self, url: str) -> BeautifulSoup:
+        """Одна попытка загрузки ленты в отдельной сессии: requests.Session не потокобезопасна"""
+        with requests.Session() as session:
+            session.headers.update(self.session.headers)
+            return self.get_page_content(url, 1, 1, session)
+
+    def get_first_listing(self, urls: list) -> tuple:
+        """Хеджированная загрузка ленты для синхронного режима, по одной попытке на URL.
+
+        Первый URL запрашивается сразу, каждый следующий - если за HEDGE_DELAY секунд
+        никто не ответил (или раньше, если предыдущие уже упали). Возвращает (URL, soup)
+        первой загруженной ленты или (None, None).
+
+        Это единственный хеджированный код: его вызывает только синхронный get_latest_news
+        (ручной запуск модуля). Основной цикл идёт через OneFootballSource.discover, который
+        загружает все ленты сразу, без хеджирования.
+        """
+        executor = ThreadPoolExecutor(max_workers=max(1, len(urls)))
+        futures = {}
+        try:
+            for url in urls:
+                futures[executor.submit(self._fetch_listing, url)] = url
+                pending = [future for future in futures if not future.done()]
+                if pending:
+                    wait(pending, timeout=CONFIG['HEDGE_DELAY'], return_when=FIRST_COMPLETED)
+                loaded = [future for future in futures if future.done() and future.result()]
+                if loaded:
+                    return futures[loaded[0]], loaded[0].result()
+            for future in as_completed(futures):
+                if future.result():
+                    return futures[future], future.result()
+            return None, None
+        finally:
+            # Опоздавшие запросы дорабатывают в фоне, их результат не нужен
+            executor.shutdown(wait=False, cancel_futures=True)
+
     def debug_page_structure(self, soup: BeautifulSoup, show_details: bool = False):
         """Отладочная функция для анализа структуры страницы."""
         if not show_details:
@@ -185,96 +260,108 @@ class OneFootballParser:
         logger.info("=" * 50)
 
     def find_news_articles_advanced(self, soup: BeautifulSoup) -> list:
-        """Расширенный поиск статей на странице с улучшенными селекторами."""
-        found_articles = []
-        
+        """Расширенный поиск статей на странице с улучшенными селекторами.
+
+        Дерево обходится один раз, все селекторы проверяются на каждом элементе, а кандидаты
+        складываются в индекс по URL: тизер, совпавший с несколькими селекторами, разбирается
+        и попадает в результат один раз (с приоритетом селектора, стоящего раньше в TEASER_SELECTORS).
+        """
         # Метод 1: Поиск по современным селекторам OneFootball
         logger.info("🔍 Метод 1: Поиск по специфичным селекторам OneFootball")
-        
-        modern_selectors = [
-            # Современные селекторы OneFootball
-            '[data-testid*="teaser"]',
-            '[data-testid*="card"]',
-            '[data-testid*="article"]',
-            '[data-testid*="story"]',
-            '.of-teaser',
-            '.teaser-card',
-            '.article-teaser',
-            '.story-teaser',
-            '[class*="Teaser"]',
-            '[class*="Card"]',
-            '[class*="Article"]'
-        ]
-        
-        for selector in modern_selectors:
-            elements = soup.select(selector)
-            logger.info(f"   Селектор '{selector}': найдено {len(elements)} элементов")
-            
-            for element in elements:
-                # Ищем ссылку и заголовок в элементе
-                link = element.find('a', href=True)
-                title_elem = element.find(['h1', 'h2', 'h3', 'h4', 'h5', 'span', 'p'])
-                
-                if link and title_elem:
-                    href = link.get('href', '')
-                    title_text = title_elem.get_text(strip=True)
-                    
-                    # Проверяем что это новостная ссылка с нормальным заголовком
-                    if (any(pattern in href for pattern in ['/news/', '/match/', '/article/', '/story/']) and
-                        title_text and len(title_text) > 15 and len(title_text) < 200):
-                        
-                        found_articles.append({
-                            'element': element,
-                            'link': link,
-                            'title': title_text,
-                            'url': href,
-                            'method': f'modern_{selector}'
-                        })
-        
-        logger.info(f"   Найдено {len(found_articles)} статей через современные селекторы")
-        
+
+        selector_counts = [0] * len(TEASER_SELECTORS)
+        teaser_fields = {}      # id(элемента) -> (ссылка, заголовок, href) или None
+        teasers_by_url = {}     # URL без параметров -> (индекс селектора, позиция, статья)
+        seen_hrefs = set()
+        anchors = []
+        teaser_matches = 0
+
+        position = 0
+        for element in soup.descendants:
+            if not isinstance(element, Tag):
+                continue
+            position += 1
+            if element.name == 'a' and element.has_attr('href'):
+                anchors.append(element)
+            for index, matches in enumerate(TEASER_MATCHERS):
+                if not matches(element):
+                    continue
+                selector_counts[index] += 1
+                if id(element) not in teaser_fields:
+                    teaser_fields[id(element)] = self._teaser_fields(element)
+                fields = teaser_fields[id(element)]
+                if not fields:
+                    continue
+                link, title_text, href = fields
+                teaser_matches += 1
+                seen_hrefs.add(href)
+                url_key = href.split('?')[0]  # Убираем параметры запроса
+                known = teasers_by_url.get(url_key)
+                if known is None or (index, position) < known[:2]:
+                    teasers_by_url[url_key] = (index, position, {
+                        'element': element,
+                        'link': link,
+                        'title': title_text,
+                        'url': href,
+                        'method': f'modern_{TEASER_SELECTORS[index]}'
+                    })
+
+        for selector, count in zip(TEASER_SELECTORS, selector_counts):
+            logger.info(f"   Селектор '{selector}': найдено {count} элементов")
+        logger.info(f"   Найдено {len(teasers_by_url)} статей через современные селекторы")
+
+        unique_articles = [article for _, _, article in sorted(teasers_by_url.values(), key=lambda t: t[:2])]
+
         # Метод 2: Поиск по ссылкам на новости (если мало результатов)
-        if len(found_articles) < 5:
+        if teaser_matches < 5:
             logger.info("🔍 Метод 2: Поиск по всем новостным ссылкам")
-            news_links = soup.find_all('a', href=True)
-            
-            for link in news_links:
+            for link in anchors:
                 href = link.get('href', '')
-                if any(pattern in href for pattern in ['/news/', '/match/', '/article/', '/story/']):
-                    title_text = link.get_text(strip=True)
-                    
-                    # Проверяем качество заголовка
-                    if (title_text and 15 < len(title_text) < 200 and
-                        not any(skip in title_text.lower() for skip in 
-                               ['menu', 'navigation', 'cookie', 'subscribe', 'follow', 'share'])):
-                        
-                        # Пытаемся найти родительский контейнер
-                        parent_container = link.find_parent(['article', 'div', 'li', 'section'])
-                        if parent_container:
-                            # Проверяем, не добавили ли уже эту статью
-                            if not any(art['url'] == href for art in found_articles):
-                                found_articles.append({
-                                    'element': parent_container,
-                                    'link': link,
-                                    'title': title_text,
-                                    'url': href,
-                                    'method': 'link_based'
-                                })
-        
-        logger.info(f"   Найдено дополнительно через ссылки: {len(found_articles)} статей всего")
-        
-        # Убираем дубликаты по URL
-        unique_articles = []
-        seen_urls = set()
-        for article in found_articles:
-            normalized_url = article['url'].split('?')[0]  # Убираем параметры запроса
-            if normalized_url not in seen_urls:
-                unique_articles.append(article)
-                seen_urls.add(normalized_url)
-        
+                if href in seen_hrefs or not any(pattern in href for pattern in NEWS_LINK_PATTERNS):
+                    continue
+                title_text = link.get_text(strip=True)
+
+                # Проверяем качество заголовка
+                if (title_text and 15 < len(title_text) < 200 and
+                    not any(skip in title_text.lower() for skip in
+                           ['menu', 'navigation', 'cookie', 'subscribe', 'follow', 'share'])):
+
+                    # Пытаемся найти родительский контейнер
+                    parent_container = link.find_parent(['article', 'div', 'li', 'section'])
+                    if parent_container:
+                        seen_hrefs.add(href)
+                        url_key = href.split('?')[0]
+                        if url_key not in teasers_by_url:
+                            teasers_by_url[url_key] = None
+                            unique_articles.append({
+                                'element': parent_container,
+                                'link': link,
+                                'title': title_text,
+                                'url': href,
+                                'method': 'link_based'
+                            })
+
+            logger.info(f"   Найдено дополнительно через ссылки: {len(unique_articles)} статей всего")
+
         logger.info(f"✅ Финальный результат: {len(unique_articles)} уникальных статей")
         return unique_articles
 
+    def _teaser_fields(self, element):
+        """Ссылка и заголовок тизера или None, если элемент не похож на новость."""
+        # Ищем ссылку и заголовок в элементе
+        link = element.find('a', href=True)
+        title_elem = element.find(['h1', 'h2', 'h3', 'h4', 'h5', 'span', 'p'])
+        if not (link and title_elem):
+            return None
+        href = link.get('href', '')
+        title_text = title_elem.get_text(strip=True)
+
+        # Проверяем что это новостная ссылка с нормальным заголовком
+        if (any(pattern in href for pattern in NEWS_LINK_PATTERNS) and
+            title_text and len(title_text) > 15 and len(title_text) < 200):
+            return link, title_text, href
+        return None
+
     def extract_article_data(self, article_data: dict, current_time: datetime) -> dict:
         """Извлекает все необходимые данные из найденной статьи."""
         try:
@@ -413,7 +500,15 @@ class OneFootballParser:
             soup = self.get_page_content(url)
             if not soup:
                 return "", ""
+            return self.extract_full_article(soup, url)
+
+        except Exception as e:
+            logger.error(f"Ошибка загрузки статьи {url}: {e}")
+            return "", ""
 
+    def extract_full_article(self, soup: BeautifulSoup, url: str) -> tuple[str, str]:
+        """Извлекает полный текст и изображение из уже загруженной страницы статьи."""
+        try:
             # Расширенные селекторы для контента OneFootball
             content_selectors = [
                 # Специфичные для OneFootball
@@ -536,83 +631,196 @@ class OneFootballParser:
             return article_text, image_url
 
         except Exception as e:
-            logger.error(f"Ошибка загрузки статьи {url}: {e}")
+            logger.error(f"Ошибка разбора статьи {url}: {e}")
             return "", ""
 
+    def default_since_time(self, current_time: datetime) -> datetime:
+        """since_time по умолчанию: после ночной паузы - с 01:00, иначе последние 20 минут."""
+        current_hour = current_time.hour
+        current_minute = current_time.minute
+        if 5 <= current_hour < 6 and current_minute >= 50 or current_hour == 6 and current_minute <= 10:
+            since_time = current_time.replace(hour=1, minute=0, second=0, microsecond=0)
+            logger.info(f"Режим 5 часов: since_time установлено на {since_time}")
+        else:
+            since_time = current_time - timedelta(minutes=20)
+            logger.info(f"Режим 20 минут: since_time установлено на {since_time}")
+        return since_time
+
+    def parse_listing(self, soup: BeautifulSoup, current_time: datetime) -> list:
+        """Извлекает данные всех тизеров страницы-списка (без фильтра по времени)."""
+        articles = self.parse_embedded_listing(embedded_json_from_soup(soup), current_time)
+        return articles or self.parse_listing_selectors(soup, current_time)
+
+    def parse_embedded_listing(self, payloads: list, current_time: datetime,
+                               limit: int = CONFIG['MAX_NEWS']) -> list:
+        """Тизеры из встроенного JSON страницы: один разбор JSON вместо селекторов по всему дереву.
+
+        Тизер - любой объект с заголовком, ссылкой на новость и временем или картинкой.
+        """
+        articles = []
+        seen_urls = set()
+        for method, data in payloads:
+            stack = [data]
+            while stack and (limit is None or len(articles) < limit):
+                node = stack.pop()
+                if isinstance(node, list):
+                    stack.extend(reversed(node))
+                    continue
+                if not isinstance(node, dict):
+                    continue
+                stack.extend(reversed(list(node.values())))
+                article_info = self.teaser_from_json(node, method, current_time)
+                if article_info and article_info['url'].split('?')[0] not in seen_urls:
+                    seen_urls.add(article_info['url'].split('?')[0])
+                    articles.append(article_info)
+            if articles:
+                logger.info(f"✅ Встроенный JSON ({method}): {len(articles)} тизеров")
+                return articles
+        return []
+
+    def teaser_from_json(self, item: dict, method: str, current_time: datetime) -> dict:
+        """Поля тизера из объекта встроенного JSON или None, если это не тизер новости."""
+        title = self._json_field(item, 'title')
+        link = self._json_field(item, 'link')
+        if not (isinstance(title, str) and isinstance(link, str)):
+            return None
+        title = title.strip()
+        if not (15 < len(title) < 200 and any(pattern in link for pattern in NEWS_LINK_PATTERNS)):
+            return None
+        raw_time = self._json_field(item, 'time')
+        image_url = self._json_image(self._json_field(item, 'image'))
+        if not raw_time and not image_url:
+            return None
+
+        if isinstance(raw_time, (int, float)) and not isinstance(raw_time, bool):
+            # Unix-время в секундах или миллисекундах
+            publish_time = datetime.fromtimestamp(raw_time / 1000 if raw_time > 1e12 else raw_time, KIEV_TZ)
+            time_str = str(raw_time)
+        elif isinstance(raw_time, str):
+            publish_time = self.parse_publish_time(raw_time, current_time)
+            time_str = raw_time
+        else:
+            publish_time = current_time
+            time_str = ""
+
+        summary = self._json_field(item, 'summary')
+        summary = summary.strip() if isinstance(summary, str) else ""
+        if len(summary) <= 20 or summary.lower() == title.lower():
+            summary = ""
+        return {
+            'title': title,
+            'url': link if link.startswith('http') else urljoin(self.base_url, link),
+            'summary': summary,
+            'publish_time': publish_time,
+            'image_url': urljoin(self.base_url, image_url) if image_url else "",
+            'method': method,
+            'time_str': time_str
+        }
+
+    def _json_field(self, item: dict, field: str):
+        for key in JSON_KEYS[field]:
+            value = item.get(key)
+            if value:
+                return value
+        return None
+
+    def _json_image(self, value) -> str:
+        if isinstance(value, list):
+            value = value[0] if value else None
+        if isinstance(value, dict):
+            value = value.get('path') or value.get('url') or value.get('src') or value.get('contentUrl')
+        if not isinstance(value, str):
+            return ""
+        if any(skip in value.lower() for skip in ['icon', 'logo', 'avatar', '16x16', '32x32', 'favicon']):
+            return ""
+        return value
+
+    def parse_listing_selectors(self, soup: BeautifulSoup, current_time: datetime,
+                                limit: int = CONFIG['MAX_NEWS']) -> list:
+        """Запасной путь: поиск тизеров CSS-селекторами по дереву страницы."""
+        found_articles = self.find_news_articles_advanced(soup)
+        if not found_articles:
+            logger.error("❌ Не найдено ни одной статьи после всех методов поиска")
+            diagnostics.snapshot(lambda: self.debug_page_structure(soup, show_details=True))
+            return []
+
+        articles = []
+        for article_data in found_articles[:limit]:
+            article_info = self.extract_article_data(article_data, current_time)
+            if article_info:
+                articles.append(article_info)
+        return articles
+
+    def next_page_url(self, html: str, payloads: list) -> str:
+        """Следующая страница ленты: <link rel="next"> или ссылка из встроенного JSON."""
+        next_url = next_page_link(html)
+        if next_url:
+            return next_url
+        for _, data in payloads:
+            stack = [data]
+            while stack:
+                node = stack.pop()
+                if isinstance(node, list):
+                    stack.extend(node)
+                elif isinstance(node, dict):
+                    for key in JSON_NEXT_PAGE_KEYS:
+                        value = node.get(key)
+                        if isinstance(value, str) and '/' in value:
+                            return value
+                    stack.extend(node.values())
+        return ""
+
+    def merge_listings(self, listings: list) -> list:
+        """Объединяет тизеры нескольких лент без повторов (по URL без параметров), новые сначала."""
+        merged = {}
+        for articles in listings:
+            for article_info in articles:
+                key = article_info['url'].split('#')[0].split('?')[0].rstrip('/')
+                merged.setdefault(key, article_info)
+        return sorted(merged.values(), key=lambda a: a['publish_time'], reverse=True)
+
+    def filter_fresh(self, articles: list, since_time: datetime) -> list:
+        """Оставляет тизеры, опубликованные не раньше since_time."""
+        fresh_articles = []
+        for article_info in articles:
+            if article_info['publish_time'] < since_time:
+                logger.info(f"   ⏰ Статья старая, пропускаем (время: {article_info['publish_time'].strftime('%H:%M %d.%m')})")
+                continue
+            fresh_articles.append(article_info)
+        return fresh_articles
+
     def get_latest_news(self, since_time: datetime = None) -> list:
         """Получает последние новости с OneFootball с улучшенной логикой поиска."""
         current_time = datetime.now(KIEV_TZ)
         if since_time is None:
-            current_hour = current_time.hour
-            current_minute = current_time.minute
-            if 5 <= current_hour < 6 and current_minute >= 50 or current_hour == 6 and current_minute <= 10:
-                since_time = current_time.replace(hour=1, minute=0, second=0, microsecond=0)
-                logger.info(f"Режим 5 часов: since_time установлено на {since_time}")
-            else:
-                since_time = current_time - timedelta(minutes=20)
-                logger.info(f"Режим 20 минут: since_time установлено на {since_time}")
+            since_time = self.default_since_time(current_time)
 
         logger.info(f"🔍 Загружаем OneFootball (с {since_time.strftime('%H:%M %d.%m.%Y')})...")
 
-        # Пробуем разные URL
-        urls_to_try = [
-            self.base_url,
-            self.news_url,
-            'https://onefootball.com/en/news/all',
-            'https://onefootball.com/en/news/football'
-        ]
-        
-        soup = None
-        successful_url = None
-        
-        for url in urls_to_try:
-            logger.info(f"🌐 Пробуем загрузить: {url}")
-            soup = self.get_page_content(url)
-            if soup:
-                successful_url = url
-                logger.info(f"✅ Успешно загружен: {url}")
-                break
-            else:
-                logger.warning(f"❌ Не удалось загрузить: {url}")
-                time.sleep(2)  # Пауза между попытками
+        # Запасные ленты запрашиваются, только если основная не ответила за HEDGE_DELAY
+        successful_url, soup = self.get_first_listing(_ordered_listing_urls(self))
+        if successful_url:
+            set_source_state('OneFootball', 'listing_url', successful_url)
+            logger.info(f"✅ Успешно загружен: {successful_url}")
         
         if not soup:
             logger.error("❌ Не удалось загрузить ни один из URL")
             return []
 
-        # Отладка структуры (только при проблемах)
-        self.debug_page_structure(soup, show_details=False)
-        
-        # Расширенный поиск статей
-        found_articles = self.find_news_articles_advanced(soup)
+        # Поиск тизеров и фильтрация по времени публикации
+        listing = self.parse_listing(soup, current_time)
+        if not listing:
+            diagnostics.dump_page('OneFootball', successful_url, str(soup), "тизеры не найдены")
+        fresh_articles = self.filter_fresh(listing, since_time)
         
-        if not found_articles:
-            logger.error("❌ Не найдено ни одной статьи после всех методов поиска")
-            # При полном отсутствии результатов включаем детальную отладку
-            self.debug_page_structure(soup, show_details=True)
-            return []
-        
-        logger.info(f"🔍 Обрабатываем {len(found_articles)} найденных статей...")
+        logger.info(f"🔍 Обрабатываем {len(fresh_articles)} свежих статей...")
         
         news_items = []
         processed_count = 0
         
-        # Ограничиваем количество статей для обработки
-        articles_to_process = found_articles[:CONFIG['MAX_NEWS']]
-        
-        for i, article_data in enumerate(articles_to_process, 1):
+        for i, article_info in enumerate(fresh_articles, 1):
             try:
-                logger.info(f"📰 Обрабатываем статью {i}/{len(articles_to_process)}...")
-                
-                # Извлекаем базовые данные
-                article_info = self.extract_article_data(article_data, current_time)
-                if not article_info:
-                    continue
-                
-                # Проверяем время публикации
-                if article_info['publish_time'] < since_time:
-                    logger.info(f"   ⏰ Статья старая, пропускаем (время: {article_info['publish_time'].strftime('%H:%M %d.%m')})")
-                    continue
+                logger.info(f"📰 Обрабатываем статью {i}/{len(fresh_articles)}...")
                 
                 # Загружаем полный контент статьи
                 logger.info(f"   📄 Загружаем полный контент...")
@@ -645,14 +853,14 @@ class OneFootballParser:
                 logger.info(f"   ✅ Статья добавлена: {article_info['title'][:50]}...")
                 
                 # Пауза между запросами к статьям
-                if i < len(articles_to_process):
+                if i < len(fresh_articles):
                     time.sleep(CONFIG['REQUEST_DELAY'])
 
             except Exception as e:
                 logger.error(f"   ❌ Ошибка обработки статьи {i}: {e}")
                 continue
 
-        logger.info(f"✅ OneFootball: найдено {processed_count} из {len(found_articles)} статей")
+        logger.info(f"✅ OneFootball: найдено {processed_count} из {len(fresh_articles)} статей")
         logger.info("   🔄 Обработка и перевод будут выполнены в ai_processor.py")
         
         # Сортируем по времени публикации (новые сначала)
@@ -670,12 +878,154 @@ class OneFootballParser:
         return news_items
 
 
+_parser = None
+
+
+def _listing_urls(parser: OneFootballParser) -> list:
+    return [
+        parser.base_url,
+        parser.news_url,
+        'https://onefootball.com/en/news/all',
+        'https://onefootball.com/en/news/football'
+    ]
+
+
+def _ordered_listing_urls(parser: OneFootballParser) -> list:
+    """Страницы-списки, начиная с той, что ответила в прошлый раз."""
+    urls = _listing_urls(parser)
+    last_good = get_source_state('OneFootball', 'listing_url')
+    if last_good in urls:
+        urls.remove(last_good)
+        urls.insert(0, last_good)
+    return urls
+
+
+def get_parser() -> OneFootballParser:
+    """Общий экземпляр парсера - HTTP-сессия переживает циклы резидентного режима."""
+    global _parser
+    if _parser is None:
+        _parser = OneFootballParser()
+    return _parser
+
+
 def get_latest_news(since_time: datetime = None) -> list:
     """Функция-обертка для совместимости с main.py."""
-    parser = OneFootballParser()
+    parser = get_parser()
     return parser.get_latest_news(since_time)
 
 
+
+@register_source
+class OneFootballSource(Source):
+    """OneFootball как плагин: страница-список и страницы статей."""
+    name = 'OneFootball'
+    hosts = ('onefootball.com',)
+    budget = SourceBudget(max_concurrency=4, requests_per_second=1.5, burst=4)
+    headers = {
+        "Accept-Language": "en-US,en;q=0.9,uk;q=0.8",
+        "Referer": "https://onefootball.com/",
+    }
+
+    def __init__(self):
+        self.parser = get_parser()
+
+    async def discover(self, engine, since_time: datetime) -> list:
+        current_time = datetime.now(KIEV_TZ)
+        if since_time is None:
+            since_time = self.parser.default_since_time(current_time)
+
+        # Все ленты грузятся параллельно: в загруженные часы новость может уйти с главной
+        # раньше следующего цикла, но остаться в /news или /news/all
+        urls = _ordered_listing_urls(self.parser)
+        feeds = await asyncio.gather(*(self._crawl_feed(engine, url, since_time) for url in urls))
+        loaded = [(url, feed) for url, feed in zip(urls, feeds) if feed is not None]
+        if not loaded:
+            logger.error("❌ Не удалось загрузить ни один из URL")
+            return []
+        for url, feed in loaded:
+            logger.info(f"✅ Успешно загружен: {url} ({len(feed)} тизеров)")
+        set_source_state(self.name, 'listing_url', loaded[0][0])
+
+        articles = self.parser.filter_fresh(self.parser.merge_listings([feed for _, feed in loaded]), since_time)
+        return [
+            ArticleLink(
+                title=info['title'],
+                url=info['url'],
+                publish_time=info['publish_time'],
+                image_url=info['image_url'],
+                summary=info['summary'],
+                extra={'extraction_method': info['method']},
+            )
+            for info in articles
+        ]
+
+    async def _crawl_feed(self, engine, url: str, since_time: datetime):
+        """Тизеры одной ленты; листает страницы назад, пока не дойдёт до since_time.
+
+        None - первая страница ленты не загрузилась.
+        """
+        articles = []
+        page_url = url
+        for page in range(CONFIG['MAX_LISTING_PAGES']):
+            result = await engine.fetch(page_url, retries=CONFIG['RETRY_ATTEMPTS'])
+            if not result:
+                if page == 0:
+                    logger.warning(f"❌ Не удалось загрузить: {url}")
+                    return None
+                break
+            page_articles, next_url = await self.parse_cached(result, self._discover_from_html)
+            if not page_articles and page == 0:
+                diagnostics.dump_page(self.name, page_url, result.text, "тизеры не найдены")
+            articles.extend(page_articles)
+            if not page_articles or not next_url or min(a['publish_time'] for a in page_articles) < since_time:
+                break
+            page_url = urljoin(result.url, next_url)
+        return articles
+
+    def _discover_from_html(self, html: str):
+        # Относительное время ("2 hours ago") считается от момента разбора страницы
+        current_time = datetime.now(KIEV_TZ)
+        payloads = embedded_json(html)
+        articles = self.parser.parse_embedded_listing(payloads, current_time, limit=None)
+        if not articles:
+            articles = self.parser.parse_listing_selectors(make_soup(html), current_time, limit=None)
+        return articles, self.parser.next_page_url(html, payloads)
+
+    async def fetch_article(self, engine, link: ArticleLink, since_time: datetime):
+        result = await engine.fetch(link.url)
+        if not result:
+            return ArticleOutcome(ArticleOutcome.FETCH_ERROR, error=f"не удалось загрузить {link.url}")
+        article_text, full_image_url = await asyncio.to_thread(self._process_html, result.text, link.url)
+
+        word_count = len(article_text.split())
+        if word_count > 500:
+            logger.info(f"   ⏩ Статья слишком длинная ({word_count} слов), пропускаем")
+            return ArticleOutcome(ArticleOutcome.TOO_LONG, publish_time=link.publish_time, word_count=word_count)
+
+        article = Article(
+            title=link.title,
+            url=link.url,
+            source=self.name,
+            content=article_text,
+            summary=link.summary,
+            image_url=full_image_url or link.image_url,
+            publish_time=link.publish_time,
+            word_count=word_count,
+            extra=dict(link.extra),
+        )
+        return ArticleOutcome(ArticleOutcome.ACCEPTED, article=article,
+                              publish_time=link.publish_time, word_count=word_count)
+
+    def _process_html(self, html: str, url: str) -> tuple[str, str]:
+        return self.parser.extract_full_article(make_soup(html), url)
+
+    def extract_publish_time(self, soup: BeautifulSoup, url: str):
+        meta = soup.select_one('meta[property="article:published_time"]') or soup.select_one('time[datetime]')
+        if not meta:
+            return None
+        time_str = meta.get('content') or meta.get('datetime')
+        return self.parser.parse_publish_time(time_str) if time_str else None
+
 if __name__ == "__main__":
     logger.info("🎯 ТЕСТИРУЕМ УЛУЧШЕННЫЙ ПАРСЕР ДЛЯ ONEFOOTBALL")
     logger.info("=" * 60)
@@ -709,7 +1059,7 @@ if __name__ == "__main__":
     else:
         logger.error("❌ ОШИБКА! Новостей не найдено")
         logger.info("\n🔧 РЕКОМЕНДАЦИИ ПО ОТЛАДКЕ:")
-        logger.info("1. Проверьте файлы onefootball_debug_*.html")
+        logger.info(f"1. Проверьте страницы в {diagnostics.FAILURES_DIR} (python benchmarks.py teasers ...)")
         logger.info("2. Убедитесь, что сайт доступен")
         logger.info("3. Возможно, структура сайта изменилась")
     
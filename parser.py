@@ -1,14 +1,41 @@
+import asyncio
 import requests
-from bs4 import BeautifulSoup
-import re
+from bs4 import Tag
 from urllib.parse import urljoin
 import time
 from datetime import datetime, timedelta
 from typing import List, Dict, Any, Optional
 from zoneinfo import ZoneInfo
 
+import diagnostics
+from fetcher import SourceBudget
+from html_parsing import make_soup, parse_head
+from sources import Article, ArticleLink, ArticleOutcome, PublishTimeProbe, Source, register_source
+from text_utils import (DATE_LINE_RE, GOLOVNE_HEADER_RE, GOLOVNE_TEXT_RE, PHOTO_CREDIT_RE, SENTENCE_SPLIT_RE,
+                        TEXT_DATE_PATTERNS, count_meaningful_words, is_news_link, parse_date_parts)
+
 KIEV_TZ = ZoneInfo("Europe/Kiev")
 
+# Служебные блоки, которые не входят в текст статьи: теги, точные классы и подстроки атрибута class
+UNWANTED_TAGS = frozenset({
+    'script', 'style', 'iframe', 'noscript', 'svg',
+    'header', 'nav', 'footer', 'aside',
+    'h1', 'h2', 'h3', 'h4', 'h5', 'h6',  # Исключаем подзаголовки
+    'ul', 'ol', 'li',  # Исключаем списки
+    'blockquote',  # Исключаем цитаты
+})
+UNWANTED_CLASSES = frozenset({
+    'header', 'footer', 'navigation', 'nav',
+    'breadcrumb', 'tags', 'meta', 'author', 'date', 'time',
+    'article-date', 'publish-date', 'news-date',
+    'social-buttons', 'article-info', 'news-info',
+    'photo-credit', 'image-caption', 'getty-images',
+})
+UNWANTED_CLASS_PARTS = (
+    'ad', 'banner', 'advertisement', 'social', 'share', 'related',
+    'comment', 'sidebar', 'widget', 'date', 'time', 'meta',
+)
+
 class FootballUATargetedParser:
     def __init__(self, max_consecutive_old=2):
         self.base_url = "https://football.ua/"
@@ -28,33 +55,27 @@ class FootballUATargetedParser:
         try:
             response = self.session.get(url, timeout=15)
             response.raise_for_status()
-            return BeautifulSoup(response.text, "html.parser")
+            return make_soup(response.text)
         except Exception as e:
             print(f"Ошибка загрузки {url}: {e}")
             return None
     
     def find_golovne_za_dobu_section(self, soup):
         """Находит конкретно блок 'ГОЛОВНЕ ЗА ДОБУ'"""
-        header_texts = [
-            "ГОЛОВНЕ ЗА ДОБУ",
-            "головне за добу", 
-            "Головне за добу"
-        ]
-        
-        for header_text in header_texts:
-            header_element = soup.find(text=re.compile(header_text, re.I))
-            if header_element:
-                print(f"✅ Найден заголовок: '{header_text}'")
-                parent = header_element.parent
-                while parent and parent.name not in ['section', 'div', 'article']:
-                    parent = parent.parent
-                if parent:
-                    news_container = parent.find_next(['div', 'ul', 'section'])
-                    if news_container:
-                        print(f"✅ Найден контейнер новостей после заголовка")
-                        return news_container
-                    else:
-                        return parent
+        # Регистр заголовка на сайте менялся; шаблон без учёта регистра находит любой вариант
+        header_element = soup.find(text=GOLOVNE_HEADER_RE)
+        if header_element:
+            print(f"✅ Найден заголовок: '{header_element.strip()}'")
+            parent = header_element.parent
+            while parent and parent.name not in ['section', 'div', 'article']:
+                parent = parent.parent
+            if parent:
+                news_container = parent.find_next(['div', 'ul', 'section'])
+                if news_container:
+                    print(f"✅ Найден контейнер новостей после заголовка")
+                    return news_container
+                else:
+                    return parent
         
         possible_selectors = [
             '.sidebar', '.right-column', '.side-block', '.news-sidebar',
@@ -65,7 +86,7 @@ class FootballUATargetedParser:
         for selector in possible_selectors:
             elements = soup.select(selector)
             for element in elements:
-                if re.search(r'головне.*за.*добу', element.get_text(), re.I):
+                if GOLOVNE_TEXT_RE.search(element.get_text()):
                     print(f"✅ Найден блок через селектор: {selector}")
                     return element
         
@@ -82,6 +103,15 @@ class FootballUATargetedParser:
     
     def extract_news_from_section(self, section, since_time: Optional[datetime] = None):
         """Извлекает новости из найденной секции с фильтрацией по времени"""
+        unique_news = self.collect_section_links(section)
+        if since_time:
+            print(f"🕒 Фильтруем новости с {since_time.strftime('%H:%M %d.%m.%Y')}")
+            return unique_news
+        else:
+            return unique_news[:5]
+    
+    def collect_section_links(self, section):
+        """Все уникальные новостные ссылки секции в порядке появления"""
         if not section:
             return []
         
@@ -107,90 +137,66 @@ class FootballUATargetedParser:
             if news['url'] not in seen_urls:
                 unique_news.append(news)
                 seen_urls.add(news['url'])
-        
-        if since_time:
-            print(f"🕒 Фильтруем новости с {since_time.strftime('%H:%M %d.%m.%Y')}")
-            return unique_news
-        else:
-            return unique_news[:5]
+        return unique_news
     
     def is_news_link(self, href):
         """Проверяет, является ли ссылка новостной"""
-        if not href:
-            return False
-        news_patterns = [
-            r'/news/', r'/ukraine/', r'/world/', r'/europe/', r'/england/',
-            r'/spain/', r'/italy/', r'/germany/', r'/france/', r'/poland/',
-            r'/\d+[^/]*\.html'
-        ]
-        return any(re.search(pattern, href) for pattern in news_patterns)
+        return is_news_link(href)
     
     def parse_ukrainian_date(self, date_text: str) -> Optional[datetime]:
         """Парсит украинский формат даты"""
         try:
-            ukrainian_months = {
-                'січня': 1, 'лютого': 2, 'березня': 3, 'квітня': 4, 'травня': 5, 'червня': 6,
-                'липня': 7, 'серпня': 8, 'вересня': 9, 'жовтня': 10, 'листопада': 11, 'грудня': 12,
-                'січ': 1, 'лют': 2, 'бер': 3, 'кві': 4, 'тра': 5, 'чер': 6,
-                'лип': 7, 'сер': 8, 'вер': 9, 'жов': 10, 'лис': 11, 'гру': 12
-            }
-            cleaned_text = re.sub(r'[,.]', '', date_text.lower().strip())
-            pattern1 = r'(\d{1,2})\s+(\w+)\s+(\d{4})[\s,]+(\d{1,2}):(\d{2})'
-            match1 = re.search(pattern1, cleaned_text)
-            if match1:
-                day = int(match1.group(1))
-                month_name = match1.group(2)
-                year = int(match1.group(3))
-                hour = int(match1.group(4))
-                minute = int(match1.group(5))
-                if month_name in ukrainian_months:
-                    month = ukrainian_months[month_name]
-                    return datetime(year, month, day, hour, minute, tzinfo=KIEV_TZ)
-            pattern2 = r'(\d{1,2})\.(\d{1,2})\.(\d{4})[\s,]+(\d{1,2}):(\d{2})'
-            match2 = re.search(pattern2, cleaned_text)
-            if match2:
-                day = int(match2.group(1))
-                month = int(match2.group(2))
-                year = int(match2.group(3))
-                hour = int(match2.group(4))
-                minute = int(match2.group(5))
+            parsed = parse_date_parts(date_text)
+            if not parsed:
+                return None
+            kind, parts = parsed
+            if kind == 'date':
+                day, month, year, hour, minute = parts
                 return datetime(year, month, day, hour, minute, tzinfo=KIEV_TZ)
-            pattern3 = r'^(\d{1,2}):(\d{2})$'
-            match3 = re.search(pattern3, cleaned_text)
-            if match3:
-                hour = int(match3.group(1))
-                minute = int(match3.group(2))
-                today = datetime.now(KIEV_TZ).replace(hour=hour, minute=minute, second=0, microsecond=0)
-                return today
+            hour, minute = parts
+            return datetime.now(KIEV_TZ).replace(hour=hour, minute=minute, second=0, microsecond=0)
         except Exception as e:
             print(f"⚠️ Ошибка парсинга украинской даты '{date_text}': {e}")
         return None
     
+    def parse_meta_time(self, content: str) -> Optional[datetime]:
+        """ISO-время из мета-тега или JSON-LD в киевском часовом поясе"""
+        if 'T' not in content:
+            return None
+        try:
+            parsed_date = datetime.fromisoformat(content.replace('Z', '+00:00').replace('+00:00', ''))
+            return parsed_date.astimezone(KIEV_TZ)
+        except Exception as e:
+            print(f"⚠️ Не удалось спарсить мета-тег: {e}")
+            return None
+
+    def extract_meta_publish_time(self, soup) -> Optional[datetime]:
+        """Время публикации из мета-тегов; хватает дерева одного <head>"""
+        meta_selectors = [
+            'meta[property="article:published_time"]',
+            'meta[name="publish_date"]', 'meta[name="date"]',
+            'meta[property="og:published_time"]',
+            'meta[name="DC.date"]', 'meta[itemprop="datePublished"]'
+        ]
+        for selector in meta_selectors:
+            meta_tag = soup.select_one(selector)
+            if meta_tag:
+                content = meta_tag.get('content', '')
+                if content:
+                    print(f"📅 Найден мета-тег {selector}: {content}")
+                    parsed_date_kiev = self.parse_meta_time(content)
+                    if parsed_date_kiev:
+                        print(f"✅ Успешно спарсен мета-тег: {parsed_date_kiev}")
+                        return parsed_date_kiev
+        return None
+
     def estimate_article_publish_time(self, soup, url: str) -> Optional[datetime]:
         """Пытается определить время публикации статьи"""
         try:
             print(f"🕒 Определяем время публикации для: {url}")
-            meta_selectors = [
-                'meta[property="article:published_time"]',
-                'meta[name="publish_date"]', 'meta[name="date"]',
-                'meta[property="og:published_time"]',
-                'meta[name="DC.date"]', 'meta[itemprop="datePublished"]'
-            ]
-            for selector in meta_selectors:
-                meta_tag = soup.select_one(selector)
-                if meta_tag:
-                    content = meta_tag.get('content', '')
-                    if content:
-                        print(f"📅 Найден мета-тег {selector}: {content}")
-                        try:
-                            if 'T' in content:
-                                parsed_date = datetime.fromisoformat(content.replace('Z', '+00:00').replace('+00:00', ''))
-                                parsed_date_kiev = parsed_date.astimezone(KIEV_TZ)
-                                print(f"✅ Успешно спарсен мета-тег: {parsed_date_kiev}")
-                                return parsed_date_kiev
-                        except Exception as e:
-                            print(f"⚠️ Не удалось спарсить мета-тег: {e}")
-                            continue
+            meta_time = self.extract_meta_publish_time(soup)
+            if meta_time:
+                return meta_time
             date_selectors = [
                 '.article-date', '.publish-date', '.news-date',
                 '.date', '.timestamp', 'time[datetime]',
@@ -218,17 +224,12 @@ class FootballUATargetedParser:
                             print(f"✅ Успешно спарсен текст даты: {parsed_date}")
                             return parsed_date
             all_text = soup.get_text()
-            date_patterns = [
-                r'(\d{1,2})\s+(січня|лютого|березня|квітня|травня|червня|липня|серпня|вересня|жовтня|листопада|грудня)\s+(\d{4})[\s,]+(\d{1,2}):(\d{2})',
-                r'(\d{1,2})\.(\d{1,2})\.(\d{4})[\s,]+(\d{1,2}):(\d{2})',
-                r'(\d{1,2})/(\d{1,2})/(\d{4})[\s,]+(\d{1,2}):(\d{2})'
-            ]
-            for pattern in date_patterns:
-                matches = re.findall(pattern, all_text, re.IGNORECASE)
+            for ukrainian_month, pattern in TEXT_DATE_PATTERNS:
+                matches = pattern.findall(all_text)
                 for match in matches[:3]:
                     if len(match) >= 5:
                         try:
-                            if 'січня' in pattern or 'лютого' in pattern:
+                            if ukrainian_month:
                                 parsed_date = self.parse_ukrainian_date(' '.join(match))
                             else:
                                 day, month, year, hour, minute = map(int, match)
@@ -247,50 +248,61 @@ class FootballUATargetedParser:
     
     def count_words(self, text: str) -> int:
         """ТОЧНЫЙ подсчет слов как делает человек - только значимые слова"""
-        if not text:
-            return 0
-        clean_text = re.sub(r'<[^>]+>', '', text)
-        service_patterns = [
-            r'\d{1,2}\s+\w+\s+\d{4},\s+\d{1,2}:\d{2}',  # даты и время
-            r'getty images', r'фото:.*', r'джерело:.*',
-            r'читайте також:.*', r'\([^)]*\)'
-        ]
-        for pattern in service_patterns:
-            clean_text = re.sub(pattern, '', clean_text, flags=re.IGNORECASE)
-        clean_text = re.sub(r'\s+', ' ', clean_text).strip()
-        word_text = re.sub(r'[^\w\s]', ' ', clean_text, flags=re.UNICODE)
-        words = []
-        for word in word_text.split():
-            word = word.strip()
-            if len(word) >= 2 and not word.isdigit():
-                words.append(word)
-        return len(words)
+        return count_meaningful_words(text)
     
+    def is_service_block(self, element) -> bool:
+        """Сам элемент - служебный блок (без учёта предков)"""
+        if element.name in UNWANTED_TAGS:
+            return True
+        classes = element.get('class') or []
+        if isinstance(classes, str):
+            classes = classes.split()
+        class_attr = ' '.join(classes)
+        return (any(name in UNWANTED_CLASSES for name in classes)
+                or any(part in class_attr for part in UNWANTED_CLASS_PARTS))
+
+    def is_unwanted_element(self, element, removed: Dict[int, bool]) -> bool:
+        """Элемент вырезается из статьи, если он сам или любой его предок - служебный блок.
+
+        removed - кэш решений по id элемента на время разбора одной страницы.
+        """
+        chain = []
+        node = element
+        while node is not None and id(node) not in removed:
+            chain.append(node)
+            node = node.parent
+        verdict = removed[id(node)] if node is not None else False
+        for node in reversed(chain):
+            verdict = verdict or self.is_service_block(node)
+            removed[id(node)] = verdict
+        return removed[id(element)]
+
+    def pruned_text(self, element, removed: Dict[int, bool]) -> str:
+        """get_text(strip=True) без текста вырезанных потомков"""
+        types = element.interesting_string_types
+        parts = []
+        stack = [iter(element.children)]
+        while stack:
+            child = next(stack[-1], None)
+            if child is None:
+                stack.pop()
+            elif isinstance(child, Tag):
+                if not self.is_unwanted_element(child, removed):
+                    stack.append(iter(child.children))
+            elif type(child) is types if isinstance(types, type) else type(child) in types:
+                text = child.strip()
+                if text:
+                    parts.append(text)
+        return ''.join(parts)
+
     def extract_clean_article_content(self, soup):
-        """Извлечение ТОЛЬКО основного текста статьи без подзаголовков, списков и служебной информации"""
-        soup_copy = BeautifulSoup(str(soup), 'html.parser')
-        
-        # Удаляем ненужные элементы
-        unwanted_selectors = [
-            'script', 'style', 'iframe', 'noscript', 'svg',
-            'header', 'nav', 'footer', 'aside',
-            '.header', '.footer', '.navigation', '.nav',
-            '[class*="ad"]', '[class*="banner"]', '[class*="advertisement"]',
-            '[class*="social"]', '[class*="share"]', '[class*="related"]',
-            '[class*="comment"]', '[class*="sidebar"]', '[class*="widget"]',
-            '.breadcrumb', '.tags', '.meta', '.author', '.date', '.time',
-            '.article-date', '.publish-date', '.news-date',
-            '[class*="date"]', '[class*="time"]', '[class*="meta"]',
-            '.social-buttons', '.article-info', '.news-info',
-            '.photo-credit', '.image-caption', '.getty-images',
-            'h1', 'h2', 'h3', 'h4', 'h5', 'h6',  # Исключаем подзаголовки
-            'ul', 'ol', 'li',  # Исключаем списки
-            'blockquote',  # Исключаем цитаты
-        ]
-        for selector in unwanted_selectors:
-            for element in soup_copy.select(selector):
-                element.decompose()
-    
+        """Извлечение ТОЛЬКО основного текста статьи без подзаголовков, списков и служебной информации
+
+        Страница не копируется и не меняется: сначала находятся абзацы контейнера статьи,
+        а служебные блоки (UNWANTED_*) отбрасываются только среди их предков и потомков.
+        """
+        removed: Dict[int, bool] = {}
+
         # Строго выбираем основной контент
         main_selectors = [
             '.article-body p',  # Основной текст статьи
@@ -303,7 +315,7 @@ class FootballUATargetedParser:
     
         article_paragraphs = []
         for selector in main_selectors:
-            paragraphs = soup_copy.select(selector)
+            paragraphs = [p for p in soup.select(selector) if not self.is_unwanted_element(p, removed)]
             if paragraphs:
                 print(f"🎯 Найдены параграфы через селектор: {selector}")
                 article_paragraphs = paragraphs
@@ -311,24 +323,29 @@ class FootballUATargetedParser:
     
         if not article_paragraphs:
             print("⚠️ Используем параграфы внутри article или .content")
-            article_container = soup_copy.select_one('article, .content, .article-body, .news-content')
+            article_container = next(
+                (el for el in soup.select('article, .content, .article-body, .news-content')
+                 if not self.is_unwanted_element(el, removed)),
+                None
+            )
             if article_container:
-                article_paragraphs = article_container.find_all('p', recursive=False)
+                article_paragraphs = [p for p in article_container.find_all('p', recursive=False)
+                                      if not self.is_unwanted_element(p, removed)]
     
         # Фильтруем параграфы, чтобы оставить только содержательные
         meaningful_paragraphs = []
         for p in article_paragraphs:
-            p_text = p.get_text(strip=True)
+            # Заголовки, списки и цитаты среди предков исключены is_unwanted_element
+            p_text = self.pruned_text(p, removed)
             if (len(p_text) > 30 and  # Увеличиваем минимальную длину для исключения коротких фраз
-                not p.find_parent(['h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'ul', 'ol', 'blockquote']) and
                 not any(skip_phrase in p_text.lower() for skip_phrase in [
                     'getty images', 'фото:', 'джерело:', 'читайте також',
                     'підписуйтесь', 'стежите', 'telegram', 'facebook', 'twitter',
                     'про це повідомляє', 'football.ua', 'футбол.ua',
                     'cookie', 'реклам', 'коментар', 'автор:', 'теги:'
                 ]) and
-                not re.match(r'^\d{1,2}\s+\w+\s+\d{4},\s+\d{1,2}:\d{2}$', p_text) and
-                not re.match(r'^[А-ЯІЄ][а-яієї]+\s+[А-ЯІЄ][а-яієї]+,\s*getty images$', p_text, re.IGNORECASE)
+                not DATE_LINE_RE.match(p_text) and
+                not PHOTO_CREDIT_RE.match(p_text)
             ):
                 meaningful_paragraphs.append(p_text)
     
@@ -342,18 +359,25 @@ class FootballUATargetedParser:
     
     def get_full_article_data(self, news_item, since_time: Optional[datetime] = None):
         """Получение полных данных статьи с быстрой проверкой времени"""
+        outcome = self.fetch_article_outcome(news_item, since_time)
+        return outcome.article if outcome.accepted else None
+
+    def fetch_article_outcome(self, news_item, since_time: Optional[datetime] = None) -> ArticleOutcome:
+        """Загружает статью один раз и возвращает итог: принята, старая, длинная или ошибка"""
         url = news_item['url']
         soup = self.get_page_content(url)
         if not soup:
-            return None
+            return ArticleOutcome(ArticleOutcome.FETCH_ERROR, error=f"не удалось загрузить {url}")
+        return self.process_article_soup(soup, news_item, since_time)
+
+    def process_article_soup(self, soup, news_item, since_time: Optional[datetime] = None) -> ArticleOutcome:
+        """Разбирает уже загруженную страницу статьи: время, чистый текст, длина, картинка"""
+        url = news_item['url']
         try:
-            if since_time:
-                publish_time = self.estimate_article_publish_time(soup, url)
-                if publish_time and publish_time <= since_time:
-                    print(f"⏰ Статья опубликована {publish_time.strftime('%H:%M %d.%m')} - старая")
-                    return None
-            else:
-                publish_time = self.estimate_article_publish_time(soup, url)
+            publish_time = self.estimate_article_publish_time(soup, url)
+            if since_time and publish_time and publish_time <= since_time:
+                print(f"⏰ Статья опубликована {publish_time.strftime('%H:%M %d.%m')} - старая")
+                return ArticleOutcome(ArticleOutcome.TOO_OLD, publish_time=publish_time)
             print("📄 Извлекаем ТОЛЬКО основной текст статьи...")
             clean_content = self.extract_clean_article_content(soup)
             word_count = self.count_words(clean_content)
@@ -362,11 +386,11 @@ class FootballUATargetedParser:
             print(f"🔍 Первые символы: {preview}")
             if word_count > 600:
                 print(f"📏 Статья слишком длинная ({word_count} слов > 600) - пропускаем")
-                return None
+                return ArticleOutcome(ArticleOutcome.TOO_LONG, publish_time=publish_time, word_count=word_count)
             print(f"✅ Статья подходит ({word_count} слов ≤ 600)")
             summary = self.create_summary(clean_content, news_item['title'])
             image_url = self.extract_main_image(soup, url)
-            return {
+            article = {
                 'title': news_item['title'],
                 'url': url,
                 'content': clean_content,
@@ -375,9 +399,11 @@ class FootballUATargetedParser:
                 'publish_time': publish_time,
                 'word_count': word_count
             }
+            return ArticleOutcome(ArticleOutcome.ACCEPTED, article=article,
+                                  publish_time=publish_time, word_count=word_count)
         except Exception as e:
             print(f"❌ Ошибка обработки {url}: {e}")
-            return None
+            return ArticleOutcome(ArticleOutcome.FETCH_ERROR, error=str(e))
     
     def extract_article_content(self, soup):
         """УСТАРЕВШИЙ метод - теперь вызывает правильный метод"""
@@ -387,7 +413,7 @@ class FootballUATargetedParser:
         """Создает краткую выжимку"""
         if not content:
             return title
-        sentences = re.split(r'[.!?]+', content)
+        sentences = SENTENCE_SPLIT_RE.split(content)
         meaningful_sentences = [s.strip() for s in sentences if len(s.strip()) > 20]
         if meaningful_sentences:
             summary = '. '.join(meaningful_sentences[:2])
@@ -433,6 +459,7 @@ class FootballUATargetedParser:
         golovne_section = self.find_golovne_za_dobu_section(soup)
         if not golovne_section:
             print("❌ Блок 'ГОЛОВНЕ ЗА ДОБУ' не найден")
+            diagnostics.dump_page('Football.ua', self.base_url, str(soup), "блок 'ГОЛОВНЕ ЗА ДОБУ' не найден")
             return []
         print("📰 Извлекаем новости из блока...")
         news_items = self.extract_news_from_section(golovne_section, since_time)
@@ -444,60 +471,129 @@ class FootballUATargetedParser:
         consecutive_old_articles = 0
         for i, news_item in enumerate(news_items, 1):
             print(f"📖 Обрабатываем новость {i}/{len(news_items)}: {news_item['title'][:50]}...")
-            article_data = self.get_full_article_data(news_item, since_time)
-            if article_data is None:
-                if since_time:
-                    soup_temp = self.get_page_content(news_item['url'])
-                    if soup_temp:
-                        publish_time = self.estimate_article_publish_time(soup_temp, news_item['url'])
-                        if publish_time and publish_time <= since_time:
-                            consecutive_old_articles += 1
-                            print(f"⏰ Старая статья #{consecutive_old_articles} подряд (время: {publish_time.strftime('%H:%M %d.%m')})")
-                            if consecutive_old_articles >= self.max_consecutive_old:
-                                print(f"🚫 ОПТИМИЗАЦИЯ: {self.max_consecutive_old} статьи подряд оказались старыми - прекращаем обработку остальных")
-                                print(f"⏭️ Пропускаем {len(news_items) - i} оставшихся статей")
-                                break
-                            continue
-                        else:
-                            consecutive_old_articles = 0
-                            print(f"⏭️ Статья не подходит по длине/содержанию - пропускаем")
-                            continue
-                    else:
-                        consecutive_old_articles = 0
-                        print(f"⏭️ Техническая ошибка - пропускаем")
-                        continue
-                else:
-                    print(f"⏭️ Статья не подходит - пропускаем")
-                    continue
+            outcome = self.fetch_article_outcome(news_item, since_time)
+            if outcome.status == ArticleOutcome.TOO_OLD:
+                consecutive_old_articles += 1
+                print(f"⏰ Старая статья #{consecutive_old_articles} подряд (время: {outcome.publish_time.strftime('%H:%M %d.%m')})")
+                if consecutive_old_articles >= self.max_consecutive_old:
+                    print(f"🚫 ОПТИМИЗАЦИЯ: {self.max_consecutive_old} статьи подряд оказались старыми - прекращаем обработку остальных")
+                    print(f"⏭️ Пропускаем {len(news_items) - i} оставшихся статей")
+                    break
+                continue
             consecutive_old_articles = 0
+            if outcome.status == ArticleOutcome.TOO_LONG:
+                print(f"⏭️ Статья не подходит по длине ({outcome.word_count} слов) - пропускаем")
+                continue
+            if outcome.status == ArticleOutcome.FETCH_ERROR:
+                print(f"⏭️ Техническая ошибка - пропускаем")
+                continue
+            article_data = outcome.article
             full_articles.append(article_data)
             print(f"✅ Статья добавлена: {article_data['title'][:50]}...")
             time.sleep(1)
         print(f"✅ Обработано {len(full_articles)} подходящих статей")
         return full_articles
 
+_parser: Optional[FootballUATargetedParser] = None
+
+def get_parser() -> FootballUATargetedParser:
+    """Общий экземпляр парсера - HTTP-сессия переживает циклы резидентного режима"""
+    global _parser
+    if _parser is None:
+        _parser = FootballUATargetedParser()
+    return _parser
+
+@register_source
+class FootballUASource(Source):
+    """Football.ua как плагин: блок 'ГОЛОВНЕ ЗА ДОБУ' и страницы статей"""
+    name = 'Football.ua'
+    hosts = ('football.ua',)
+    budget = SourceBudget(max_concurrency=4, requests_per_second=2.0, burst=2)
+    headers = {"Accept-Language": "uk-UA,uk;q=0.9,en;q=0.8"}
+    since_buffer = timedelta(minutes=1)
+
+    def __init__(self):
+        self.parser = get_parser()
+        self.max_consecutive_old = self.parser.max_consecutive_old
+
+    async def discover(self, engine, since_time: Optional[datetime]) -> List[ArticleLink]:
+        result = await engine.fetch(self.parser.base_url)
+        if not result:
+            print("❌ Не удалось загрузить главную страницу")
+            return []
+        news_items = await self.parse_cached(result, self._discover_from_html)
+        if not news_items:
+            diagnostics.dump_page(self.name, result.url, result.text, "блок 'ГОЛОВНЕ ЗА ДОБУ' пуст или не найден")
+        if not since_time:
+            news_items = news_items[:5]
+        return [ArticleLink(title=item['title'], url=item['url']) for item in news_items]
+
+    def _discover_from_html(self, html: str):
+        soup = make_soup(html)
+        section = self.parser.find_golovne_za_dobu_section(soup)
+        return self.parser.collect_section_links(section)
+
+    async def fetch_article(self, engine, link: ArticleLink, since_time: Optional[datetime]) -> ArticleOutcome:
+        # Старую статью видно по заголовкам или первым КБ - дальше страницу не качаем
+        probe = PublishTimeProbe(since_time, self.parser.parse_meta_time) if since_time else None
+        result = await engine.fetch(link.url, stop_when=probe)
+        if not result:
+            return ArticleOutcome(ArticleOutcome.FETCH_ERROR, error=f"не удалось загрузить {link.url}")
+        if result.truncated:
+            print(f"⏰ Статья опубликована {probe.publish_time.strftime('%H:%M %d.%m')} - старая "
+                  f"(загрузка прервана после {len(result.text)} символов)")
+            return ArticleOutcome(ArticleOutcome.TOO_OLD, publish_time=probe.publish_time)
+        news_item = {'title': link.title, 'url': link.url}
+        outcome = await asyncio.to_thread(self._process_html, result.text, news_item, since_time)
+        if outcome.accepted:
+            data = outcome.article
+            outcome.article = Article(
+                title=data['title'],
+                url=data['url'],
+                source=self.name,
+                content=data['content'],
+                summary=data['summary'],
+                image_url=data['image_url'],
+                publish_time=data['publish_time'],
+                word_count=data['word_count'],
+            )
+        return outcome
+
+    def _process_html(self, html: str, news_item, since_time: Optional[datetime]):
+        if since_time:
+            # Старую статью видно по мета-тегам в <head> - тело страницы не разбираем
+            publish_time = self.parser.extract_meta_publish_time(parse_head(html))
+            if publish_time and publish_time <= since_time:
+                print(f"⏰ Статья опубликована {publish_time.strftime('%H:%M %d.%m')} - старая")
+                return ArticleOutcome(ArticleOutcome.TOO_OLD, publish_time=publish_time)
+        return self.parser.process_article_soup(make_soup(html), news_item, since_time)
+
+    def extract_publish_time(self, soup, url: str) -> Optional[datetime]:
+        return self.parser.estimate_article_publish_time(soup, url)
+
+def to_news_item(article: Dict[str, Any]) -> Dict[str, Any]:
+    """Приводит статью парсера к формату, который ожидает main.py"""
+    return {
+        'title': article['title'],
+        'link': article['url'],
+        'url': article['url'],
+        'summary': article['summary'],
+        'image_url': article['image_url'],
+        'content': article['content'],
+        'publish_time': article.get('publish_time'),
+        'word_count': article.get('word_count'),
+        'source': 'Football.ua'
+    }
+
 def get_latest_news(since_time: Optional[datetime] = None):
     """Функция-обертка для совместимости"""
-    parser = FootballUATargetedParser()
+    parser = get_parser()
     if since_time:
         since_time_buffered = since_time - timedelta(minutes=1)
         articles = parser.get_latest_news(since_time_buffered)
     else:
         articles = parser.get_latest_news()
-    result = []
-    for article in articles:
-        result.append({
-            'title': article['title'],
-            'link': article['url'],
-            'url': article['url'],
-            'summary': article['summary'],
-            'image_url': article['image_url'],
-            'content': article['content'],
-            'publish_time': article.get('publish_time'),
-            'word_count': article.get('word_count'),
-            'source': 'Football.ua'
-        })
-    return result
+    return [to_news_item(article) for article in articles]
 
 def test_targeted_parser():
     """Тестирование целевого парсера"""
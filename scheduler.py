@@ -1,4 +1,5 @@
 import asyncio
+import os
 import schedule
 import time
 import subprocess
@@ -31,6 +32,7 @@ class NewsScheduler:
         self.working_hours_start = dt_time(6, 0)   # 6:00 по Киеву
         self.working_hours_end = dt_time(1, 0)     # 1:00 по Киеву (следующего дня)
         self.interval_minutes = 20
+        self.cycle_timeout = 600  # 10 минут на один цикл
         self.is_running = False
     
     def is_working_hours(self) -> bool:
@@ -64,12 +66,14 @@ class NewsScheduler:
         
         try:
             logger.info(f"🚀 Запускаем бота в {current_time_str} (Киев)")
+            # Флаг диагностики передаётся дочернему процессу (переменная окружения наследуется сама)
+            args = [sys.executable, 'main.py'] + (['--diagnostics'] if '--diagnostics' in sys.argv[1:] else [])
             result = subprocess.run(
-                [sys.executable, 'main.py'],
+                args,
                 capture_output=True,
                 text=True,
                 encoding='utf-8',
-                timeout=600  # 10 минут
+                timeout=self.cycle_timeout
             )
             if result.returncode == 0:
                 logger.info("✅ Бот завершился успешно")
@@ -86,4 +90,84 @@ class NewsScheduler:
                 if result.stderr:
                     logger.error(f"Ошибка: {result.stderr}")
                 if result.stdout:
-                    logger.error(f"
+                    logger.error(f"Вывод: {result.stdout[-2000:]}")
+        except subprocess.TimeoutExpired:
+            logger.error(f"⏰ Бот не уложился в {self.cycle_timeout} секунд и был остановлен")
+        except Exception as e:
+            logger.error(f"💥 Ошибка запуска бота: {e}")
+        finally:
+            self.is_running = False
+
+    async def run_main_bot_resident(self):
+        """Один цикл бота внутри текущего процесса (без запуска main.py)"""
+        if not self.is_working_hours():
+            logger.info("⏰ Сейчас время перерыва (01:00-06:00 по Киеву). Пропускаем запуск.")
+            return
+
+        if self.is_running:
+            logger.warning("⚠️ Бот уже выполняется. Пропускаем запуск.")
+            return
+
+        self.is_running = True
+        current_time_str = now_kiev().strftime('%H:%M:%S %d.%m.%Y')
+        bot = None
+
+        try:
+            # Импорт один раз: модули, сессии, клиент Groq и соединение с БД живут между циклами
+            import main as bot
+
+            logger.info(f"🚀 Запускаем цикл бота в {current_time_str} (Киев, резидентный режим)")
+            async with asyncio.timeout(self.cycle_timeout):
+                await bot.main()
+            logger.info("✅ Цикл бота завершился успешно")
+        except TimeoutError:
+            logger.error(f"⏰ Цикл не уложился в {self.cycle_timeout} секунд и был прерван")
+        except Exception as e:
+            logger.error(f"💥 Ошибка цикла бота: {e}", exc_info=True)
+        finally:
+            # Потоки нельзя прервать, а начатая публикация должна дойти до записи в базу:
+            # следующий цикл стартует только после них, иначе оба работали бы с общим курсором БД
+            try:
+                if bot is not None:
+                    await bot.wait_inflight()
+            finally:
+                self.is_running = False
+
+    async def run_resident(self):
+        """Долгоживущий режим: циклы на одном asyncio-цикле событий"""
+        logger.info(f"🔁 Резидентный режим: запуск каждые {self.interval_minutes} минут")
+        interval = self.interval_minutes * 60
+        try:
+            while True:
+                started = time.monotonic()
+                await self.run_main_bot_resident()
+                elapsed = time.monotonic() - started
+                await asyncio.sleep(max(0, interval - elapsed))
+        finally:
+            from fetcher import get_engine
+            await get_engine().aclose()
+
+    def start(self):
+        """Режим по умолчанию: отдельный процесс main.py на каждый запуск"""
+        logger.info(f"📅 Планировщик запущен: каждые {self.interval_minutes} минут")
+        self.run_main_bot()
+        schedule.every(self.interval_minutes).minutes.do(self.run_main_bot)
+        while True:
+            schedule.run_pending()
+            time.sleep(30)
+
+
+def is_resident_mode() -> bool:
+    """Резидентный режим включается флагом --resident или SCHEDULER_MODE=resident"""
+    return '--resident' in sys.argv[1:] or os.getenv('SCHEDULER_MODE', '').lower() == 'resident'
+
+
+if __name__ == "__main__":
+    scheduler = NewsScheduler()
+    try:
+        if is_resident_mode():
+            asyncio.run(scheduler.run_resident())
+        else:
+            scheduler.start()
+    except KeyboardInterrupt:
+        logger.info("⏹️  Планировщик остановлен пользователем")
@@ -0,0 +1,339 @@
+import asyncio
+import importlib
+import logging
+import os
+from email.utils import parsedate_to_datetime
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Callable, ClassVar, Dict, List, Optional, Tuple, Type
+from zoneinfo import ZoneInfo
+
+from db import get_cached_article, save_cached_article
+from fetcher import FetchEngine, FetchResult, SourceBudget
+from html_parsing import sniff_publish_time
+
+logger = logging.getLogger(__name__)
+
+KIEV_TZ = ZoneInfo("Europe/Kiev")
+
+# Модули, которые регистрируют источники при импорте (можно переопределить через NEWS_SOURCE_MODULES)
+DEFAULT_SOURCE_MODULES = ('parser', 'onefootball_parser')
+
+
+@dataclass
+class ArticleLink:
+    """Ссылка на статью, найденная на странице-списке источника"""
+    title: str
+    url: str
+    publish_time: Optional[datetime] = None
+    image_url: str = ''
+    summary: str = ''
+    extra: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class Article:
+    """Общая запись статьи, которую источники отдают рантайму"""
+    title: str
+    url: str
+    source: str
+    content: str = ''
+    summary: str = ''
+    image_url: str = ''
+    publish_time: Optional[datetime] = None
+    word_count: Optional[int] = None
+    extra: Dict[str, Any] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Словарь в формате, который ожидают main.py и ai_processor.py"""
+        item = {
+            'title': self.title,
+            'link': self.url,
+            'url': self.url,
+            'content': self.content,
+            'summary': self.summary,
+            'image_url': self.image_url,
+            'publish_time': self.publish_time,
+            'word_count': self.word_count,
+            'source': self.source,
+        }
+        item.update(self.extra)
+        return item
+
+
+@dataclass
+class ArticleOutcome:
+    """Итог обработки одной статьи после единственной загрузки.
+
+    article заполнен только для принятой статьи; для отклонённых сохраняется причина:
+    время публикации (старая), число слов (длинная) или текст ошибки.
+    """
+    ACCEPTED: ClassVar[str] = 'accepted'
+    TOO_OLD: ClassVar[str] = 'too_old'
+    TOO_LONG: ClassVar[str] = 'too_long'
+    FETCH_ERROR: ClassVar[str] = 'fetch_error'
+
+    status: str
+    article: Any = None
+    publish_time: Optional[datetime] = None
+    word_count: Optional[int] = None
+    error: str = ''
+
+    @property
+    def accepted(self) -> bool:
+        return self.status == self.ACCEPTED
+
+
+class PublishTimeProbe:
+    """stop_when для FetchEngine.fetch: обрывает загрузку статьи, которая заведомо старше since_time.
+
+    Смотрит Last-Modified (страница не менялась после since_time - значит, и опубликована
+    раньше), затем мета-теги и JSON-LD в <head>. Как только время найдено или <head>
+    закончился, решение принято и остаток страницы грузится как обычно.
+    """
+
+    def __init__(self, since_time: datetime, parse_time: Callable[[str], Optional[datetime]]):
+        self.since_time = since_time
+        self.parse_time = parse_time
+        self.publish_time: Optional[datetime] = None
+        self.decided = False
+
+    def __call__(self, result: FetchResult) -> bool:
+        if self.decided:
+            return False
+        if not result.text:
+            modified = result.headers.get('last-modified')
+            try:
+                modified_time = parsedate_to_datetime(modified).astimezone(KIEV_TZ) if modified else None
+            except (TypeError, ValueError):
+                modified_time = None
+            if modified_time and modified_time <= self.since_time:
+                self.publish_time = modified_time
+                self.decided = True
+            return self.decided
+        raw_time = sniff_publish_time(result.text)
+        if raw_time:
+            self.publish_time = self.parse_time(raw_time)
+            self.decided = True
+            return bool(self.publish_time and self.publish_time <= self.since_time)
+        self.decided = '</head>' in result.text or '</HEAD>' in result.text
+        return False
+
+
+class Source:
+    """Базовый класс плагина-источника.
+
+    Источник описывает, как найти статьи (discover), как загрузить и разобрать одну
+    статью (fetch_article) и как определить время публикации. Вся сеть идёт через
+    общий FetchEngine, который соблюдает объявленный бюджет по хостам.
+    """
+    name: str = ''
+    hosts: Tuple[str, ...] = ()
+    budget: SourceBudget = SourceBudget()
+    headers: Dict[str, str] = {}
+    timeout: float = 240
+    since_buffer: timedelta = timedelta(0)  # Запас к since_time на неточность времени на сайте
+    # Сколько старых статей подряд (в порядке discover) означают, что дальше только старые
+    max_consecutive_old: Optional[int] = None
+
+    async def discover(self, engine: FetchEngine, since_time: Optional[datetime]) -> List[ArticleLink]:
+        raise NotImplementedError
+
+    async def fetch_article(self, engine: FetchEngine, link: ArticleLink,
+                            since_time: Optional[datetime]) -> ArticleOutcome:
+        raise NotImplementedError
+
+    def extract_publish_time(self, soup, url: str) -> Optional[datetime]:
+        raise NotImplementedError
+
+    async def parse_cached(self, result: FetchResult, parse: Callable[[str], Any]) -> Any:
+        """Разбирает страницу в потоке; если сервер ответил 304, берёт прошлый разбор из памяти.
+
+        parse должен зависеть только от HTML страницы.
+        """
+        memo = self.__dict__.setdefault('_parse_memo', {})
+        key = (result.url, parse.__name__)
+        if result.not_modified and key in memo and memo[key][0] == result.validator:
+            return memo[key][1]
+        value = await asyncio.to_thread(parse, result.text)
+        if result.validator:
+            memo[key] = (result.validator, value)
+        return value
+
+
+# Счётчики кэша разобранных статей за текущий цикл
+article_cache_stats = {'hits': 0, 'misses': 0}
+
+
+def cached_outcome(source: Source, link: ArticleLink, since_time: Optional[datetime]) -> Optional[ArticleOutcome]:
+    """Итог по ссылке из кэша разобранных статей - без обращения к сети.
+
+    None означает, что статью нужно загрузить.
+    """
+    cached = get_cached_article(link.url)
+    if not cached:
+        return None
+    status = cached['status']
+    publish_time = cached['publish_time']
+    is_old = bool(since_time and publish_time and publish_time <= since_time)
+
+    if status == 'posted':
+        return ArticleOutcome(ArticleOutcome.TOO_OLD, publish_time=publish_time)
+    if status == ArticleOutcome.TOO_LONG:
+        return ArticleOutcome(ArticleOutcome.TOO_LONG, publish_time=publish_time, word_count=cached['word_count'])
+    if is_old:
+        return ArticleOutcome(ArticleOutcome.TOO_OLD, publish_time=publish_time)
+    if status == ArticleOutcome.ACCEPTED:
+        article = Article(
+            title=cached['title'] or link.title,
+            url=link.url,
+            source=source.name,
+            content=cached['content'],
+            summary=cached['summary'],
+            image_url=cached['image_url'],
+            publish_time=publish_time,
+            word_count=cached['word_count'],
+            extra=cached['extra'],
+        )
+        return ArticleOutcome(ArticleOutcome.ACCEPTED, article=article,
+                              publish_time=publish_time, word_count=cached['word_count'])
+    return None
+
+
+def remember_outcome(source: Source, link: ArticleLink, outcome: ArticleOutcome) -> None:
+    """Сохраняет итог разбора статьи; ошибки загрузки не кэшируются"""
+    if outcome.status == ArticleOutcome.FETCH_ERROR:
+        return
+    article = outcome.article
+    if article:
+        save_cached_article(link.url, source.name, outcome.status, title=article.title,
+                            content=article.content, summary=article.summary, image_url=article.image_url,
+                            publish_time=article.publish_time, word_count=article.word_count,
+                            extra=article.extra)
+    else:
+        save_cached_article(link.url, source.name, outcome.status, title=link.title,
+                            publish_time=outcome.publish_time, word_count=outcome.word_count)
+
+
+_REGISTRY: Dict[str, Type[Source]] = {}
+_INSTANCES: Dict[str, Source] = {}
+
+
+def register_source(cls: Type[Source]) -> Type[Source]:
+    """Декоратор: регистрирует класс источника под его именем"""
+    if not cls.name:
+        raise ValueError(f"У источника {cls.__name__} не задано имя")
+    _REGISTRY[cls.name] = cls
+    return cls
+
+
+def load_sources(modules: Optional[List[str]] = None) -> List[Source]:
+    """Импортирует модули источников и возвращает экземпляры всех зарегистрированных"""
+    if modules is None:
+        env_modules = os.getenv('NEWS_SOURCE_MODULES')
+        modules = env_modules.split(',') if env_modules else list(DEFAULT_SOURCE_MODULES)
+    for module_name in modules:
+        module_name = module_name.strip()
+        if not module_name:
+            continue
+        try:
+            importlib.import_module(module_name)
+        except ImportError as e:
+            logger.error(f"Не удалось загрузить модуль источника {module_name}: {e}")
+    return get_sources()
+
+
+def get_sources() -> List[Source]:
+    """Экземпляры источников создаются один раз и живут между циклами"""
+    for name, cls in _REGISTRY.items():
+        if name not in _INSTANCES:
+            _INSTANCES[name] = cls()
+    return [_INSTANCES[name] for name in _REGISTRY]
+
+
+async def run_source(source: Source, engine: FetchEngine, since_time: Optional[datetime],
+                     timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+    """Собирает статьи одного источника; по таймауту возвращает то, что успели принять"""
+    collected: List[Article] = []
+    timeout = timeout or source.timeout
+    since = since_time - source.since_buffer if since_time else None
+    limit = asyncio.Semaphore(source.budget.max_concurrency)
+    tasks: List[asyncio.Task] = []
+    consumed = 0
+
+    async def fetch_one(link: ArticleLink) -> ArticleOutcome:
+        cached = cached_outcome(source, link, since)
+        if cached:
+            article_cache_stats['hits'] += 1
+            return cached
+        article_cache_stats['misses'] += 1
+        async with limit:
+            try:
+                outcome = await source.fetch_article(engine, link, since)
+            except Exception as e:
+                logger.error(f"{source.name}: ошибка обработки {link.url}: {e}")
+                return ArticleOutcome(ArticleOutcome.FETCH_ERROR, error=str(e))
+        remember_outcome(source, link, outcome)
+        return outcome
+
+    def accept(outcome: ArticleOutcome) -> None:
+        if outcome.accepted and outcome.article:
+            collected.append(outcome.article)
+            logger.info(f"{source.name}: статья принята: {outcome.article.title[:50]}...")
+
+    try:
+        async with asyncio.timeout(timeout):
+            links = await source.discover(engine, since)
+            logger.info(f"{source.name}: найдено {len(links)} ссылок на статьи")
+            # Статьи грузятся параллельно, а итоги разбираются в порядке discover,
+            # чтобы отсечка по старым статьям подряд работала как при обходе по одной
+            tasks = [asyncio.create_task(fetch_one(link)) for link in links]
+            consecutive_old = 0
+            for task in tasks:
+                outcome = await task
+                consumed += 1
+                if outcome.status == ArticleOutcome.TOO_OLD:
+                    consecutive_old += 1
+                    if source.max_consecutive_old and consecutive_old >= source.max_consecutive_old:
+                        logger.info(f"{source.name}: {consecutive_old} старые статьи подряд - "
+                                    f"пропускаем оставшиеся {len(tasks) - consumed}")
+                        break
+                    continue
+                consecutive_old = 0
+                accept(outcome)
+    except asyncio.TimeoutError:
+        # Забираем то, что успело загрузиться вне очереди
+        for task in tasks[consumed:]:
+            if task.done() and not task.cancelled():
+                accept(task.result())
+        logger.warning(f"{source.name}: таймаут {timeout} с, берём частичный результат ({len(collected)} статей)")
+    except Exception as e:
+        logger.error(f"Ошибка получения новостей {source.name}: {e}")
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+
+    collected.sort(key=lambda a: a.publish_time or datetime.min.replace(tzinfo=KIEV_TZ), reverse=True)
+    return [article.to_dict() for article in collected]
+
+
+async def run_sources(engine: FetchEngine, since_time: Optional[datetime],
+                      timeouts: Optional[Dict[str, float]] = None,
+                      deadline: Optional[float] = None) -> Dict[str, List[Dict[str, Any]]]:
+    """Запускает все зарегистрированные источники параллельно на общем движке"""
+    sources = get_sources()
+    timeouts = timeouts or {}
+    article_cache_stats.update(hits=0, misses=0)
+    for source in sources:
+        for host in source.hosts:
+            engine.configure_host(host, source.budget, source.headers)
+
+    async def run_one(source: Source) -> List[Dict[str, Any]]:
+        timeout = timeouts.get(source.name) or source.timeout
+        if deadline:
+            timeout = min(timeout, deadline)
+        return await run_source(source, engine, since_time, timeout)
+
+    results = await asyncio.gather(*(run_one(source) for source in sources))
+    return {source.name: news for source, news in zip(sources, results)}
@@ -0,0 +1,161 @@
+import re
+from typing import Optional, Tuple
+
+# Все регулярные выражения для текста собраны здесь и компилируются один раз при импорте
+
+# Новостные ссылки football.ua: разделы по странам и страницы вида /12345-novyna.html
+NEWS_LINK_RE = re.compile(
+    r'/(?:news|ukraine|world|europe|england|spain|italy|germany|france|poland)/'
+    r'|/\d+[^/]*\.html'
+)
+
+UKRAINIAN_MONTHS = {
+    'січня': 1, 'лютого': 2, 'березня': 3, 'квітня': 4, 'травня': 5, 'червня': 6,
+    'липня': 7, 'серпня': 8, 'вересня': 9, 'жовтня': 10, 'листопада': 11, 'грудня': 12,
+    'січ': 1, 'лют': 2, 'бер': 3, 'кві': 4, 'тра': 5, 'чер': 6,
+    'лип': 7, 'сер': 8, 'вер': 9, 'жов': 10, 'лис': 11, 'гру': 12
+}
+
+# Разбор одной строки с датой (точки и запятые убираются до поиска)
+DATE_PUNCTUATION_RE = re.compile(r'[,.]')
+UA_DATE_RE = re.compile(r'(\d{1,2})\s+(\w+)\s+(\d{4})[\s,]+(\d{1,2}):(\d{2})')
+NUMERIC_DATE_RE = re.compile(r'(\d{1,2})\.(\d{1,2})\.(\d{4})[\s,]+(\d{1,2}):(\d{2})')
+TIME_ONLY_RE = re.compile(r'^(\d{1,2}):(\d{2})$')
+
+# Поиск даты в тексте всей страницы: (украинский месяц?, шаблон) в порядке приоритета
+TEXT_DATE_PATTERNS = (
+    (True, re.compile(r'(\d{1,2})\s+(січня|лютого|березня|квітня|травня|червня|липня|серпня|вересня|жовтня|листопада|грудня)'
+                      r'\s+(\d{4})[\s,]+(\d{1,2}):(\d{2})', re.IGNORECASE)),
+    (False, re.compile(r'(\d{1,2})\.(\d{1,2})\.(\d{4})[\s,]+(\d{1,2}):(\d{2})', re.IGNORECASE)),
+    (False, re.compile(r'(\d{1,2})/(\d{1,2})/(\d{4})[\s,]+(\d{1,2}):(\d{2})', re.IGNORECASE)),
+)
+
+GOLOVNE_HEADER_RE = re.compile('ГОЛОВНЕ ЗА ДОБУ', re.IGNORECASE)
+GOLOVNE_TEXT_RE = re.compile(r'головне.*за.*добу', re.IGNORECASE)
+
+HTML_TAG_RE = re.compile(r'<[^>]+>')
+WHITESPACE_RE = re.compile(r'\s+')
+WORD_RE = re.compile(r'\w+')
+SENTENCE_SPLIT_RE = re.compile(r'[.!?]+')
+
+# Служебные вставки, которые не считаются словами статьи, за один проход:
+# дата с временем, подпись Getty Images, хвост строки после "фото:", "джерело:",
+# "читайте також:" и текст в скобках. Результат тот же, что у замены шаблонов по очереди:
+# маркер внутри скобок съедает остаток своей строки вместе с ")", поэтому скобка
+# закрывается только на следующих строках (хвост берётся атомарно, без отката).
+_SERVICE_MARKERS = r'фото:|джерело:|читайте також:'
+SERVICE_TEXT_RE = re.compile(
+    r'\d{1,2}\s+\w+\s+\d{4},\s+\d{1,2}:\d{2}'
+    r'|getty images'
+    rf'|(?:{_SERVICE_MARKERS}).*'
+    rf'|\((?:(?!{_SERVICE_MARKERS})[^)]|(?:{_SERVICE_MARKERS})(?=(?P<tail>.*))(?P=tail))*\)',
+    re.IGNORECASE
+)
+
+# Абзацы статьи, которые целиком состоят из даты или подписи к фото
+DATE_LINE_RE = re.compile(r'^\d{1,2}\s+\w+\s+\d{4},\s+\d{1,2}:\d{2}$')
+PHOTO_CREDIT_RE = re.compile(r'^[А-ЯІЄ][а-яієї]+\s+[А-ЯІЄ][а-яієї]+,\s*getty images$', re.IGNORECASE)
+
+# Ключевые сущности для проверки дубликатов без AI
+TEAM_NAMES = (
+    'реал', 'барселона', 'ліверпуль', 'манчестер', 'арсенал', 'челсі', 'рейнджерс', 'наполі', 'генк',
+    'астон вілла', 'клуб брюгге', 'баварія', 'ювентус', 'псж', 'атлетіко', 'севілья', 'валенсія', 'інтер',
+    'мілан', 'рома', 'лаціо', 'аталанта', 'фіорентина', 'реал мадрид', 'манчестер юнайтед', 'манчестер сіті',
+    'тоттенгем', 'ньюкасл', 'вест гем', 'лестер', 'евертон', 'саутгемптон', 'бернлі', 'фулгем', 'вольвз',
+    'брайтон', 'кристал палас', 'айпсвіч', 'борнмут',
+)
+TEAM_RE = re.compile(r'\b(?:' + '|'.join(TEAM_NAMES) + r')\b')
+
+
+def _team_case_forms(name: str) -> str:
+    """Название клуба с падежными окончаниями: Реалу, Барселони, Ювентусом"""
+    if name.endswith(('а', 'я')):
+        return name[:-1] + '(?:а|и|і|у|ю|ою|ею|я)'
+    return name + '(?:а|у|ю|і|ом|ем|я)?'
+
+
+# Английские названия клубов в необработанных текстах OneFootball
+TEAM_NAMES_EN = (
+    'real', 'barcelona', 'liverpool', 'manchester', 'arsenal', 'chelsea', 'bayern', 'juventus', 'psg',
+    'atletico', 'inter', 'milan', 'roma', 'napoli', 'lazio', 'tottenham', 'newcastle', 'west ham',
+    'aston villa', 'everton', 'brighton', 'crystal palace', 'fulham', 'wolves', 'leicester', 'bournemouth',
+)
+
+# Упоминание клуба в любом падеже - такие пары слов не считаются именем игрока
+TEAM_MENTION_RE = re.compile(
+    r'\b(?:' + '|'.join([_team_case_forms(name) for name in TEAM_NAMES] + list(TEAM_NAMES_EN)) + r')\b'
+)
+PLAYER_UA_RE = re.compile(r'\b[А-ЯІЇЄ][а-яіїєґ]+\s+[А-ЯІЇЄ][а-яіїєґ]+\b')
+PLAYER_EN_RE = re.compile(r'\b[A-Z][a-z]+\s+[A-Z][a-z]+\b')
+COMPETITION_RE = re.compile(
+    r'\b(?:ліга чемпіонів|прем\'єр-ліга|ла ліга|серія а|бундесліга|pfa|uefa|ucl|champions league'
+    r'|premier league|la liga|serie a|bundesliga|europa league|conference league|fa cup|carabao cup'
+    r'|copa del rey|coppa italia|dfb pokal|кубок англії|кубок німеччини|кубок італії|кубок іспанії)\b'
+)
+NUMBER_RE = re.compile(
+    r'\b\d+[\d\s]*(?:мільйонів?|голів?|асистів?|років?|хвилин?|million|goal|assist|year|minute)\b'
+)
+
+# Очистка текста перед сравнением
+DECORATIVE_EMOJI_RE = re.compile(r'[📰📊🔥💪🎯⭐]')
+TRAILING_HASHTAG_RE = re.compile(r'\s*#\w+\s*$')
+HASHTAG_RE = re.compile(r'#\w+')
+
+# Слова, которые есть почти в каждой футбольной новости и не отличают одну от другой
+FOOTBALL_STOP_WORDS = frozenset({
+    'в', 'на', 'за', 'до', 'від', 'для', 'про', 'під', 'над', 'при', 'з', 'у', 'і', 'та', 'або', 'але',
+    'футбол', 'футбольний', 'гра', 'матч', 'команда', 'гравець', 'тренер', 'клуб', 'сезон',
+    'гол', 'м\'яч', 'поле', 'стадіон', 'вболівальники', 'перемога', 'поразка', 'новини', 'спорт',
+    'football', 'soccer', 'game', 'match', 'team', 'player', 'coach', 'club', 'season',
+    'goal', 'ball', 'field', 'stadium', 'fans', 'win', 'loss', 'news', 'sport',
+    'the', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by'
+})
+
+
+def is_news_link(href: Optional[str]) -> bool:
+    """Ссылка ведёт на новость football.ua"""
+    return bool(href) and NEWS_LINK_RE.search(href) is not None
+
+
+def parse_date_parts(date_text: str) -> Optional[Tuple[str, Tuple[int, ...]]]:
+    """Числа из строки с датой: ('date', (день, месяц, год, час, минута)) или ('time', (час, минута))"""
+    cleaned_text = DATE_PUNCTUATION_RE.sub('', date_text.lower().strip())
+    match = UA_DATE_RE.search(cleaned_text)
+    if match and match.group(2) in UKRAINIAN_MONTHS:
+        day, _, year, hour, minute = match.groups()
+        return 'date', (int(day), UKRAINIAN_MONTHS[match.group(2)], int(year), int(hour), int(minute))
+    match = NUMERIC_DATE_RE.search(cleaned_text)
+    if match:
+        return 'date', tuple(int(part) for part in match.groups())
+    match = TIME_ONLY_RE.search(cleaned_text)
+    if match:
+        return 'time', (int(match.group(1)), int(match.group(2)))
+    return None
+
+
+def strip_service_text(text: str) -> str:
+    """Текст без HTML-тегов и служебных вставок"""
+    return SERVICE_TEXT_RE.sub('', HTML_TAG_RE.sub('', text))
+
+
+def count_meaningful_words(text: str) -> int:
+    """Слова от двух букв без чисел; знаки препинания разделяют слова"""
+    if not text:
+        return 0
+    return sum(1 for word in WORD_RE.findall(strip_service_text(text))
+               if len(word) >= 2 and not word.isdigit())
+
+
+def normalize_whitespace(text: str) -> str:
+    return WHITESPACE_RE.sub(' ', text).strip()
+
+
+def clean_text_for_comparison(text: str) -> str:
+    """Текст поста для сравнения: без HTML, декоративных эмодзи и хэштегов в конце"""
+    if not text:
+        return ""
+    # Источники и важные эмодзи (⚽🏆🥅✅❌🌍🚫👑) остаются - они помогают различать статьи
+    text = HTML_TAG_RE.sub('', text)
+    text = DECORATIVE_EMOJI_RE.sub('', text)
+    text = TRAILING_HASHTAG_RE.sub('', text)
+    return normalize_whitespace(text)